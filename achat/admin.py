@@ -1,9 +1,100 @@
 from django.contrib import admin
+from django.db.models import Count, DecimalField, F, Q, QuerySet, Sum, Value
+from django.db.models.functions import Coalesce
 from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from .models import CustomUser, Location, UserToken, Category, SubCategory, Product, ProductImage, Wishlist, Notification, Cart, CartItem, Order, OrderItem, Review, VendorRating, DeliveryOption, Shipment
+from .models import CustomUser, Location, UserToken, Category, SubCategory, Product, ProductImage, Wishlist, Notification, Cart, CartItem, Order, OrderItem, Review, VendorRating, ProductRating, DeliveryOption, Shipment, AdminJob
 from .admin_dashboard import achat_dashboard_view
+from .admin_jobs import start_admin_job
+from .admin_search import classify, search_limit, text_matches
+from .platform_stats import get_platform_stats
+from .sales import sales_scope, schedule_sales_rebuild
+
+INDEX_STAT_KEYS = (
+    'total_users', 'total_vendors', 'total_customers', 'active_vendors', 'total_locations', 'active_tokens',
+    'total_products', 'active_products', 'total_wishlists', 'total_notifications', 'unread_notifications',
+)
+
+
+class AnnotatedChangelistMixin:
+    """
+    Les compteurs de list_display sont déclarés dans list_annotations et calculés par le
+    queryset (une requête pour toute la page au lieu d'une par ligne). Les clés FK affichées
+    vont dans list_select_related, les relations multiples dans list_prefetch_related.
+    """
+    list_annotations = {}
+    list_prefetch_related = []
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.list_annotations:
+            queryset = queryset.annotate(**self.list_annotations)
+        if self.list_prefetch_related:
+            queryset = queryset.prefetch_related(*self.list_prefetch_related)
+        return queryset
+
+
+class IndexedSearchMixin:
+    """
+    Remplace les icontains multi-colonnes de search_fields par des recherches indexées (admin_search).
+    search_exact_lookups associe un type de clé (UUID, numéro de commande…) aux champs comparés par
+    égalité. Une autre saisie est cherchée comme début des colonnes de search_prefix_lookups
+    (identifiant, numéro de commande partiel…) et dans l'index plein texte du modèle ('') et des
+    relations listées dans search_text_relations.
+    """
+    search_exact_lookups = {}
+    search_prefix_lookups = []
+    search_text_relations = ('',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        kind, value = classify(term)
+        if kind in self.search_exact_lookups:
+            condition = Q()
+            for lookup in self.search_exact_lookups[kind]:
+                condition |= Q(**{lookup: value})
+            return queryset.filter(condition), False
+
+        limit = search_limit()
+        manager = self.model._default_manager
+        ids = set()
+        if self.search_prefix_lookups:
+            # Les clés (EST…, SHIP…) sont stockées en majuscules
+            condition = Q()
+            for lookup in self.search_prefix_lookups:
+                for prefix in {term, term.upper()}:
+                    condition |= Q(**{lookup: prefix})
+            ids.update(manager.filter(condition).values_list('pk', flat=True)[:limit])
+        for relation in self.search_text_relations:
+            if relation:
+                related = self.model._meta.get_field(relation).related_model
+                related_ids = list(text_matches(related, term).values_list('pk', flat=True)[:limit])
+                matches = manager.filter(**{f'{relation}__in': related_ids})
+            else:
+                matches = text_matches(self.model, term)
+            ids.update(matches.values_list('pk', flat=True)[:limit])
+        # Liste d'IDs plafonnée : la pagination et le comptage de la liste portent sur au plus `limit` lignes
+        return queryset.filter(pk__in=list(ids)[:limit]), False
+
+
+def background_action(operation, description, **params):
+    """Action admin qui planifie l'opération (admin_jobs) sur les lignes sélectionnées au lieu de l'exécuter dans la requête"""
+    def action(modeladmin, request, queryset):
+        job = start_admin_job(operation, description, queryset, user=request.user, **params)
+        modeladmin.message_user(request, format_html(
+            '⏳ {} : {} ligne(s) en cours de traitement en arrière-plan. <a href="{}">Suivre la progression</a>',
+            description,
+            job.total,
+            reverse('admin:achat_adminjob_change', args=[job.pk])
+        ))
+    action.__name__ = '_'.join(['background', operation, *map(str, params.values())])
+    action.short_description = description
+    return action
 
 
 class LocationInline(admin.TabularInline):
@@ -13,13 +104,19 @@ class LocationInline(admin.TabularInline):
     readonly_fields = ['created_at', 'updated_at']
 
 
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
     list_display = [
         'get_avatar', 'identifier', 'get_full_name', 'get_user_type', 'gender', 
         'get_location_count', 'get_product_count', 'is_active', 'date_joined'
     ]
+    list_annotations = {
+        'location_count': Count('locations', distinct=True),
+        'product_count': Count('products', distinct=True),
+    }
     list_filter = ['user_type', 'gender', 'is_active', 'date_joined']
     search_fields = ['identifier', 'nom', 'prenom', 'username']
+    search_exact_lookups = {'uuid': ['id'], 'identifier': ['identifier']}
+    search_prefix_lookups = ['identifier__startswith']
     inlines = [LocationInline]
     readonly_fields = ['id', 'date_joined', 'last_login']
     
@@ -73,7 +170,7 @@ class CustomUserAdmin(admin.ModelAdmin):
     get_user_type.short_description = "Type"
     
     def get_location_count(self, obj):
-        count = obj.locations.count()
+        count = obj.location_count
         if count > 0:
             return format_html(
                 '<span style="background: #f35453; color: white; padding: 2px 6px; border-radius: 10px;">📍 {}</span>',
@@ -81,9 +178,10 @@ class CustomUserAdmin(admin.ModelAdmin):
             )
         return "📍 0"
     get_location_count.short_description = "Localisations"
+    get_location_count.admin_order_field = 'location_count'
     
     def get_product_count(self, obj):
-        count = obj.products.count()
+        count = obj.product_count
         if count > 0:
             return format_html(
                 '<span style="background: #17a2b8; color: white; padding: 2px 6px; border-radius: 10px;">🛍️ {}</span>',
@@ -91,12 +189,16 @@ class CustomUserAdmin(admin.ModelAdmin):
             )
         return "🛍️ 0"
     get_product_count.short_description = "Produits"
+    get_product_count.admin_order_field = 'product_count'
 
 
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'get_user_info', 'is_default', 'get_coordinates', 'created_at']
+    list_select_related = ['user']
     list_filter = ['is_default', 'created_at']
     search_fields = ['name', 'user__nom', 'user__prenom', 'user__identifier']
+    search_exact_lookups = {'uuid': ['id'], 'identifier': ['user__identifier']}
+    search_prefix_lookups = ['user__identifier__startswith']
     readonly_fields = ['id', 'created_at', 'updated_at']
     
     fieldsets = (
@@ -126,18 +228,23 @@ class LocationAdmin(admin.ModelAdmin):
     get_coordinates.short_description = "Coordonnées"
 
 
-class UserTokenAdmin(admin.ModelAdmin):
-    list_display = ['get_user_info', 'get_token_preview', 'get_status', 'created_at', 'updated_at']
-    list_filter = ['is_active', 'created_at', 'updated_at']
-    search_fields = ['user__nom', 'user__prenom', 'user__identifier', 'token']
-    readonly_fields = ['id', 'token', 'created_at', 'updated_at']
+class UserTokenAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ['get_user_info', 'get_token_preview', 'device_name', 'get_status', 'last_seen_at', 'expires_at', 'created_at']
+    list_filter = ['is_active', 'created_at', 'expires_at']
+    list_select_related = ['user']
+    search_fields = ['user__nom', 'user__prenom', 'user__identifier', 'token', 'device_name']
+    search_exact_lookups = {'uuid': ['id', 'token'], 'identifier': ['user__identifier']}
+    search_prefix_lookups = ['user__identifier__startswith', 'device_name__istartswith']
+    search_text_relations = ('user',)
+    actions = [background_action('deactivate_tokens', "Désactiver les tokens sélectionnés")]
+    readonly_fields = ['id', 'token', 'last_seen_at', 'created_at', 'updated_at']
     
     fieldsets = (
         ('🔑 Token Information', {
-            'fields': ('user', 'token', 'is_active')
+            'fields': ('user', 'token', 'device_name', 'is_active', 'expires_at')
         }),
         ('📊 Métadonnées', {
-            'fields': ('id', 'created_at', 'updated_at'),
+            'fields': ('id', 'last_seen_at', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -161,6 +268,10 @@ class UserTokenAdmin(admin.ModelAdmin):
     get_token_preview.short_description = "Token (Aperçu)"
     
     def get_status(self, obj):
+        if obj.is_active and obj.is_expired:
+            return format_html(
+                '<span style="background: #ffc107; color: white; padding: 2px 8px; border-radius: 10px;">⏰ Expiré</span>'
+            )
         if obj.is_active:
             return format_html(
                 '<span style="background: #28a745; color: white; padding: 2px 8px; border-radius: 10px;">✅ Actif</span>'
@@ -179,10 +290,12 @@ class SubCategoryInline(admin.TabularInline):
     verbose_name_plural = "Sous-catégories associées"
 
 
-class SubCategoryAdmin(admin.ModelAdmin):
+class SubCategoryAdmin(IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
     list_display = ['name', 'name_trl', 'get_status', 'get_categories_count', 'created_at']
+    list_annotations = {'categories_count': Count('categories')}
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'name_trl', 'description']
+    search_exact_lookups = {'uuid': ['id']}
     readonly_fields = ['id', 'created_at', 'updated_at']
     
     fieldsets = (
@@ -207,7 +320,7 @@ class SubCategoryAdmin(admin.ModelAdmin):
     get_status.short_description = "Statut"
     
     def get_categories_count(self, obj):
-        count = obj.categories.count()
+        count = obj.categories_count
         if count > 0:
             return format_html(
                 '<span style="background: #007bff; color: white; padding: 2px 6px; border-radius: 10px;">📁 {}</span>',
@@ -215,12 +328,15 @@ class SubCategoryAdmin(admin.ModelAdmin):
             )
         return "📁 0"
     get_categories_count.short_description = "Catégories"
+    get_categories_count.admin_order_field = 'categories_count'
 
 
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
     list_display = ['name', 'name_trl', 'get_status', 'get_subcategories_count', 'created_at']
+    list_annotations = {'subcategories_count': Count('subcategories')}
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'name_trl', 'description']
+    search_exact_lookups = {'uuid': ['id']}
     readonly_fields = ['id', 'created_at', 'updated_at']
     filter_horizontal = ['subcategories']
     
@@ -249,7 +365,7 @@ class CategoryAdmin(admin.ModelAdmin):
     get_status.short_description = "Statut"
     
     def get_subcategories_count(self, obj):
-        count = obj.subcategories.count()
+        count = obj.subcategories_count
         if count > 0:
             return format_html(
                 '<span style="background: #6f42c1; color: white; padding: 2px 6px; border-radius: 10px;">📂 {}</span>',
@@ -257,6 +373,7 @@ class CategoryAdmin(admin.ModelAdmin):
             )
         return "📂 0"
     get_subcategories_count.short_description = "Sous-catégories"
+    get_subcategories_count.admin_order_field = 'subcategories_count'
 
 
 class ProductImageInline(admin.TabularInline):
@@ -266,8 +383,9 @@ class ProductImageInline(admin.TabularInline):
     verbose_name_plural = "Images du produit"
 
 
-class ProductImageAdmin(admin.ModelAdmin):
+class ProductImageAdmin(AnnotatedChangelistMixin, admin.ModelAdmin):
     list_display = ['get_image_preview', 'get_products_count', 'created_at']
+    list_annotations = {'products_count': Count('products')}
     list_filter = ['created_at']
     readonly_fields = ['id', 'created_at']
     
@@ -291,7 +409,7 @@ class ProductImageAdmin(admin.ModelAdmin):
     get_image_preview.short_description = "Aperçu"
     
     def get_products_count(self, obj):
-        count = obj.products.count()
+        count = obj.products_count
         if count > 0:
             return format_html(
                 '<span style="background: #28a745; color: white; padding: 2px 6px; border-radius: 10px;">🛍️ {}</span>',
@@ -299,15 +417,26 @@ class ProductImageAdmin(admin.ModelAdmin):
             )
         return "🛍️ 0"
     get_products_count.short_description = "Produits"
+    get_products_count.admin_order_field = 'products_count'
 
 
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
     list_display = [
         'name', 'get_user_info', 'get_price', 'get_category_info', 
         'get_status', 'get_stock_status', 'get_images_count', 'created_at'
     ]
+    list_select_related = ['user', 'category', 'subcategory']
+    list_annotations = {'images_count': Count('images')}
+    actions = [
+        background_action('product_status', f"Passer les produits sélectionnés au statut « {label} »", status=value)
+        for value, label in Product.STATUS_CHOICES
+    ]
     list_filter = ['status', 'is_stock', 'category', 'subcategory', 'conditions_paiement', 'created_at']
     search_fields = ['name', 'description', 'user__nom', 'user__prenom', 'user__identifier']
+    search_exact_lookups = {'uuid': ['id'], 'identifier': ['user__identifier']}
+    search_prefix_lookups = ['user__identifier__startswith']
+    # Nom du produit ou nom du vendeur
+    search_text_relations = ('', 'user')
     readonly_fields = ['id', 'created_at', 'updated_at']
     filter_horizontal = ['images']
     
@@ -397,7 +526,7 @@ class ProductAdmin(admin.ModelAdmin):
     get_stock_status.short_description = "Stock"
     
     def get_images_count(self, obj):
-        count = obj.images.count()
+        count = obj.images_count
         if count > 0:
             return format_html(
                 '<span style="background: #6f42c1; color: white; padding: 2px 6px; border-radius: 10px;">🖼️ {}</span>',
@@ -405,6 +534,7 @@ class ProductAdmin(admin.ModelAdmin):
             )
         return "🖼️ 0"
     get_images_count.short_description = "Images"
+    get_images_count.admin_order_field = 'images_count'
 
 
 class WishlistAdmin(admin.ModelAdmin):
@@ -412,6 +542,7 @@ class WishlistAdmin(admin.ModelAdmin):
         'get_user_info', 'get_product_info', 'get_product_price',
         'get_product_status', 'created_at'
     ]
+    list_select_related = ['user', 'product']
     list_filter = ['created_at', 'product__status', 'product__category']
     search_fields = [
         'user__nom', 'user__prenom', 'user__identifier',
@@ -481,7 +612,9 @@ class NotificationAdmin(admin.ModelAdmin):
         'titre', 'get_user_info', 'get_read_status', 
         'get_content_preview', 'created_at'
     ]
+    list_select_related = ['user']
     list_filter = ['is_read', 'created_at', 'updated_at']
+    actions = [background_action('delete_notifications', "Supprimer les notifications sélectionnées (arrière-plan)")]
     search_fields = [
         'titre', 'content', 'user__nom', 'user__prenom', 'user__identifier'
     ]
@@ -528,19 +661,26 @@ class NotificationAdmin(admin.ModelAdmin):
     get_content_preview.short_description = "Aperçu"
 
 
-class VendorAdmin(admin.ModelAdmin):
+class VendorAdmin(IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
     """Admin spécialisé pour la gestion des fournisseurs (vendors)"""
     
     def get_queryset(self, request):
         # Afficher seulement les vendors
-        return CustomUser.objects.filter(user_type='vendor')
+        return super().get_queryset(request).filter(user_type='vendor')
     
     list_display = [
         'get_avatar', 'identifier', 'get_full_name', 'get_vendor_status',
         'get_product_count', 'get_location_count', 'is_active', 'date_joined'
     ]
+    list_annotations = {
+        'product_count': Count('products', distinct=True),
+        'active_product_count': Count('products', filter=Q(products__status='active'), distinct=True),
+        'location_count': Count('locations', distinct=True),
+    }
     list_filter = ['is_active', 'gender', 'date_joined']
     search_fields = ['identifier', 'nom', 'prenom', 'username']
+    search_exact_lookups = {'uuid': ['id'], 'identifier': ['identifier']}
+    search_prefix_lookups = ['identifier__startswith']
     readonly_fields = ['id', 'date_joined', 'last_login', 'user_type']
     
     fieldsets = (
@@ -570,7 +710,7 @@ class VendorAdmin(admin.ModelAdmin):
     get_full_name.short_description = "Nom Complet"
     
     def get_vendor_status(self, obj):
-        product_count = obj.products.count()
+        product_count = obj.product_count
         if product_count > 0:
             if product_count >= 10:
                 return format_html(
@@ -585,10 +725,11 @@ class VendorAdmin(admin.ModelAdmin):
                 '<span style="background: #dc3545; color: white; padding: 2px 8px; border-radius: 10px;">💤 Inactif</span>'
             )
     get_vendor_status.short_description = "Statut Vendeur"
+    get_vendor_status.admin_order_field = 'product_count'
     
     def get_product_count(self, obj):
-        count = obj.products.count()
-        active_count = obj.products.filter(status='active').count()
+        count = obj.product_count
+        active_count = obj.active_product_count
         if count > 0:
             return format_html(
                 '<span style="background: #17a2b8; color: white; padding: 2px 6px; border-radius: 10px;">🛍️ {} ({})</span>',
@@ -596,9 +737,10 @@ class VendorAdmin(admin.ModelAdmin):
             )
         return "🛍️ 0"
     get_product_count.short_description = "Produits (Actifs)"
+    get_product_count.admin_order_field = 'product_count'
     
     def get_location_count(self, obj):
-        count = obj.locations.count()
+        count = obj.location_count
         if count > 0:
             return format_html(
                 '<span style="background: #f35453; color: white; padding: 2px 6px; border-radius: 10px;">📍 {}</span>',
@@ -606,21 +748,28 @@ class VendorAdmin(admin.ModelAdmin):
             )
         return "📍 0"
     get_location_count.short_description = "Localisations"
+    get_location_count.admin_order_field = 'location_count'
 
 
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
     """Admin spécialisé pour la gestion des clients"""
     
     def get_queryset(self, request):
         # Afficher seulement les customers
-        return CustomUser.objects.filter(user_type='customer')
+        return super().get_queryset(request).filter(user_type='customer')
     
     list_display = [
         'get_avatar', 'identifier', 'get_full_name', 'get_customer_activity',
         'get_wishlist_count', 'get_location_count', 'is_active', 'date_joined'
     ]
+    list_annotations = {
+        'wishlist_count': Count('wishlists', distinct=True),
+        'location_count': Count('locations', distinct=True),
+    }
     list_filter = ['is_active', 'gender', 'date_joined']
     search_fields = ['identifier', 'nom', 'prenom', 'username']
+    search_exact_lookups = {'uuid': ['id'], 'identifier': ['identifier']}
+    search_prefix_lookups = ['identifier__startswith']
     readonly_fields = ['id', 'date_joined', 'last_login', 'user_type']
     
     fieldsets = (
@@ -650,7 +799,7 @@ class CustomerAdmin(admin.ModelAdmin):
     get_full_name.short_description = "Nom Complet"
     
     def get_customer_activity(self, obj):
-        wishlist_count = obj.wishlists.count()
+        wishlist_count = obj.wishlist_count
         if wishlist_count > 0:
             return format_html(
                 '<span style="background: #e83e8c; color: white; padding: 2px 8px; border-radius: 10px;">💝 Actif</span>'
@@ -660,9 +809,10 @@ class CustomerAdmin(admin.ModelAdmin):
                 '<span style="background: #6c757d; color: white; padding: 2px 8px; border-radius: 10px;">😴 Passif</span>'
             )
     get_customer_activity.short_description = "Activité"
+    get_customer_activity.admin_order_field = 'wishlist_count'
     
     def get_wishlist_count(self, obj):
-        count = obj.wishlists.count()
+        count = obj.wishlist_count
         if count > 0:
             return format_html(
                 '<span style="background: #e83e8c; color: white; padding: 2px 6px; border-radius: 10px;">💝 {}</span>',
@@ -670,9 +820,10 @@ class CustomerAdmin(admin.ModelAdmin):
             )
         return "💝 0"
     get_wishlist_count.short_description = "Wishlist"
+    get_wishlist_count.admin_order_field = 'wishlist_count'
     
     def get_location_count(self, obj):
-        count = obj.locations.count()
+        count = obj.location_count
         if count > 0:
             return format_html(
                 '<span style="background: #f35453; color: white; padding: 2px 6px; border-radius: 10px;">📍 {}</span>',
@@ -680,6 +831,7 @@ class CustomerAdmin(admin.ModelAdmin):
             )
         return "📍 0"
     get_location_count.short_description = "Localisations"
+    get_location_count.admin_order_field = 'location_count'
 
 
 class CartItemInline(admin.TabularInline):
@@ -689,8 +841,17 @@ class CartItemInline(admin.TabularInline):
     readonly_fields = ['total_price']
 
 
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(AnnotatedChangelistMixin, admin.ModelAdmin):
     list_display = ['get_user_info', 'get_total_items', 'get_total_amount', 'created_at']
+    list_select_related = ['user']
+    # total_items / total_amount sont des propriétés du modèle : les annotations portent un autre nom
+    list_annotations = {
+        'items_quantity': Coalesce(Sum('items__quantity'), 0),
+        'items_amount': Coalesce(
+            Sum(F('items__quantity') * F('items__product__price'), output_field=DecimalField()),
+            Value(0), output_field=DecimalField()
+        ),
+    }
     list_filter = ['created_at', 'updated_at']
     search_fields = ['user__nom', 'user__prenom', 'user__identifier']
     readonly_fields = ['id', 'total_items', 'total_amount', 'created_at', 'updated_at']
@@ -716,7 +877,7 @@ class CartAdmin(admin.ModelAdmin):
     get_user_info.short_description = "Utilisateur"
     
     def get_total_items(self, obj):
-        count = obj.total_items
+        count = obj.items_quantity
         if count > 0:
             return format_html(
                 '<span style="background: #17a2b8; color: white; padding: 2px 6px; border-radius: 10px;">🛍️ {}</span>',
@@ -724,18 +885,21 @@ class CartAdmin(admin.ModelAdmin):
             )
         return "🛍️ 0"
     get_total_items.short_description = "Articles"
+    get_total_items.admin_order_field = 'items_quantity'
     
     def get_total_amount(self, obj):
-        amount = obj.total_amount
+        amount = obj.items_amount
         return format_html(
             '<span style="background: #28a745; color: white; padding: 2px 8px; border-radius: 10px; font-weight: bold;">💰 {} FCFA</span>',
             amount
         )
     get_total_amount.short_description = "Montant Total"
+    get_total_amount.admin_order_field = 'items_amount'
 
 
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ['get_cart_user', 'get_product_info', 'quantity', 'get_total_price', 'created_at']
+    list_select_related = ['cart__user', 'product']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['cart__user__nom', 'cart__user__prenom', 'product__name']
     readonly_fields = ['id', 'total_price', 'created_at', 'updated_at']
@@ -782,10 +946,51 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ['total_price']
 
 
-class OrderAdmin(admin.ModelAdmin):
+class SalesRollupAdminMixin:
+    """
+    Les modifications faites dans l'admin contournent le suivi incrémental des ventes :
+    on recalcule en arrière-plan les journées et vendeurs concernés (sales.sales_scope).
+    sales_items_lookup relie OrderItem aux objets de l'admin.
+    """
+    sales_items_lookup = 'pk'
+
+    def get_sales_scope(self, objs):
+        ids = objs.values_list('pk', flat=True) if isinstance(objs, QuerySet) else [obj.pk for obj in objs]
+        return sales_scope(OrderItem.objects.filter(**{f'{self.sales_items_lookup}__in': ids}))
+
+    def delete_model(self, request, obj):
+        scope = self.get_sales_scope([obj])
+        super().delete_model(request, obj)
+        schedule_sales_rebuild(scope)
+
+    def delete_queryset(self, request, queryset):
+        scope = self.get_sales_scope(queryset)
+        super().delete_queryset(request, queryset)
+        schedule_sales_rebuild(scope)
+
+    def save_related(self, request, form, formsets, change):
+        # Avant et après : une ligne peut changer de vendeur ou de commande
+        scope = self.get_sales_scope([form.instance]) if change else {}
+        super().save_related(request, form, formsets, change)
+        for date, vendor_ids in self.get_sales_scope([form.instance]).items():
+            scope[date] = scope.get(date, set()) | vendor_ids
+        schedule_sales_rebuild(scope)
+
+
+class OrderAdmin(SalesRollupAdminMixin, IndexedSearchMixin, AnnotatedChangelistMixin, admin.ModelAdmin):
+    sales_items_lookup = 'order'
     list_display = ['order_number', 'get_user_info', 'get_status', 'get_total_amount', 'get_items_count', 'created_at']
+    list_select_related = ['user']
+    list_annotations = {'items_count': Count('items')}
+    actions = [
+        background_action('order_status', f"Passer les commandes sélectionnées au statut « {label} »", status=value)
+        for value, label in Order.STATUS_CHOICES
+    ]
     list_filter = ['status', 'created_at', 'updated_at']
     search_fields = ['order_number', 'user__nom', 'user__prenom', 'user__identifier']
+    search_exact_lookups = {'uuid': ['id'], 'order_number': ['order_number'], 'identifier': ['user__identifier']}
+    search_prefix_lookups = ['order_number__startswith', 'user__identifier__startswith']
+    search_text_relations = ('user',)
     readonly_fields = ['id', 'order_number', 'created_at', 'updated_at']
     inlines = [OrderItemInline]
     
@@ -846,7 +1051,7 @@ class OrderAdmin(admin.ModelAdmin):
     get_total_amount.short_description = "Montant Total"
     
     def get_items_count(self, obj):
-        count = obj.items.count()
+        count = obj.items_count
         if count > 0:
             return format_html(
                 '<span style="background: #17a2b8; color: white; padding: 2px 6px; border-radius: 10px;">📦 {}</span>',
@@ -854,12 +1059,18 @@ class OrderAdmin(admin.ModelAdmin):
             )
         return "📦 0"
     get_items_count.short_description = "Articles"
+    get_items_count.admin_order_field = 'items_count'
 
 
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(SalesRollupAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
+
     list_display = ['get_order_info', 'get_product_info', 'get_vendor_info', 'quantity', 'get_total_price', 'created_at']
+    list_select_related = ['order', 'product', 'vendor']
     list_filter = ['created_at', 'order__status']
     search_fields = ['order__order_number', 'product__name', 'vendor__nom', 'vendor__prenom']
+    search_exact_lookups = {'uuid': ['id'], 'order_number': ['order__order_number']}
+    search_prefix_lookups = ['order__order_number__startswith']
+    search_text_relations = ('product',)
     readonly_fields = ['id', 'total_price', 'created_at']
     
     fieldsets = (
@@ -906,6 +1117,7 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['get_user_info', 'get_product_info', 'get_vendor_info', 'rating', 'get_verified_status', 'created_at']
+    list_select_related = ['user', 'product', 'vendor']
     list_filter = ['rating', 'is_verified', 'created_at']
     search_fields = ['user__nom', 'user__prenom', 'product__name', 'vendor__nom', 'vendor__prenom', 'comment']
     readonly_fields = ['id', 'vendor', 'is_verified', 'created_at', 'updated_at']
@@ -959,6 +1171,7 @@ class ReviewAdmin(admin.ModelAdmin):
 
 class VendorRatingAdmin(admin.ModelAdmin):
     list_display = ['get_vendor_info', 'get_average_rating', 'total_reviews', 'get_rating_breakdown', 'updated_at']
+    list_select_related = ['vendor']
     list_filter = ['updated_at']
     search_fields = ['vendor__nom', 'vendor__prenom', 'vendor__identifier']
     readonly_fields = ['id', 'total_reviews', 'average_rating', 'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count', 'updated_at']
@@ -1004,6 +1217,52 @@ class VendorRatingAdmin(admin.ModelAdmin):
     get_rating_breakdown.short_description = "Répartition"
 
 
+class ProductRatingAdmin(admin.ModelAdmin):
+    list_display = ['get_product_info', 'get_average_rating', 'total_reviews', 'get_rating_breakdown', 'updated_at']
+    list_filter = ['updated_at']
+    search_fields = ['product__name']
+    list_select_related = ['product']
+    readonly_fields = ['id', 'total_reviews', 'average_rating', 'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count', 'updated_at']
+    
+    fieldsets = (
+        ('🛍️ Produit', {
+            'fields': ('product',)
+        }),
+        ('⭐ Statistiques de Notes', {
+            'fields': ('total_reviews', 'average_rating', 'rating_5_count', 'rating_4_count', 'rating_3_count', 'rating_2_count', 'rating_1_count')
+        }),
+        ('📊 Métadonnées', {
+            'fields': ('id', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def get_product_info(self, obj):
+        return format_html(
+            '🛍️ {}',
+            obj.product.name
+        )
+    get_product_info.short_description = "Produit"
+    
+    def get_average_rating(self, obj):
+        return format_html(
+            '<span style="background: #ffc107; color: black; padding: 2px 8px; border-radius: 10px; font-weight: bold;">⭐ {}</span>',
+            obj.average_rating
+        )
+    get_average_rating.short_description = "Note Moyenne"
+    
+    def get_rating_breakdown(self, obj):
+        return format_html(
+            '5⭐:{} | 4⭐:{} | 3⭐:{} | 2⭐:{} | 1⭐:{}',
+            obj.rating_5_count,
+            obj.rating_4_count,
+            obj.rating_3_count,
+            obj.rating_2_count,
+            obj.rating_1_count
+        )
+    get_rating_breakdown.short_description = "Répartition"
+
+
 class DeliveryOptionAdmin(admin.ModelAdmin):
     list_display = ['name', 'delivery_type', 'get_price', 'get_delivery_time', 'get_status', 'created_at']
     list_filter = ['delivery_type', 'is_active', 'created_at']
@@ -1047,10 +1306,16 @@ class DeliveryOptionAdmin(admin.ModelAdmin):
     get_status.short_description = "Statut"
 
 
-class ShipmentAdmin(admin.ModelAdmin):
+class ShipmentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['tracking_number', 'get_order_info', 'get_delivery_option', 'get_status', 'get_delivery_dates', 'created_at']
+    list_select_related = ['order', 'delivery_option']
     list_filter = ['status', 'delivery_option', 'created_at']
     search_fields = ['tracking_number', 'order__order_number']
+    search_exact_lookups = {
+        'uuid': ['id'], 'tracking_number': ['tracking_number'], 'order_number': ['order__order_number']
+    }
+    search_prefix_lookups = ['tracking_number__startswith', 'order__order_number__startswith']
+    search_text_relations = ()
     readonly_fields = ['id', 'tracking_number', 'created_at', 'updated_at']
     
     fieldsets = (
@@ -1127,6 +1392,74 @@ class ShipmentAdmin(admin.ModelAdmin):
 
 
 # Custom Admin Site Configuration
+class AdminJobAdmin(admin.ModelAdmin):
+    list_display = ['description', 'get_user_info', 'get_status', 'get_progress', 'affected', 'created_at', 'finished_at']
+    list_filter = ['status', 'operation', 'created_at']
+    list_select_related = ['user']
+    readonly_fields = [
+        'id', 'user', 'operation', 'description', 'params', 'status', 'get_progress',
+        'total', 'processed', 'affected', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at'
+    ]
+    
+    fieldsets = (
+        ('⚙️ Tâche', {
+            'fields': ('description', 'operation', 'params', 'user')
+        }),
+        ('📈 Progression', {
+            'fields': ('status', 'get_progress', 'total', 'processed', 'affected', 'error')
+        }),
+        ('📊 Métadonnées', {
+            'fields': ('id', 'created_at', 'started_at', 'updated_at', 'finished_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_user_info(self, obj):
+        if obj.user is None:
+            return "—"
+        return format_html('👤 {} {}', obj.user.prenom, obj.user.nom)
+    get_user_info.short_description = "Lancée par"
+    
+    def get_status(self, obj):
+        status_colors = {
+            'pending': '#ffc107',
+            'running': '#17a2b8',
+            'done': '#28a745',
+            'failed': '#dc3545'
+        }
+        status_icons = {
+            'pending': '⏳',
+            'running': '🔄',
+            'done': '✅',
+            'failed': '❌'
+        }
+        return format_html(
+            '<span style="background: {}; color: white; padding: 2px 8px; border-radius: 10px;">{} {}</span>',
+            status_colors.get(obj.status, '#6c757d'),
+            status_icons.get(obj.status, '❓'),
+            obj.get_status_display()
+        )
+    get_status.short_description = "Statut"
+    
+    def get_progress(self, obj):
+        return format_html(
+            '<div style="width: 120px; background: #e9ecef; border-radius: 10px;">'
+            '<div style="width: {}%; background: #28a745; color: white; border-radius: 10px; text-align: center;">{}%</div>'
+            '</div> {} / {}',
+            obj.progress,
+            obj.progress,
+            obj.processed,
+            obj.total
+        )
+    get_progress.short_description = "Progression"
+
+
 class EstuaireAdminSite(admin.AdminSite):
     site_header = "🏢 ESTUAIRE Administration"
     site_title = "ESTUAIRE Admin"
@@ -1142,21 +1475,10 @@ class EstuaireAdminSite(admin.AdminSite):
     def index(self, request, extra_context=None):
         extra_context = extra_context or {}
         
-        # Add dashboard stats to admin index
+        # Statistiques servies depuis le dernier instantané (voir platform_stats)
+        stats = get_platform_stats().data
         extra_context.update({
-            'dashboard_stats': {
-                'total_users': CustomUser.objects.count(),
-                'total_vendors': CustomUser.objects.filter(user_type='vendor').count(),
-                'total_customers': CustomUser.objects.filter(user_type='customer').count(),
-                'active_vendors': CustomUser.objects.filter(user_type='vendor', products__isnull=False).distinct().count(),
-                'total_locations': Location.objects.count(),
-                'active_tokens': UserToken.objects.filter(is_active=True).count(),
-                'total_products': Product.objects.count(),
-                'active_products': Product.objects.filter(status='active').count(),
-                'total_wishlists': Wishlist.objects.count(),
-                'total_notifications': Notification.objects.count(),
-                'unread_notifications': Notification.objects.filter(is_read=False).count(),
-            },
+            'dashboard_stats': {key: stats[key] for key in INDEX_STAT_KEYS},
             'quick_links': [
                 {
                     'title': '📊 Dashboard Achat',
@@ -1264,8 +1586,10 @@ estuaire_admin_site.register(Order, OrderAdmin)
 estuaire_admin_site.register(OrderItem, OrderItemAdmin)
 estuaire_admin_site.register(Review, ReviewAdmin)
 estuaire_admin_site.register(VendorRating, VendorRatingAdmin)
+estuaire_admin_site.register(ProductRating, ProductRatingAdmin)
 estuaire_admin_site.register(DeliveryOption, DeliveryOptionAdmin)
 estuaire_admin_site.register(Shipment, ShipmentAdmin)
+estuaire_admin_site.register(AdminJob, AdminJobAdmin)
 
 # Re-register Django's built-in models with our custom admin
 from django.contrib.auth.models import Group
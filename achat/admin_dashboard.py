@@ -4,9 +4,8 @@ from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
-from django.db.models import Count, Q
-from datetime import datetime, timedelta
-from .models import CustomUser, Location, UserToken, Category, SubCategory
+from .models import CustomUser, Location, Category, SubCategory
+from .platform_stats import get_platform_stats
 
 
 @method_decorator(staff_member_required, name='dispatch')
@@ -16,32 +15,12 @@ class AchatDashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get current date for calculations
-        now = datetime.now()
-        last_week = now - timedelta(days=7)
-        last_month = now - timedelta(days=30)
-        
-        # User statistics
-        total_users = CustomUser.objects.count()
-        new_users_week = CustomUser.objects.filter(date_joined__gte=last_week).count()
-        new_users_month = CustomUser.objects.filter(date_joined__gte=last_month).count()
-        active_tokens = UserToken.objects.count()
-        
-        # Gender distribution
-        gender_stats = CustomUser.objects.values('gender').annotate(count=Count('gender'))
-        
-        # Location statistics
-        total_locations = Location.objects.count()
-        default_locations = Location.objects.filter(is_default=True).count()
-        top_cities = Location.objects.values('name').annotate(
-            count=Count('name')
-        ).order_by('-count')[:5]
-        
-        # Category statistics
-        total_categories = Category.objects.count()
-        active_categories = Category.objects.filter(is_active=True).count()
-        total_subcategories = SubCategory.objects.count()
-        active_subcategories = SubCategory.objects.filter(is_active=True).count()
+        # Compteurs lus depuis le dernier instantané (voir platform_stats)
+        snapshot = get_platform_stats()
+        stats = snapshot.data
+        total_users = stats['total_users']
+        new_users_month = stats['new_users_month']
+        total_locations = stats['total_locations']
         
         # Recent activity
         recent_users = CustomUser.objects.order_by('-date_joined')[:5]
@@ -52,23 +31,23 @@ class AchatDashboardView(TemplateView):
         context.update({
             # User metrics
             'total_users': total_users,
-            'new_users_week': new_users_week,
+            'new_users_week': stats['new_users_week'],
             'new_users_month': new_users_month,
-            'active_tokens': active_tokens,
+            'active_tokens': stats['total_tokens'],
             
             # Gender distribution
-            'gender_stats': gender_stats,
+            'gender_stats': stats['gender_stats'],
             
             # Location metrics
             'total_locations': total_locations,
-            'default_locations': default_locations,
-            'top_cities': top_cities,
+            'default_locations': stats['default_locations'],
+            'top_cities': stats['top_cities'],
             
             # Category metrics
-            'total_categories': total_categories,
-            'active_categories': active_categories,
-            'total_subcategories': total_subcategories,
-            'active_subcategories': active_subcategories,
+            'total_categories': stats['total_categories'],
+            'active_categories': stats['active_categories'],
+            'total_subcategories': stats['total_subcategories'],
+            'active_subcategories': stats['active_subcategories'],
             
             # Recent activity
             'recent_users': recent_users,
@@ -82,7 +61,7 @@ class AchatDashboardView(TemplateView):
             
             # System info
             'dashboard_title': '📊 Dashboard Achat - ESTUAIRE',
-            'last_updated': now,
+            'last_updated': snapshot.computed_at,
         })
         
         return context
@@ -0,0 +1,155 @@
+"""
+Actions d'administration en masse exécutées en arrière-plan.
+
+L'action admin enregistre un AdminJob puis planifie run_admin_job() sur le worker (achat.tasks) :
+la requête rend la main immédiatement. Le job traite les lignes sélectionnées par lots de
+ACHAT_ADMIN_JOB_CHUNK_SIZE, une transaction et des mises à jour groupées par lot, et enregistre
+sa progression après chaque lot (liste « Tâches d'administration »).
+
+Les opérations contournent save()/delete() : chacune maintient elle-même les compteurs et les
+caches que les signaux auraient mis à jour.
+
+Limite : le worker vit dans le processus web et les ids à traiter ne sont gardés qu'en mémoire.
+Un job interrompu par un redémarrage ne reprend pas ; les lots déjà validés restent appliqués.
+La commande fail_stale_admin_jobs (à planifier) marque en échec les jobs en attente ou en cours
+sans activité depuis ACHAT_ADMIN_JOB_STALE_AFTER secondes, l'action peut alors être relancée.
+Un job ainsi marqué s'arrête avant son lot suivant s'il tournait encore.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog_counts import apply_product_changes
+from .category_tree import invalidate_category_tree
+from .dashboard_cache import bump_dashboard_versions
+from .models import AdminJob, Notification, Order, OrderItem, Product, ProductPriceHistory, UserToken
+from .notifications import refresh_counts
+from .price_alerts import history_entry
+from .sales import rebuild_sales_scope, sales_scope
+from .tasks import enqueue
+from .token_cache import get_token_cache
+
+logger = logging.getLogger(__name__)
+
+# nom -> fonction(ids du lot, **params) retournant le nombre de lignes modifiées
+OPERATIONS = {}
+
+
+def operation(name):
+    def register(func):
+        OPERATIONS[name] = func
+        return func
+    return register
+
+
+@operation('product_status')
+def set_product_status(object_ids, status):
+    rows = list(
+        Product.objects.select_for_update().filter(pk__in=object_ids).exclude(status=status).values(
+            'id', 'user_id', *Product.TRACKED_FIELDS
+        )
+    )
+    if not rows:
+        return 0
+
+    Product.objects.filter(pk__in=[row['id'] for row in rows]).update(status=status, updated_at=timezone.now())
+    changes = [(row, {**row, 'status': status}) for row in rows]
+    apply_product_changes(changes)
+    ProductPriceHistory.objects.bulk_create([
+        entry for entry in (history_entry(old['id'], old, new) for old, new in changes) if entry is not None
+    ])
+    bump_dashboard_versions([row['user_id'] for row in rows])
+    invalidate_category_tree()
+    return len(rows)
+
+
+@operation('order_status')
+def set_order_status(object_ids, status):
+    orders = list(
+        Order.objects.select_for_update().filter(pk__in=object_ids).exclude(status=status).values_list('id', 'user_id')
+    )
+    if not orders:
+        return 0
+
+    order_ids = [order_id for order_id, _ in orders]
+    Order.objects.filter(pk__in=order_ids).update(status=status, updated_at=timezone.now())
+    # Même recalcul que les modifications de commandes faites dans l'admin (SalesRollupAdminMixin),
+    # limité aux journées et vendeurs des commandes du lot
+    scope = sales_scope(OrderItem.objects.filter(order_id__in=order_ids))
+    rebuild_sales_scope(scope)
+    vendor_ids = set().union(*scope.values())
+    bump_dashboard_versions([user_id for _, user_id in orders] + list(vendor_ids))
+    return len(orders)
+
+
+@operation('deactivate_tokens')
+def deactivate_tokens(object_ids):
+    tokens = list(
+        UserToken.objects.select_for_update().filter(pk__in=object_ids, is_active=True).values_list('id', 'token')
+    )
+    if not tokens:
+        return 0
+
+    UserToken.objects.filter(pk__in=[token_id for token_id, _ in tokens]).update(
+        is_active=False, updated_at=timezone.now()
+    )
+    get_token_cache().invalidate(*[token for _, token in tokens])
+    return len(tokens)
+
+
+@operation('delete_notifications')
+def delete_notifications(object_ids):
+    user_ids = set(Notification.objects.filter(pk__in=object_ids).values_list('user_id', flat=True))
+    deleted, _ = Notification.objects.filter(pk__in=object_ids).delete()
+    refresh_counts(user_ids)
+    return deleted
+
+
+def run_admin_job(job_id, object_ids):
+    job = AdminJob.objects.get(pk=job_id)
+    func = OPERATIONS[job.operation]
+    chunk_size = getattr(settings, 'ACHAT_ADMIN_JOB_CHUNK_SIZE', 500)
+    # Mises à jour conditionnelles : un job déclaré interrompu (fail_stale_admin_jobs) n'est pas repris
+    jobs = AdminJob.objects.filter(pk=job_id, status='running')
+    if not AdminJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now(), updated_at=timezone.now()
+    ):
+        return
+
+    processed = affected = 0
+    try:
+        for start in range(0, len(object_ids), chunk_size):
+            chunk = object_ids[start:start + chunk_size]
+            with transaction.atomic():
+                affected += func(chunk, **job.params)
+            processed += len(chunk)
+            if not jobs.update(processed=processed, affected=affected, updated_at=timezone.now()):
+                return
+    except Exception as exc:
+        logger.exception("Échec de la tâche d'administration %s", job_id)
+        jobs.update(status='failed', error=str(exc), finished_at=timezone.now(), updated_at=timezone.now())
+        return
+    jobs.update(status='done', finished_at=timezone.now(), updated_at=timezone.now())
+
+
+def fail_stale_jobs(max_age):
+    """Marque en échec les jobs en attente ou en cours sans activité depuis max_age. Retourne leur nombre."""
+    now = timezone.now()
+    return AdminJob.objects.filter(status__in=['pending', 'running'], updated_at__lt=now - max_age).update(
+        status='failed', error="Interrompue : aucune activité (redémarrage du processus ?)",
+        finished_at=now, updated_at=now
+    )
+
+
+def start_admin_job(operation_name, description, queryset, user=None, **params):
+    """Enregistre le job pour les lignes du queryset et le planifie. Retourne l'AdminJob."""
+    if operation_name not in OPERATIONS:
+        raise ValueError(f"Opération inconnue: {operation_name}")
+    object_ids = list(queryset.values_list('pk', flat=True))
+    job = AdminJob.objects.create(
+        user=user, operation=operation_name, description=description, params=params, total=len(object_ids)
+    )
+    enqueue(run_admin_job, job.pk, object_ids)
+    return job
@@ -0,0 +1,84 @@
+"""
+Recherche de l'administration (barre de recherche des listes et search_model de Jazzmin).
+
+Une saisie qui ressemble à une clé (UUID, numéro de commande EST…, numéro de suivi SHIP…,
+email ou téléphone) est résolue par une égalité sur une colonne indexée. Une autre saisie est
+aussi cherchée comme début de ces colonnes (numéro de commande ou identifiant partiel, par un
+startswith qui reste indexable). Sous PostgreSQL, le texte libre passe par l'index plein texte
+(GIN sur SearchVector, migration 0024) avec une correspondance par préfixe de mot ; les autres
+bases se limitent à un préfixe des colonnes (istartswith), sans recherche au milieu du texte. Les résultats sont plafonnés à ACHAT_ADMIN_SEARCH_LIMIT lignes.
+"""
+import re
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+from django.db.models import Q
+
+from .models import Category, CustomUser, Location, Product, SubCategory
+
+KIND_UUID = 'uuid'
+KIND_ORDER_NUMBER = 'order_number'
+KIND_TRACKING_NUMBER = 'tracking_number'
+KIND_IDENTIFIER = 'identifier'
+
+ORDER_NUMBER_RE = re.compile(r'^EST\d{8,}$', re.IGNORECASE)
+TRACKING_NUMBER_RE = re.compile(r'^SHIP\d{8,}$', re.IGNORECASE)
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+PHONE_RE = re.compile(r'^\+?\d{8,15}$')
+WORD_RE = re.compile(r'\w+')
+
+# Colonnes couvertes par l'index plein texte de chaque modèle (même ordre que dans la migration)
+FULLTEXT_FIELDS = {
+    CustomUser: ('nom', 'prenom'),
+    Product: ('name', 'description'),
+    Location: ('name',),
+    Category: ('name', 'name_trl', 'description'),
+    SubCategory: ('name', 'name_trl', 'description'),
+}
+
+
+def classify(term):
+    """Retourne (type, valeur normalisée) pour une saisie qui ressemble à une clé, sinon (None, term)"""
+    try:
+        return KIND_UUID, uuid.UUID(term)
+    except ValueError:
+        pass
+    if ORDER_NUMBER_RE.match(term):
+        return KIND_ORDER_NUMBER, term.upper()
+    if TRACKING_NUMBER_RE.match(term):
+        return KIND_TRACKING_NUMBER, term.upper()
+    if EMAIL_RE.match(term) or PHONE_RE.match(term):
+        return KIND_IDENTIFIER, term
+    return None, term
+
+
+def search_vector(model):
+    """Expression indexée (migration 0024) : la requête doit la reproduire à l'identique pour utiliser l'index"""
+    return SearchVector(*FULLTEXT_FIELDS[model], config='simple')
+
+
+def text_matches(model, term):
+    """
+    Queryset des lignes de model correspondant au texte libre. PostgreSQL : chaque mot de term
+    préfixe un mot des colonnes plein texte. Autres bases : term préfixe l'une de ces colonnes.
+    """
+    model = model._meta.concrete_model
+    words = WORD_RE.findall(term)
+    queryset = model._default_manager.all()
+    if not words:
+        return queryset.none()
+
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(' & '.join(f"{word}:*" for word in words), config='simple', search_type='raw')
+        return queryset.annotate(fulltext=search_vector(model)).filter(fulltext=query)
+
+    condition = Q()
+    for field in FULLTEXT_FIELDS[model]:
+        condition |= Q(**{f'{field}__istartswith': term})
+    return queryset.filter(condition)
+
+
+def search_limit():
+    return getattr(settings, 'ACHAT_ADMIN_SEARCH_LIMIT', 200)
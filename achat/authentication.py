@@ -1,8 +1,13 @@
+import uuid
+
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from .hashing import check_user_password
 from .models import UserToken
+from .token_cache import get_last_seen_recorder, get_token_cache
 
 User = get_user_model()
 
@@ -17,7 +22,7 @@ class CustomAuthBackend(BaseBackend):
         
         try:
             user = User.objects.get(identifier=identifier)
-            if user.check_password(password):
+            if check_user_password(user, password):
                 return user
         except User.DoesNotExist:
             return None
@@ -43,10 +48,35 @@ class UUIDTokenAuthentication(BaseAuthentication):
         
         try:
             token = auth_header.split(' ')[1]
+        except IndexError:
+            raise AuthenticationFailed('Token invalide ou inactif')
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        try:
+            token = str(uuid.UUID(token))
+        except (TypeError, ValueError):
+            raise AuthenticationFailed('Token invalide ou inactif')
+
+        # Chemin courant : token résolu depuis le cache, sans requête SQL
+        token_cache = get_token_cache()
+        cached = token_cache.get(token)
+        if cached is not None:
+            user, user_token, token_id = cached
+            get_last_seen_recorder().record(token_id)
+            return (user, user_token)
+
+        try:
             user_token = UserToken.objects.select_related('user').get(token=token, is_active=True)
-            return (user_token.user, user_token.token)
-        except (UserToken.DoesNotExist, IndexError, ValueError):
+        except (UserToken.DoesNotExist, ValidationError, ValueError):
             raise AuthenticationFailed('Token invalide ou inactif')
 
+        if user_token.is_expired:
+            raise AuthenticationFailed('Token expiré')
+
+        token_cache.set(token, user_token.user, user_token.token, user_token.id, user_token.expires_at)
+        get_last_seen_recorder().record(user_token.id)
+        return (user_token.user, user_token.token)
+
     def authenticate_header(self, request):
         return 'Bearer'
\ No newline at end of file
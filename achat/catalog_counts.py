@@ -0,0 +1,109 @@
+"""
+Compteurs de produits par catégorie / sous-catégorie et par statut.
+
+Maintenus dans la transaction de Product.save() (création, changement de statut ou de
+catégorie) et au post_delete des produits ; rebuild_product_counts() les recalcule
+(commande rebuild_product_counts) après des écritures en masse qui contournent save().
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category, CategoryProductCount, Product, SubCategory, SubCategoryProductCount
+
+# Modèle compteur et nom de la clé étrangère, par type de nœud
+COUNTERS = {
+    Category: (CategoryProductCount, 'category'),
+    SubCategory: (SubCategoryProductCount, 'subcategory'),
+}
+
+
+def _add(model, key, delta):
+    if model.objects.filter(**key).update(count=F('count') + delta) or delta < 0:
+        # Jamais de création sur un décrément : la ligne peut avoir été supprimée en cascade
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, count=delta)
+    except IntegrityError:
+        # Créée entre-temps par une autre requête
+        model.objects.filter(**key).update(count=F('count') + delta)
+
+
+def _apply(state, delta):
+    category_id, subcategory_id, status = state
+    if category_id:
+        _add(CategoryProductCount, {'category_id': category_id, 'status': status}, delta)
+    if subcategory_id:
+        _add(SubCategoryProductCount, {'subcategory_id': subcategory_id, 'status': status}, delta)
+
+
+def apply_product_change(old_values, new_values):
+    """Valeurs de Product.TRACKED_FIELDS avant/après ; None pour une création ou suppression"""
+    old_state, new_state = (
+        None if values is None else tuple(values[field] for field in Product.COUNTED_FIELDS)
+        for values in (old_values, new_values)
+    )
+    if old_state == new_state:
+        return
+    if old_state is not None:
+        _apply(old_state, -1)
+    if new_state is not None:
+        _apply(new_state, 1)
+
+
+def apply_product_changes(changes):
+    """
+    Version groupée d'apply_product_change pour des mises à jour en masse :
+    changes est une liste de (anciennes valeurs, nouvelles valeurs), une écriture par compteur touché.
+    """
+    deltas = Counter()
+    for old_values, new_values in changes:
+        for values, sign in ((old_values, -1), (new_values, 1)):
+            if values is not None:
+                deltas[tuple(values[field] for field in Product.COUNTED_FIELDS)] += sign
+    for state, delta in deltas.items():
+        if delta:
+            _apply(state, delta)
+
+
+def rebuild_product_counts():
+    """Recalcule tous les compteurs en deux requêtes groupées. Retourne (lignes catégorie, lignes sous-catégorie)"""
+    category_counts = [
+        CategoryProductCount(**row)
+        for row in Product.objects.filter(category__isnull=False).values(
+            'category_id', 'status'
+        ).annotate(count=Count('id')).order_by()
+    ]
+    subcategory_counts = [
+        SubCategoryProductCount(**row)
+        for row in Product.objects.filter(subcategory__isnull=False).values(
+            'subcategory_id', 'status'
+        ).annotate(count=Count('id')).order_by()
+    ]
+
+    with transaction.atomic():
+        CategoryProductCount.objects.all().delete()
+        SubCategoryProductCount.objects.all().delete()
+        CategoryProductCount.objects.bulk_create(category_counts, batch_size=1000)
+        SubCategoryProductCount.objects.bulk_create(subcategory_counts, batch_size=1000)
+
+    return len(category_counts), len(subcategory_counts)
+
+
+def with_product_counts(queryset, status='active'):
+    """Annote products_count (produits du statut donné) sur un queryset de Category ou SubCategory"""
+    counter, node_field = COUNTERS[queryset.model]
+    return queryset.annotate(products_count=Coalesce(
+        Subquery(counter.objects.filter(**{node_field: OuterRef('pk'), 'status': status}).values('count')[:1]),
+        Value(0)
+    ))
+
+
+def categories_with_counts(status='active'):
+    """Catégories et sous-catégories préchargées, annotées de leurs compteurs (deux requêtes)"""
+    return with_product_counts(Category.objects.prefetch_related(
+        Prefetch('subcategories', queryset=with_product_counts(SubCategory.objects.all(), status))
+    ), status)
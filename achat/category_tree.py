@@ -0,0 +1,84 @@
+"""
+Arbre des catégories matérialisé : catégories, sous-catégories et nombre de produits actifs
+par nœud (compteurs de catalog_counts), construit en deux requêtes et gardé en mémoire du processus.
+
+Les écritures sur Category, SubCategory et Product (signaux) vident la copie locale et, à la
+validation de leur transaction, incrémentent une version partagée stockée en base (CacheVersion) ;
+les autres processus comparent leur version au plus toutes les ACHAT_CATEGORY_TREE_CHECK_INTERVAL
+secondes. La version étant lue avant la construction, un arbre construit à partir de données
+pas encore validées porte l'ancienne version et sera reconstruit.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .catalog_counts import categories_with_counts
+from .models import CacheVersion
+
+VERSION_NAME = 'category_tree'
+
+_lock = threading.Lock()
+_tree = None  # (version, vérifiée à, catégories)
+_generation = 0
+
+
+def current_version():
+    return CacheVersion.objects.filter(name=VERSION_NAME).values_list('version', flat=True).first() or 0
+
+
+def _bump_version():
+    versions = CacheVersion.objects.filter(name=VERSION_NAME)
+    if not versions.update(version=F('version') + 1):
+        CacheVersion.objects.get_or_create(name=VERSION_NAME)
+        versions.update(version=F('version') + 1)
+
+
+def build_category_tree():
+    """Catégories sérialisées (CategorySerializer) avec les compteurs de produits actifs"""
+    from .serializers import CategorySerializer
+
+    return CategorySerializer(categories_with_counts().order_by('name'), many=True).data
+
+
+def get_category_tree():
+    global _tree
+    entry = _tree
+    interval = getattr(settings, 'ACHAT_CATEGORY_TREE_CHECK_INTERVAL', 5)
+    if entry is not None and time.monotonic() - entry[1] < interval:
+        return entry[2]
+
+    version = current_version()
+    if entry is not None and entry[0] == version:
+        _tree = (version, time.monotonic(), entry[2])
+        return entry[2]
+
+    with _lock:
+        entry = _tree
+        if entry is not None and entry[0] == version:
+            return entry[2]
+        generation = _generation
+        categories = build_category_tree()
+        # Une invalidation pendant la construction rend cet arbre déjà périmé : on ne le garde pas
+        if generation == _generation:
+            _tree = (version, time.monotonic(), categories)
+    return categories
+
+
+def _discard_local_tree():
+    global _tree, _generation
+    _generation += 1
+    _tree = None
+
+
+def _publish_invalidation():
+    _bump_version()
+    # Un arbre reconstruit par ce processus avant la validation contient les anciennes données
+    _discard_local_tree()
+
+
+def invalidate_category_tree():
+    _discard_local_tree()
+    transaction.on_commit(_publish_invalidation)
@@ -0,0 +1,111 @@
+"""
+Cache des réponses des tableaux de bord, par utilisateur et par action.
+
+Chaque utilisateur a une version de cache, changée (bump_dashboard_versions) dès que ses
+commandes, avis, produits, wishlist ou panier changent : les clés versionnées rendent alors
+les anciennes réponses inaccessibles. Une réponse plus vieille que ACHAT_DASHBOARD_CACHE_TTL
+mais de même version est servie telle quelle pendant son recalcul en arrière-plan
+(stale-while-revalidate), jusqu'à ACHAT_DASHBOARD_CACHE_STALE_TTL.
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .tasks import enqueue
+
+VERSION_PREFIX = 'achat:dashboard_version'
+RESPONSE_PREFIX = 'achat:dashboard'
+
+
+def version_key(user_id):
+    return f"{VERSION_PREFIX}:{user_id}"
+
+
+def get_dashboard_version(user_id):
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Version aléatoire : une version évincée du cache ne peut pas ressusciter d'anciennes réponses
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_dashboard_versions(user_ids):
+    """
+    Change la version des utilisateurs à la validation de la transaction en cours (immédiatement
+    hors transaction) : changée plus tôt, une lecture concurrente des anciennes données pourrait
+    être mise en cache sous la nouvelle version.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if user_ids:
+        transaction.on_commit(
+            lambda: cache.set_many({version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+        )
+
+
+def response_key(request, view, version):
+    params = hashlib.md5(request.query_params.urlencode().encode()).hexdigest()
+    return f"{RESPONSE_PREFIX}:{request.user.pk}:{view.basename}:{view.action}:{params}:{version}"
+
+
+def _store(key, data):
+    fresh_ttl = getattr(settings, 'ACHAT_DASHBOARD_CACHE_TTL', 300)
+    stale_ttl = getattr(settings, 'ACHAT_DASHBOARD_CACHE_STALE_TTL', 3600)
+    cache.set(key, {'data': data, 'fresh_until': time.time() + fresh_ttl}, fresh_ttl + stale_ttl)
+
+
+def _refresh(func, view_class, action, user_id, query_string, key):
+    """
+    Recalcul en arrière-plan. La requête d'origine est terminée (et son utilisateur a pu changer) :
+    la vue est reconstruite à partir de l'id de l'utilisateur et des paramètres de la requête.
+    """
+    try:
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            return
+        http_request = HttpRequest()
+        http_request.method = 'GET'
+        http_request.GET = QueryDict(query_string)
+        request = Request(http_request)
+        request.user = user
+        view = view_class(action=action, request=request, format_kwarg=None)
+        response = func(view, request)
+        if response.status_code == status.HTTP_200_OK:
+            _store(key, response.data)
+    finally:
+        cache.delete(f"{key}:refreshing")
+
+
+def cached_dashboard(func):
+    """Décorateur pour les actions GET des ViewSets de tableau de bord"""
+
+    @wraps(func)
+    def wrapper(view, request, *args, **kwargs):
+        key = response_key(request, view, get_dashboard_version(request.user.pk))
+        entry = cache.get(key)
+
+        if entry is not None:
+            # Un seul recalcul en arrière-plan à la fois pour une même clé
+            if entry['fresh_until'] < time.time() and cache.add(f"{key}:refreshing", 1, 60):
+                enqueue(
+                    _refresh, func, type(view), view.action, request.user.pk, request.query_params.urlencode(), key
+                )
+            return Response(entry['data'])
+
+        response = func(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            _store(key, response.data)
+        return response
+
+    return wrapper
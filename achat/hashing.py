@@ -0,0 +1,110 @@
+"""
+Pool borné pour le hachage des mots de passe (PBKDF2).
+
+Le hachage est coûteux en CPU : on le limite à ACHAT_PASSWORD_HASHING_WORKERS threads
+(hashlib libère le GIL pendant PBKDF2) et à une file d'attente bornée, afin qu'un pic de
+connexions ne prive pas le reste de l'API de CPU. Au-delà, PasswordHashingBusy est levée.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PasswordHashingBusy(Exception):
+    """Le pool de hachage est saturé : la requête doit être réessayée plus tard"""
+
+
+class PasswordHashingPool:
+
+    def __init__(self, workers=None, queue_size=None, wait_timeout=None):
+        self.workers = workers or getattr(settings, 'ACHAT_PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+        queue_size = queue_size if queue_size is not None else getattr(settings, 'ACHAT_PASSWORD_HASHING_QUEUE', 64)
+        self.wait_timeout = wait_timeout if wait_timeout is not None else getattr(
+            settings, 'ACHAT_PASSWORD_HASHING_WAIT', 2
+        )
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='achat-hashing')
+
+    def submit(self, func, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHashingBusy("Trop de requêtes d'authentification en cours")
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, func, *args):
+        return self.submit(func, *args).result()
+
+    async def arun(self, func, *args):
+        # L'attente d'un créneau se fait hors de la boucle d'événements
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(None, self.submit, func, *args)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordHashingPool()
+    return _pool
+
+
+def verify_password(raw_password, encoded):
+    # Sans setter : une éventuelle mise à niveau du hash est enregistrée par l'appelant
+    if not hashers.check_password(raw_password, encoded):
+        return False, None
+    if hashers.identify_hasher(encoded).must_update(encoded):
+        return True, hashers.make_password(raw_password)
+    return True, None
+
+
+def hash_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    return get_hashing_pool().run(hashers.make_password, raw_password)
+
+
+async def ahash_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    return await get_hashing_pool().arun(hashers.make_password, raw_password)
+
+
+def set_password(user, raw_password):
+    """Équivalent de user.set_password() avec le hachage exécuté dans le pool"""
+    user.password = hash_password(raw_password)
+    user._password = raw_password
+
+
+def check_user_password(user, raw_password):
+    """Équivalent de user.check_password() avec le hachage exécuté dans le pool"""
+    valid, upgraded = get_hashing_pool().run(verify_password, raw_password, user.password)
+    if upgraded:
+        user.password = upgraded
+        user.save(update_fields=['password'])
+    return valid
+
+
+async def acheck_user_password(user, raw_password):
+    valid, upgraded = await get_hashing_pool().arun(verify_password, raw_password, user.password)
+    if upgraded:
+        user.password = upgraded
+        await user.asave(update_fields=['password'])
+    return valid
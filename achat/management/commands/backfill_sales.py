@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from achat.models import Order
+from achat.sales import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule les tables VendorDailySales et ProductDailySales depuis les lignes de commande"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Première date à recalculer (AAAA-MM-JJ, défaut : première commande)")
+        parser.add_argument('--end', help="Dernière date à recalculer (AAAA-MM-JJ, défaut : dernière commande)")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Nombre de jours recalculés par lot")
+
+    def parse_date(self, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Date invalide: {value}")
+
+    def handle(self, *args, **options):
+        bounds = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        if bounds['first'] is None and not (options['start'] and options['end']):
+            self.stdout.write("Aucune commande à agréger")
+            return
+
+        start = self.parse_date(options['start']) if options['start'] else timezone.localdate(bounds['first'])
+        end = self.parse_date(options['end']) if options['end'] else timezone.localdate(bounds['last'])
+        if start > end:
+            raise CommandError("--start doit précéder --end")
+
+        total_vendor_rows = total_product_rows = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), end)
+            vendor_rows, product_rows = rebuild_sales_rollups(chunk_start, chunk_end)
+            total_vendor_rows += vendor_rows
+            total_product_rows += product_rows
+            self.stdout.write(f"{chunk_start} → {chunk_end}: {vendor_rows} ligne(s) vendeur, {product_rows} ligne(s) produit")
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_vendor_rows} ligne(s) vendeur et {total_product_rows} ligne(s) produit recalculées"
+        ))
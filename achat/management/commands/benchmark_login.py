@@ -0,0 +1,54 @@
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+from achat.hashing import PasswordHashingBusy, PasswordHashingPool, verify_password
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit de vérification des mots de passe (connexions/s, total et par cœur)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Nombre de vérifications à effectuer")
+        parser.add_argument('--concurrency', type=int, default=32, help="Nombre de clients simultanés")
+        parser.add_argument('--workers', type=int, default=None, help="Taille du pool de hachage (défaut : paramètres)")
+
+    def handle(self, *args, **options):
+        encoded = hashers.make_password('benchmark-password')
+        pool = PasswordHashingPool(workers=options['workers'], queue_size=options['requests'])
+        latencies = []
+        rejected = 0
+
+        def login():
+            started = time.perf_counter()
+            pool.run(verify_password, 'benchmark-password', encoded)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as clients:
+            for future in [clients.submit(login) for _ in range(options['requests'])]:
+                try:
+                    latencies.append(future.result())
+                except PasswordHashingBusy:
+                    rejected += 1
+        elapsed = time.perf_counter() - started
+        pool.shutdown()
+
+        throughput = len(latencies) / elapsed
+        cores = min(pool.workers, os.cpu_count() or 1)
+        latencies.sort()
+        self.stdout.write(f"Hasher: {hashers.identify_hasher(encoded).algorithm}")
+        self.stdout.write(f"Workers: {pool.workers} / cœurs: {os.cpu_count()}")
+        self.stdout.write(f"Connexions: {len(latencies)} en {elapsed:.2f}s ({rejected} rejetée(s))")
+        self.stdout.write(self.style.SUCCESS(
+            f"Débit: {throughput:.1f} connexions/s, {throughput / cores:.1f} connexions/s par cœur"
+        ))
+        if latencies:
+            self.stdout.write(
+                f"Latence: p50 {statistics.median(latencies) * 1000:.0f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms"
+            )
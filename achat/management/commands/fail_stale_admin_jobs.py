@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from achat.admin_jobs import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Marque en échec les tâches d'administration interrompues (en attente ou en cours sans activité)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after', type=int, default=getattr(settings, 'ACHAT_ADMIN_JOB_STALE_AFTER', 1800),
+            help="Secondes sans activité au-delà desquelles une tâche est considérée interrompue"
+        )
+
+    def handle(self, *args, **options):
+        failed = fail_stale_jobs(timedelta(seconds=options['stale_after']))
+        self.stdout.write(self.style.SUCCESS(f"{failed} tâche(s) marquée(s) en échec"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from achat.notifications import expired_notifications, get_retention_policy, prune_notifications
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les notifications dépassant la durée de conservation (ACHAT_NOTIFICATION_RETENTION)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Nombre de notifications supprimées par lot")
+        parser.add_argument('--pause', type=float, default=0.0, help="Pause en secondes entre deux lots")
+        parser.add_argument('--max-batches', type=int, default=None, help="Nombre maximum de lots par état (lues, non lues) pour cette exécution")
+        parser.add_argument('--dry-run', action='store_true', help="Compte les notifications expirées sans les supprimer")
+
+    def handle(self, *args, **options):
+        policy = get_retention_policy()
+        self.stdout.write(f"Politique de rétention (jours): {policy}")
+
+        if options['dry_run']:
+            for state, queryset in expired_notifications().items():
+                self.stdout.write(f"{state}: {queryset.count()} notification(s) expirée(s)")
+            return
+
+        deleted = prune_notifications(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            max_batches=options['max_batches'],
+        )
+        for state, count in deleted.items():
+            self.stdout.write(self.style.SUCCESS(f"{state}: {count} notification(s) supprimée(s)"))
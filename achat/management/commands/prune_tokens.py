@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from achat.models import UserToken
+from achat.token_cache import get_last_seen_recorder
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les tokens expirés ou révoqués depuis plus de --grace-days jours"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Nombre de tokens supprimés par lot")
+        parser.add_argument('--grace-days', type=int, default=7, help="Délai de conservation après expiration ou révocation")
+        parser.add_argument('--dry-run', action='store_true', help="Compte les tokens concernés sans les supprimer")
+
+    def handle(self, *args, **options):
+        # Les dernières activités en attente peuvent prolonger des tokens : on les écrit d'abord
+        get_last_seen_recorder().flush()
+
+        cutoff = timezone.now() - timedelta(days=options['grace_days'])
+        stale = UserToken.objects.filter(expires_at__lt=cutoff) | UserToken.objects.filter(
+            is_active=False, updated_at__lt=cutoff
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"{stale.count()} token(s) à supprimer")
+            return
+
+        deleted = 0
+        while True:
+            ids = list(stale.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            UserToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"{deleted} token(s) supprimé(s)"))
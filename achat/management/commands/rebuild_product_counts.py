@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from achat.catalog_counts import rebuild_product_counts
+from achat.category_tree import invalidate_category_tree
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de produits par catégorie et sous-catégorie depuis la table des produits"
+
+    def handle(self, *args, **options):
+        category_rows, subcategory_rows = rebuild_product_counts()
+        invalidate_category_tree()
+        self.stdout.write(self.style.SUCCESS(
+            f"{category_rows} compteur(s) catégorie et {subcategory_rows} compteur(s) sous-catégorie recalculés"
+        ))
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from achat.models import NotificationCounter
+from achat.notifications import compute_counts, counts_cache_key
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de notifications par utilisateur et corrige les écarts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Nombre d'utilisateurs traités par lot")
+        parser.add_argument('--dry-run', action='store_true', help="Affiche les écarts sans les corriger")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        checked = fixed = 0
+
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                fixed += self.reconcile(batch, dry_run)
+                checked += len(batch)
+                batch = []
+        if batch:
+            fixed += self.reconcile(batch, dry_run)
+            checked += len(batch)
+
+        verb = "à corriger" if dry_run else "corrigé(s)"
+        self.stdout.write(self.style.SUCCESS(f"{checked} utilisateur(s) vérifié(s), {fixed} compteur(s) {verb}"))
+
+    def reconcile(self, user_ids, dry_run):
+        actual = compute_counts(user_ids)
+        counters = NotificationCounter.objects.in_bulk(user_ids)
+
+        to_update, to_create = [], []
+        for user_id, (total, unread) in actual.items():
+            counter = counters.get(user_id)
+            if counter is None:
+                to_create.append(NotificationCounter(user_id=user_id, total_count=total, unread_count=unread))
+            elif (counter.total_count, counter.unread_count) != (total, unread):
+                counter.total_count, counter.unread_count = total, unread
+                to_update.append(counter)
+
+        if not dry_run:
+            NotificationCounter.objects.bulk_create(to_create, ignore_conflicts=True)
+            NotificationCounter.objects.bulk_update(to_update, ['total_count', 'unread_count'])
+            cache.delete_many([counts_cache_key(counter.user_id) for counter in to_create + to_update])
+
+        return len(to_create) + len(to_update)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from achat.platform_stats import refresh_platform_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'instantané des statistiques affichées dans l'administration (à planifier, ex. toutes les 5 minutes)"
+
+    def handle(self, *args, **options):
+        snapshot = refresh_platform_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Statistiques recalculées : {snapshot.data['total_users']} utilisateur(s), "
+            f"{snapshot.data['total_products']} produit(s)"
+        ))
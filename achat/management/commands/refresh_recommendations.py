@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from achat.recommendations import TOP_K, last_refresh, refresh_similarities
+
+
+class Command(BaseCommand):
+    help = "Recalcule les produits similaires (ProductSimilarity) à partir des achats, paniers et wishlists"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Nombre de voisins conservés par produit")
+        parser.add_argument(
+            '--since-hours', type=float,
+            help="Ne recalcule que les produits touchés depuis ce nombre d'heures (défaut : depuis le dernier calcul)"
+        )
+        parser.add_argument('--full', action='store_true', help="Recalcule tous les produits")
+
+    def handle(self, *args, **options):
+        if options['full']:
+            since = None
+        elif options['since_hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['since_hours'])
+        else:
+            since = last_refresh()
+
+        products, rows = refresh_similarities(since, options['top_k'])
+
+        scope = "tous les produits" if since is None else f"les produits touchés depuis {since:%Y-%m-%d %H:%M}"
+        self.stdout.write(self.style.SUCCESS(
+            f"{products} produit(s) recalculé(s) ({scope}), {rows} voisin(s) enregistré(s)"
+        ))
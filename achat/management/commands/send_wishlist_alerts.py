@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from achat.notifications import FAN_OUT_CHUNK_SIZE
+from achat.price_alerts import send_wishlist_alerts
+
+
+class Command(BaseCommand):
+    help = "Notifie les baisses de prix et retours en stock des produits en wishlist depuis le dernier passage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=FAN_OUT_CHUNK_SIZE, help="Notifications créées par lot")
+        parser.add_argument('--dry-run', action='store_true', help="Compte les notifications sans les envoyer")
+
+    def handle(self, *args, **options):
+        result = send_wishlist_alerts(chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+
+        verb = "seraient envoyée(s)" if options['dry_run'] else "envoyée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['price_drops']} baisse(s) de prix, {result['back_in_stock']} retour(s) en stock : "
+            f"{result['notifications']} notification(s) {verb}"
+        ))
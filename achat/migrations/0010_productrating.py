@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:26
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_product_ratings(apps, schema_editor):
+    Review = apps.get_model('achat', 'Review')
+    ProductRating = apps.get_model('achat', 'ProductRating')
+
+    counts = {}
+    for row in Review.objects.values('product_id', 'rating').annotate(count=Count('id')):
+        counts.setdefault(row['product_id'], {})[row['rating']] = row['count']
+
+    ratings = []
+    for product_id, rating_counts in counts.items():
+        total_reviews = sum(rating_counts.values())
+        ratings.append(ProductRating(
+            product_id=product_id,
+            total_reviews=total_reviews,
+            average_rating=round(sum(r * c for r, c in rating_counts.items()) / total_reviews, 2),
+            **{f'rating_{i}_count': rating_counts.get(i, 0) for i in range(1, 6)}
+        ))
+    ProductRating.objects.bulk_create(ratings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0009_review_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRating',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.DecimalField(decimal_places=2, default=0.0, max_digits=3)),
+                ('rating_1_count', models.PositiveIntegerField(default=0)),
+                ('rating_2_count', models.PositiveIntegerField(default=0)),
+                ('rating_3_count', models.PositiveIntegerField(default=0)),
+                ('rating_4_count', models.PositiveIntegerField(default=0)),
+                ('rating_5_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='product_rating', to='achat.product')),
+            ],
+            options={
+                'verbose_name': 'Note Produit',
+                'verbose_name_plural': 'Notes Produits',
+            },
+        ),
+        migrations.RunPython(backfill_product_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:39
+
+import achat.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0012_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertoken',
+            name='device_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='usertoken',
+            name='expires_at',
+            field=models.DateTimeField(default=achat.models.token_expiry),
+        ),
+        migrations.AddField(
+            model_name='usertoken',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='usertoken',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='usertoken',
+            index=models.Index(fields=['user', 'is_active'], name='usertoken_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertoken',
+            index=models.Index(fields=['expires_at'], name='usertoken_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:44
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_sales(apps, schema_editor):
+    OrderItem = apps.get_model('achat', 'OrderItem')
+    VendorDailySales = apps.get_model('achat', 'VendorDailySales')
+    ProductDailySales = apps.get_model('achat', 'ProductDailySales')
+
+    items = OrderItem.objects.annotate(date=TruncDate('order__created_at'))
+    aggregates = {
+        'units': Sum('quantity'),
+        'revenue': Sum('total_price'),
+        'items': Count('id'),
+        'orders': Count('order', distinct=True),
+    }
+    VendorDailySales.objects.bulk_create([
+        VendorDailySales(**row)
+        for row in items.values('vendor_id', 'date', status=F('order__status')).annotate(**aggregates).order_by()
+    ], batch_size=1000)
+    ProductDailySales.objects.bulk_create([
+        ProductDailySales(**row)
+        for row in items.values('product_id', 'vendor_id', 'date', status=F('order__status')).annotate(**aggregates).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0014_order_created_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('confirmed', 'Confirmée'), ('processing', 'En traitement'), ('shipped', 'Expédiée'), ('delivered', 'Livrée'), ('cancelled', 'Annulée')], max_length=20)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='achat.product')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ventes journalières produit',
+                'verbose_name_plural': 'Ventes journalières produits',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['vendor', 'date'], name='productsales_vendor_date_idx')],
+                'unique_together': {('product', 'date', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorDailySales',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('confirmed', 'Confirmée'), ('processing', 'En traitement'), ('shipped', 'Expédiée'), ('delivered', 'Livrée'), ('cancelled', 'Annulée')], max_length=20)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ventes journalières vendeur',
+                'verbose_name_plural': 'Ventes journalières vendeurs',
+                'ordering': ['-date'],
+                'unique_together': {('vendor', 'date', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:50
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0015_daily_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSimilarity',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='achat.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_products', to='achat.product')),
+            ],
+            options={
+                'verbose_name': 'Similarité produit',
+                'verbose_name_plural': 'Similarités produits',
+                'indexes': [models.Index(fields=['product', '-score'], name='similarity_product_score_idx')],
+                'unique_together': {('product', 'neighbor')},
+            },
+        ),
+    ]
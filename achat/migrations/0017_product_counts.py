@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:58
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_product_counts(apps, schema_editor):
+    Product = apps.get_model('achat', 'Product')
+    CategoryProductCount = apps.get_model('achat', 'CategoryProductCount')
+    SubCategoryProductCount = apps.get_model('achat', 'SubCategoryProductCount')
+
+    CategoryProductCount.objects.bulk_create([
+        CategoryProductCount(**row)
+        for row in Product.objects.filter(category__isnull=False).values(
+            'category_id', 'status'
+        ).annotate(count=Count('id')).order_by()
+    ], batch_size=1000)
+    SubCategoryProductCount.objects.bulk_create([
+        SubCategoryProductCount(**row)
+        for row in Product.objects.filter(subcategory__isnull=False).values(
+            'subcategory_id', 'status'
+        ).annotate(count=Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0016_productsimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryProductCount',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('active', 'Actif'), ('inactive', 'Inactif'), ('pending', 'En attente'), ('sold', 'Vendu')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_counts', to='achat.category')),
+            ],
+            options={
+                'verbose_name': 'Compteur produits catégorie',
+                'verbose_name_plural': 'Compteurs produits catégories',
+                'unique_together': {('category', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SubCategoryProductCount',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('active', 'Actif'), ('inactive', 'Inactif'), ('pending', 'En attente'), ('sold', 'Vendu')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subcategory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_counts', to='achat.subcategory')),
+            ],
+            options={
+                'verbose_name': 'Compteur produits sous-catégorie',
+                'verbose_name_plural': 'Compteurs produits sous-catégories',
+                'unique_together': {('subcategory', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_product_counts, migrations.RunPython.noop),
+    ]
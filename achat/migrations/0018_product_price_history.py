@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def record_initial_prices(apps, schema_editor):
+    Product = apps.get_model('achat', 'Product')
+    ProductPriceHistory = apps.get_model('achat', 'ProductPriceHistory')
+
+    ProductPriceHistory.objects.bulk_create([
+        ProductPriceHistory(
+            product_id=product_id, price=price, processed=True,
+            is_available=status == 'active' and is_stock and quantity > 0
+        )
+        for product_id, price, status, is_stock, quantity in Product.objects.values_list(
+            'id', 'price', 'status', 'is_stock', 'quantity'
+        ).iterator(chunk_size=1000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0017_product_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceHistory',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_available', models.BooleanField()),
+                ('processed', models.BooleanField(default=False)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='achat.product')),
+            ],
+            options={
+                'verbose_name': 'Historique de prix',
+                'verbose_name_plural': 'Historiques de prix',
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['product', '-recorded_at'], name='pricehistory_product_idx'), models.Index(fields=['processed', 'recorded_at'], name='pricehistory_processed_idx')],
+            },
+        ),
+        migrations.RunPython(record_initial_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:06
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0018_product_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('data', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Statistiques plateforme',
+                'verbose_name_plural': 'Statistiques plateforme',
+                'ordering': ['-computed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Index plein texte de la recherche admin (achat/admin_search.py) : mêmes colonnes, même ordre
+FULLTEXT_INDEXES = {
+    'achat_customuser': ('nom', 'prenom'),
+    'achat_product': ('name', 'description'),
+    'achat_location': ('name',),
+    'achat_category': ('name', 'name_trl', 'description'),
+    'achat_subcategory': ('name', 'name_trl', 'description'),
+}
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    # Index d'expression GIN propres à PostgreSQL ; les autres bases cherchent sans index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, fields in FULLTEXT_INDEXES.items():
+        columns = " || ' ' || ".join(f"coalesce(\"{table}\".\"{field}\", '')" for field in fields)
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_fts_idx ON \"{table}\" USING gin (to_tsvector('simple', {columns}))"
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in FULLTEXT_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_fts_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0020_adminjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
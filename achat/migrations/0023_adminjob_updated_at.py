@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0022_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
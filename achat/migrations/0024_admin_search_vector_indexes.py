@@ -0,0 +1,46 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Index plein texte de la recherche admin (achat/admin_search.py) : mêmes colonnes, même ordre.
+# Construits à partir du SearchVector de la requête pour que PostgreSQL reconnaisse l'expression.
+FULLTEXT_INDEXES = {
+    'CustomUser': ('nom', 'prenom'),
+    'Product': ('name', 'description'),
+    'Location': ('name',),
+    'Category': ('name', 'name_trl', 'description'),
+    'SubCategory': ('name', 'name_trl', 'description'),
+}
+
+
+def fulltext_index(model, fields):
+    return GinIndex(SearchVector(*fields, config='simple'), name=f'{model._meta.db_table}_fts_idx')
+
+
+def create_search_vector_indexes(apps, schema_editor):
+    # Index GIN propres à PostgreSQL ; remplacent les index SQL écrits à la main de la migration 0021
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, fields in FULLTEXT_INDEXES.items():
+        model = apps.get_model('achat', model_name)
+        schema_editor.execute(f"DROP INDEX IF EXISTS {model._meta.db_table}_fts_idx")
+        schema_editor.add_index(model, fulltext_index(model, fields))
+
+
+def drop_search_vector_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, fields in FULLTEXT_INDEXES.items():
+        model = apps.get_model('achat', model_name)
+        schema_editor.remove_index(model, fulltext_index(model, fields))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achat', '0023_adminjob_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector_indexes, drop_search_vector_indexes),
+    ]
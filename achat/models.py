@@ -1,7 +1,13 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 import uuid
 
+from .hashing import set_password
+
 
 class CustomUserManager(UserManager):
     def create_user(self, identifier, nom=None, prenom=None, password=None, **extra_fields):
@@ -18,7 +24,8 @@ class CustomUserManager(UserManager):
             prenom=prenom or '',
             **extra_fields
         )
-        user.set_password(password)
+        # Un seul hachage, exécuté dans le pool borné
+        set_password(user, password)
         user.save(using=self._db)
         return user
 
@@ -59,9 +66,23 @@ class CustomUser(AbstractUser):
     
     objects = CustomUserManager()
 
+    # Champs dont la modification invalide les tokens en cache (voir signals.invalidate_cached_user)
+    AUTH_FIELDS = ('is_active', 'password', 'user_type', 'is_staff', 'is_superuser')
+
     def __str__(self):
         return f"{self.prenom} {self.nom} ({self.identifier})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if all(field in loaded for field in cls.AUTH_FIELDS):
+            instance._loaded_auth = {field: loaded[field] for field in cls.AUTH_FIELDS}
+        return instance
+
+    def auth_values(self):
+        return {field: getattr(self, field) for field in self.AUTH_FIELDS}
+
 
 class Location(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -86,17 +107,42 @@ class Location(models.Model):
         super().save(*args, **kwargs)
 
 
+def token_expiry():
+    return timezone.now() + timedelta(days=getattr(settings, 'ACHAT_TOKEN_TTL_DAYS', 30))
+
+
 class UserToken(models.Model):
+    """Token d'un appareil : un utilisateur peut en avoir plusieurs, chacun avec une expiration glissante"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='auth_token')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='auth_tokens')
     token = models.UUIDField(unique=True, default=uuid.uuid4)
+    device_name = models.CharField(max_length=255, blank=True)
     is_active = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(default=token_expiry)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_active'], name='usertoken_user_active_idx'),
+            models.Index(fields=['expires_at'], name='usertoken_expires_idx'),
+        ]
+
     def __str__(self):
         return f"Token for {self.user.identifier} ({'Active' if self.is_active else 'Inactive'})"
 
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def rotate(self):
+        """Remplace ce token par un nouveau pour le même appareil"""
+        with transaction.atomic():
+            self.is_active = False
+            self.save(update_fields=['is_active', 'updated_at'])
+            return UserToken.objects.create(user_id=self.user_id, device_name=self.device_name)
+
 
 class SubCategory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -180,9 +226,113 @@ class Product(models.Model):
         verbose_name_plural = "Produits"
         ordering = ['-created_at']
 
+    # Champs suivis à chaque écriture : compteurs par catégorie (catalog_counts)
+    # et historique des prix et disponibilités (price_alerts)
+    COUNTED_FIELDS = ('category_id', 'subcategory_id', 'status')
+    TRACKED_FIELDS = COUNTED_FIELDS + ('price', 'is_stock', 'quantity')
+
     def __str__(self):
         return f"{self.name} - {self.user.prenom} {self.user.nom}"
 
+    @property
+    def is_available(self):
+        return self.status == 'active' and self.is_stock and self.quantity > 0
+
+    def tracked_values(self):
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+
+    def save(self, *args, **kwargs):
+        from .catalog_counts import apply_product_change
+        from .price_alerts import record_product_history
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not any(
+            field in update_fields or field.removesuffix('_id') in update_fields for field in self.TRACKED_FIELDS
+        ):
+            # Aucun champ suivi écrit : ni verrou ni compteurs
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            if self._state.adding:
+                old_values = None
+            else:
+                # Ligne relue et verrouillée : une écriture concurrente a pu la modifier depuis le
+                # chargement de l'instance, le delta des compteurs part de l'état réellement en base
+                old_values = Product.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values(*self.TRACKED_FIELDS).first()
+            super().save(*args, **kwargs)
+            new_values = self.tracked_values()
+            if old_values is not None and update_fields is not None:
+                # Les champs non écrits gardent leur valeur en base
+                new_values = {
+                    field: new_values[field] if field in update_fields or field.removesuffix('_id') in update_fields
+                    else old_values[field]
+                    for field in self.TRACKED_FIELDS
+                }
+            if old_values == new_values:
+                # Ex. modification du nom ou de la description : compteurs et historique inchangés
+                return
+            apply_product_change(old_values, new_values)
+            record_product_history(self, old_values, new_values)
+
+
+class CategoryProductCount(models.Model):
+    """Nombre de produits par catégorie et par statut, maintenu à chaque écriture de produit"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='product_counts')
+    status = models.CharField(max_length=20, choices=Product.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Compteur produits catégorie"
+        verbose_name_plural = "Compteurs produits catégories"
+        unique_together = ['category', 'status']
+
+    def __str__(self):
+        return f"{self.category.name} ({self.status}) : {self.count}"
+
+
+class SubCategoryProductCount(models.Model):
+    """Nombre de produits par sous-catégorie et par statut, maintenu à chaque écriture de produit"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    subcategory = models.ForeignKey(SubCategory, on_delete=models.CASCADE, related_name='product_counts')
+    status = models.CharField(max_length=20, choices=Product.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Compteur produits sous-catégorie"
+        verbose_name_plural = "Compteurs produits sous-catégories"
+        unique_together = ['subcategory', 'status']
+
+    def __str__(self):
+        return f"{self.subcategory.name} ({self.status}) : {self.count}"
+
+
+class ProductPriceHistory(models.Model):
+    """Prix et disponibilité d'un produit, enregistrés à chaque changement (Product.save)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    is_available = models.BooleanField()
+    # Passé à True par send_wishlist_alerts une fois le changement traité
+    processed = models.BooleanField(default=False)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Historique de prix"
+        verbose_name_plural = "Historiques de prix"
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['product', '-recorded_at'], name='pricehistory_product_idx'),
+            models.Index(fields=['processed', 'recorded_at'], name='pricehistory_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.price} ({'disponible' if self.is_available else 'indisponible'})"
+
 
 class Wishlist(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -214,11 +364,31 @@ class Notification(models.Model):
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-created_at']
+        indexes = [
+            # Listes par utilisateur (toutes, lues, non lues) triées par date
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            # Purge par état et ancienneté
+            models.Index(fields=['is_read', 'created_at'], name='notif_read_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titre} - {self.user.prenom} {self.user.nom} ({'Lu' if self.is_read else 'Non lu'})"
 
 
+class NotificationCounter(models.Model):
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    total_count = models.IntegerField(default=0)
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Compteur de notifications"
+        verbose_name_plural = "Compteurs de notifications"
+
+    def __str__(self):
+        return f"{self.user.prenom} {self.user.nom} - {self.unread_count}/{self.total_count} non lues"
+
+
 class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='cart')
@@ -286,6 +456,9 @@ class Order(models.Model):
         verbose_name = "Commande"
         verbose_name_plural = "Commandes"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Commande {self.order_number} - {self.user.prenom} {self.user.nom}"
@@ -313,6 +486,9 @@ class OrderItem(models.Model):
     class Meta:
         verbose_name = "Article de commande"
         verbose_name_plural = "Articles de commande"
+        indexes = [
+            models.Index(fields=['vendor', 'created_at'], name='orderitem_vendor_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} x{self.quantity} - Commande {self.order.order_number}"
@@ -339,6 +515,11 @@ class Review(models.Model):
         verbose_name_plural = "Avis"
         unique_together = ['user', 'product']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='review_product_created_idx'),
+            models.Index(fields=['vendor', '-created_at'], name='review_vendor_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='review_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Avis de {self.user.prenom} sur {self.product.name} - {self.rating}⭐"
@@ -395,6 +576,130 @@ class VendorRating(models.Model):
         self.save()
 
 
+class ProductRating(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='product_rating')
+    total_reviews = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Note Produit"
+        verbose_name_plural = "Notes Produits"
+
+    def __str__(self):
+        return f"Note de {self.product.name} - {self.average_rating}⭐ ({self.total_reviews} avis)"
+
+    def update_rating(self):
+        from django.db.models import Count
+
+        # Une seule requête groupée sur l'index (product, -created_at)
+        rating_counts = dict(
+            Review.objects.filter(product=self.product).values_list('rating').annotate(count=Count('id'))
+        )
+
+        for i in range(1, 6):
+            setattr(self, f"rating_{i}_count", rating_counts.get(i, 0))
+
+        self.total_reviews = sum(rating_counts.values())
+
+        if self.total_reviews > 0:
+            total = sum(rating * count for rating, count in rating_counts.items())
+            self.average_rating = round(total / self.total_reviews, 2)
+        else:
+            self.average_rating = 0.00
+
+        self.save()
+
+    def to_summary(self):
+        return {
+            'product_id': str(self.product_id),
+            'total_reviews': self.total_reviews,
+            'average_rating': float(self.average_rating),
+            'rating_breakdown': {
+                '1': self.rating_1_count,
+                '2': self.rating_2_count,
+                '3': self.rating_3_count,
+                '4': self.rating_4_count,
+                '5': self.rating_5_count,
+            },
+            'updated_at': self.updated_at
+        }
+
+
+class ProductSimilarity(models.Model):
+    """Voisins les plus proches d'un produit (similarité cosinus item-item), calculés hors ligne"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_products')
+    neighbor = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Similarité produit"
+        verbose_name_plural = "Similarités produits"
+        unique_together = ['product', 'neighbor']
+        indexes = [
+            models.Index(fields=['product', '-score'], name='similarity_product_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.neighbor_id} ({self.score:.3f})"
+
+
+class VendorDailySales(models.Model):
+    """Ventes agrégées par vendeur, jour (date de commande) et statut de commande"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    vendor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ventes journalières vendeur"
+        verbose_name_plural = "Ventes journalières vendeurs"
+        unique_together = ['vendor', 'date', 'status']
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.vendor.prenom} {self.vendor.nom} - {self.date} ({self.status})"
+
+
+class ProductDailySales(models.Model):
+    """Ventes agrégées par produit, jour (date de commande) et statut de commande"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    vendor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='product_daily_sales')
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ventes journalières produit"
+        verbose_name_plural = "Ventes journalières produits"
+        unique_together = ['product', 'date', 'status']
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['vendor', 'date'], name='productsales_vendor_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.date} ({self.status})"
+
+
 class DeliveryOption(models.Model):
     DELIVERY_TYPE_CHOICES = [
         ('pickup', 'Retrait en point'),
@@ -466,3 +771,70 @@ class Shipment(models.Model):
             self.actual_delivery_date = timezone.now()
             
         super().save(*args, **kwargs)
+
+
+class PlatformStats(models.Model):
+    """Instantané des statistiques globales affichées dans l'administration (platform_stats)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Statistiques plateforme"
+        verbose_name_plural = "Statistiques plateforme"
+        ordering = ['-computed_at']
+
+    def __str__(self):
+        return f"Statistiques du {self.computed_at:%d/%m/%Y %H:%M}"
+
+
+class CacheVersion(models.Model):
+    """Version partagée entre processus d'un cache gardé en mémoire (ex. arbre des catégories)"""
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Version de cache"
+        verbose_name_plural = "Versions de cache"
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class AdminJob(models.Model):
+    """Action d'administration en masse exécutée en arrière-plan (admin_jobs)"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'Échouée'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='admin_jobs')
+    operation = models.CharField(max_length=50)
+    description = models.CharField(max_length=255)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    affected = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Dernière activité (après chaque lot) : repère les tâches interrompues, voir fail_stale_admin_jobs
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tâche d'administration"
+        verbose_name_plural = "Tâches d'administration"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.description} ({self.processed}/{self.total})"
+
+    @property
+    def progress(self):
+        return round(self.processed * 100 / self.total) if self.total else 100
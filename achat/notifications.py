@@ -0,0 +1,280 @@
+"""
+Diffusion de notifications en masse, compteurs par utilisateur et politique de rétention
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter, OrderItem, Wishlist
+from .realtime import get_broker
+from .tasks import enqueue
+
+User = get_user_model()
+
+SEGMENT_USER_TYPE = 'user_type'
+SEGMENT_WISHLISTERS = 'wishlisters'
+SEGMENT_BUYERS = 'buyers'
+
+SEGMENT_CHOICES = [
+    (SEGMENT_USER_TYPE, "Tous les utilisateurs d'un type"),
+    (SEGMENT_WISHLISTERS, "Utilisateurs ayant un produit dans leur wishlist"),
+    (SEGMENT_BUYERS, "Clients ayant acheté chez un vendeur"),
+]
+
+FAN_OUT_CHUNK_SIZE = 5000
+
+COUNTS_CACHE_PREFIX = 'achat:notification_counts'
+
+
+def counts_cache_key(user_id):
+    return f"{COUNTS_CACHE_PREFIX}:{user_id}"
+
+
+def compute_counts(user_ids):
+    """Recalcule (total, non lues) depuis la table Notification, en une requête groupée"""
+    rows = Notification.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        total=Count('id'),
+        unread=Count('id', filter=Q(is_read=False))
+    ).order_by()
+    counts = {user_id: (0, 0) for user_id in user_ids}
+    for row in rows:
+        counts[row['user_id']] = (row['total'], row['unread'])
+    return counts
+
+
+def get_counts(user_id):
+    """
+    Retourne {'total_count', 'unread_count'} pour un utilisateur :
+    lecture du cache, sinon une lecture par clé primaire du compteur.
+    """
+    key = counts_cache_key(user_id)
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    counter = NotificationCounter.objects.filter(pk=user_id).values('total_count', 'unread_count').first()
+    if counter is None:
+        total, unread = compute_counts([user_id])[user_id]
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id, total_count=total, unread_count=unread)],
+            ignore_conflicts=True
+        )
+        counter = {'total_count': total, 'unread_count': unread}
+
+    cache.set(key, counter, getattr(settings, 'ACHAT_NOTIFICATION_COUNTS_TTL', 300))
+    return counter
+
+
+def adjust_counts(user_ids, total=0, unread=0):
+    """
+    Applique un delta aux compteurs, après l'écriture des notifications.
+    user_ids peut contenir plusieurs fois le même utilisateur (une fois par notification) :
+    le delta est alors appliqué autant de fois, une requête UPDATE par multiplicité.
+    Un compteur absent est créé à partir de l'état réel (qui inclut déjà l'écriture).
+    """
+    occurrences = Counter(user_ids)
+    if not occurrences or (total == 0 and unread == 0):
+        return
+
+    by_multiplicity = defaultdict(list)
+    for user_id, times in occurrences.items():
+        by_multiplicity[times].append(user_id)
+
+    existing = set()
+    for times, ids in by_multiplicity.items():
+        changes = {
+            'total_count': F('total_count') + total * times,
+            'unread_count': F('unread_count') + unread * times,
+        }
+        if len(ids) == 1:
+            if NotificationCounter.objects.filter(pk=ids[0]).update(**changes):
+                existing.add(ids[0])
+        else:
+            found = set(NotificationCounter.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            NotificationCounter.objects.filter(pk__in=found).update(**changes)
+            existing |= found
+    missing = [user_id for user_id in occurrences if user_id not in existing]
+
+    if missing:
+        NotificationCounter.objects.bulk_create(
+            [
+                NotificationCounter(user_id=user_id, total_count=counts[0], unread_count=counts[1])
+                for user_id, counts in compute_counts(missing).items()
+            ],
+            ignore_conflicts=True
+        )
+
+    user_ids = list(occurrences)
+    cache.delete_many([counts_cache_key(user_id) for user_id in user_ids])
+    publish_counts(user_ids)
+
+
+def refresh_counts(user_ids):
+    """Recalcule entièrement les compteurs des utilisateurs donnés"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    actual = compute_counts(user_ids)
+    counters = NotificationCounter.objects.in_bulk(user_ids)
+    to_create, to_update = [], []
+    for user_id, (total, unread) in actual.items():
+        counter = counters.get(user_id)
+        if counter is None:
+            to_create.append(NotificationCounter(user_id=user_id, total_count=total, unread_count=unread))
+        else:
+            counter.total_count, counter.unread_count = total, unread
+            to_update.append(counter)
+
+    NotificationCounter.objects.bulk_create(to_create, ignore_conflicts=True)
+    NotificationCounter.objects.bulk_update(to_update, ['total_count', 'unread_count'])
+    cache.delete_many([counts_cache_key(user_id) for user_id in user_ids])
+    publish_counts(user_ids)
+
+
+def publish_counts(user_ids):
+    """Pousse les compteurs à jour aux utilisateurs connectés au flux temps réel"""
+    broker = get_broker()
+    for user_id in user_ids:
+        if broker.has_subscribers(user_id):
+            broker.publish(user_id, 'counts', get_counts(user_id))
+
+
+def publish_notifications(notifications):
+    """Pousse les nouvelles notifications aux utilisateurs connectés au flux temps réel"""
+    broker = get_broker()
+    for notification in notifications:
+        if broker.has_subscribers(notification.user_id):
+            broker.publish(notification.user_id, 'notification', {
+                'id': str(notification.id),
+                'titre': notification.titre,
+                'content': notification.content,
+                'is_read': notification.is_read,
+                'created_at': notification.created_at,
+            })
+
+
+def recipients_queryset(segment, user_type=None, product_id=None, vendor_id=None):
+    """Retourne un queryset plat des IDs destinataires (résolu en une seule requête)"""
+    if segment == SEGMENT_USER_TYPE:
+        users = User.objects.filter(is_active=True)
+        if user_type:
+            users = users.filter(user_type=user_type)
+        return users.values_list('id', flat=True)
+
+    if segment == SEGMENT_WISHLISTERS:
+        return Wishlist.objects.filter(product_id=product_id).values_list('user_id', flat=True)
+
+    if segment == SEGMENT_BUYERS:
+        return OrderItem.objects.filter(vendor_id=vendor_id).values_list(
+            'order__user_id', flat=True
+        ).order_by().distinct()
+
+    raise ValueError(f"Segment inconnu: {segment}")
+
+
+def _insert_batch(batch, chunk_size):
+    Notification.objects.bulk_create(batch, batch_size=chunk_size)
+    # Un même utilisateur peut recevoir plusieurs notifications du lot (une par produit en alerte)
+    adjust_counts([notification.user_id for notification in batch if not notification.is_read], total=1, unread=1)
+    adjust_counts([notification.user_id for notification in batch if notification.is_read], total=1)
+    publish_notifications(batch)
+    return len(batch)
+
+
+def notify_many(notifications, chunk_size=FAN_OUT_CHUNK_SIZE):
+    """
+    Enregistre des notifications (non sauvegardées) avec des bulk_create par lots.
+    Retourne le nombre de notifications créées.
+    """
+    created = 0
+    batch = []
+    for notification in notifications:
+        batch.append(notification)
+        if len(batch) >= chunk_size:
+            created += _insert_batch(batch, chunk_size)
+            batch = []
+
+    if batch:
+        created += _insert_batch(batch, chunk_size)
+
+    return created
+
+
+def fan_out(user_ids, titre, content, chunk_size=FAN_OUT_CHUNK_SIZE):
+    """Crée une notification identique par destinataire. Retourne le nombre de notifications créées."""
+    return notify_many(
+        (Notification(user_id=user_id, titre=titre, content=content) for user_id in user_ids),
+        chunk_size=chunk_size
+    )
+
+
+def fan_out_to_segment(segment, titre, content, user_type=None, product_id=None, vendor_id=None,
+                       chunk_size=FAN_OUT_CHUNK_SIZE):
+    user_ids = recipients_queryset(
+        segment, user_type=user_type, product_id=product_id, vendor_id=vendor_id
+    ).iterator(chunk_size=chunk_size)
+    return fan_out(user_ids, titre, content, chunk_size=chunk_size)
+
+
+def enqueue_fan_out(segment, titre, content, **segment_params):
+    """Planifie la diffusion sur le worker d'arrière-plan"""
+    return enqueue(fan_out_to_segment, segment, titre, content, **segment_params)
+
+
+DEFAULT_RETENTION = {'read': 30, 'unread': 180}
+
+
+def get_retention_policy():
+    """Durées de conservation en jours, par état (None = conservation illimitée)"""
+    policy = dict(DEFAULT_RETENTION)
+    policy.update(getattr(settings, 'ACHAT_NOTIFICATION_RETENTION', {}))
+    return policy
+
+
+def expired_notifications(now=None):
+    """Retourne, par état, le queryset des notifications dépassant leur durée de conservation"""
+    now = now or timezone.now()
+    expired = {}
+    for state, days in get_retention_policy().items():
+        if days is None:
+            continue
+        expired[state] = Notification.objects.filter(
+            is_read=(state == 'read'),
+            created_at__lt=now - timedelta(days=days)
+        )
+    return expired
+
+
+def prune_notifications(batch_size=1000, pause=0, max_batches=None, now=None):
+    """
+    Supprime les notifications expirées par lots bornés (une transaction courte par lot)
+    pour ne pas verrouiller la table longtemps. max_batches s'applique à chaque état : un gros
+    arriéré de notifications lues n'empêche pas la purge des non lues. Retourne le nombre de
+    lignes supprimées par état.
+    """
+    deleted = {}
+    for state, queryset in expired_notifications(now).items():
+        deleted[state] = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            rows = list(queryset.order_by('created_at').values_list('id', 'user_id')[:batch_size])
+            if not rows:
+                break
+
+            Notification.objects.filter(id__in=[row[0] for row in rows]).delete()
+            refresh_counts({row[1] for row in rows})
+            deleted[state] += len(rows)
+            batches += 1
+
+            if len(rows) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+    return deleted
@@ -0,0 +1,11 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+    Pagination par curseur pour les avis (stable même si de nouveaux avis arrivent)
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
@@ -0,0 +1,119 @@
+"""
+Statistiques globales de l'administration (accueil et tableau de bord Achat).
+
+Calculées en quelques requêtes agrégées par refresh_platform_stats() (commande
+refresh_platform_stats, à planifier) et stockées dans PlatformStats. Les pages lisent
+le dernier instantané, gardé en mémoire du processus ACHAT_PLATFORM_STATS_LOCAL_TTL secondes ;
+un instantané plus vieux que ACHAT_PLATFORM_STATS_TTL est servi pendant son recalcul en
+arrière-plan.
+
+Sur PostgreSQL, les tables dépassant ACHAT_ESTIMATED_COUNT_THRESHOLD lignes sont comptées
+à partir des statistiques du planificateur (pg_class.reltuples) au lieu d'un COUNT(*).
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import (
+    Category, CustomUser, Location, Notification, PlatformStats, Product, SubCategory, UserToken, Wishlist
+)
+from .tasks import enqueue
+
+REFRESH_LOCK_KEY = 'achat:platform_stats:refreshing'
+HISTORY_DAYS = 90
+
+_lock = threading.Lock()
+_local = None  # (lu à, instantané)
+
+
+def estimated_count(model):
+    """Nombre de lignes d'une table, estimé par le planificateur PostgreSQL pour les très grosses tables"""
+    threshold = getattr(settings, 'ACHAT_ESTIMATED_COUNT_THRESHOLD', 100000)
+    if connection.vendor == 'postgresql' and threshold is not None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples vaut -1 tant que la table n'a jamais été analysée
+        if row and row[0] >= threshold:
+            return row[0]
+    return model.objects.count()
+
+
+def compute_platform_stats():
+    now = timezone.now()
+    users = CustomUser.objects.aggregate(
+        total_vendors=Count('id', filter=Q(user_type='vendor')),
+        total_customers=Count('id', filter=Q(user_type='customer')),
+        new_users_week=Count('id', filter=Q(date_joined__gte=now - timedelta(days=7))),
+        new_users_month=Count('id', filter=Q(date_joined__gte=now - timedelta(days=30))),
+    )
+    locations = Location.objects.aggregate(default_locations=Count('id', filter=Q(is_default=True)))
+    categories = Category.objects.aggregate(
+        total_categories=Count('id'), active_categories=Count('id', filter=Q(is_active=True))
+    )
+    subcategories = SubCategory.objects.aggregate(
+        total_subcategories=Count('id'), active_subcategories=Count('id', filter=Q(is_active=True))
+    )
+
+    return {
+        **users,
+        **locations,
+        **categories,
+        **subcategories,
+        'total_users': estimated_count(CustomUser),
+        # Semi-jointure : pas de DISTINCT sur la jointure avec tous les produits
+        'active_vendors': CustomUser.objects.filter(
+            user_type='vendor'
+        ).filter(Exists(Product.objects.filter(user=OuterRef('pk')))).count(),
+        'total_locations': estimated_count(Location),
+        'total_tokens': estimated_count(UserToken),
+        'active_tokens': UserToken.objects.filter(is_active=True).count(),
+        'total_products': estimated_count(Product),
+        'active_products': Product.objects.filter(status='active').count(),
+        'total_wishlists': estimated_count(Wishlist),
+        'total_notifications': estimated_count(Notification),
+        'unread_notifications': Notification.objects.filter(is_read=False).count(),
+        'gender_stats': list(CustomUser.objects.values('gender').annotate(count=Count('gender')).order_by()),
+        'top_cities': list(Location.objects.values('name').annotate(count=Count('name')).order_by('-count')[:5]),
+    }
+
+
+def refresh_platform_stats():
+    """Calcule et enregistre un nouvel instantané, purge les anciens. Retourne l'instantané."""
+    global _local
+    snapshot = PlatformStats.objects.create(data=compute_platform_stats())
+    PlatformStats.objects.filter(computed_at__lt=snapshot.computed_at - timedelta(days=HISTORY_DAYS)).delete()
+    _local = (time.monotonic(), snapshot)
+    return snapshot
+
+
+def _refresh_in_background():
+    try:
+        refresh_platform_stats()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+
+
+def get_platform_stats():
+    """Dernier instantané (PlatformStats) : mémoire locale, sinon base, sinon calcul immédiat"""
+    global _local
+    entry = _local
+    if entry is not None and time.monotonic() - entry[0] < getattr(settings, 'ACHAT_PLATFORM_STATS_LOCAL_TTL', 60):
+        return entry[1]
+
+    with _lock:
+        snapshot = PlatformStats.objects.first()
+        if snapshot is None:
+            return refresh_platform_stats()
+        _local = (time.monotonic(), snapshot)
+
+    max_age = timedelta(seconds=getattr(settings, 'ACHAT_PLATFORM_STATS_TTL', 300))
+    if snapshot.computed_at < timezone.now() - max_age and cache.add(REFRESH_LOCK_KEY, 1, 300):
+        enqueue(_refresh_in_background)
+    return snapshot
@@ -0,0 +1,110 @@
+"""
+Alertes wishlist : baisse de prix et retour en stock.
+
+Product.save() enregistre chaque changement de prix ou de disponibilité dans ProductPriceHistory.
+send_wishlist_alerts() ne regarde que les produits ayant des lignes non traitées : pour chacun,
+le dernier état traité est comparé au dernier état enregistré (une requête), les wishlists des
+produits concernés sont jointes en une requête et les notifications créées par lots.
+"""
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Notification, Product, ProductPriceHistory, Wishlist
+from .notifications import FAN_OUT_CHUNK_SIZE, notify_many
+
+ALERT_PRICE_DROP = 'price_drop'
+ALERT_BACK_IN_STOCK = 'back_in_stock'
+
+
+def is_available(values):
+    return values['status'] == 'active' and values['is_stock'] and values['quantity'] > 0
+
+
+def history_entry(product_id, old_values, new_values):
+    """Ligne d'historique (non sauvegardée) si le prix ou la disponibilité a changé, sinon None"""
+    available = is_available(new_values)
+    if old_values is not None and old_values['price'] == new_values['price'] and is_available(old_values) == available:
+        return None
+    # L'état initial d'un produit sert de référence : il n'y a rien à signaler
+    return ProductPriceHistory(
+        product_id=product_id, price=new_values['price'], is_available=available, processed=old_values is None
+    )
+
+
+def record_product_history(product, old_values, new_values):
+    """Ajoute une ligne d'historique si le prix ou la disponibilité a changé"""
+    entry = history_entry(product.pk, old_values, new_values)
+    if entry is not None:
+        entry.save()
+
+
+def pending_changes(cutoff):
+    return ProductPriceHistory.objects.filter(processed=False, recorded_at__lte=cutoff)
+
+
+def find_alerts(cutoff):
+    """
+    Retourne {product_id: (type d'alerte, nom, ancien prix, nouveau prix)} pour les produits
+    modifiés depuis le dernier traitement.
+    """
+    latest = ProductPriceHistory.objects.filter(product=OuterRef('pk'), recorded_at__lte=cutoff).order_by('-recorded_at')
+    baseline = ProductPriceHistory.objects.filter(product=OuterRef('pk'), processed=True).order_by('-recorded_at')
+    products = Product.objects.filter(
+        id__in=pending_changes(cutoff).values('product_id')
+    ).annotate(
+        old_price=Subquery(baseline.values('price')[:1]),
+        was_available=Subquery(baseline.values('is_available')[:1]),
+        new_price=Subquery(latest.values('price')[:1]),
+        now_available=Subquery(latest.values('is_available')[:1]),
+    ).values_list('id', 'name', 'old_price', 'was_available', 'new_price', 'now_available')
+
+    alerts = {}
+    for product_id, name, old_price, was_available, new_price, now_available in products:
+        if not now_available or old_price is None:
+            continue
+        if not was_available:
+            alerts[product_id] = (ALERT_BACK_IN_STOCK, name, old_price, new_price)
+        elif new_price < old_price:
+            alerts[product_id] = (ALERT_PRICE_DROP, name, old_price, new_price)
+    return alerts
+
+
+def build_notification(user_id, alert):
+    kind, name, old_price, new_price = alert
+    if kind == ALERT_BACK_IN_STOCK:
+        return Notification(
+            user_id=user_id, titre="De retour en stock",
+            content=f"{name}, présent dans votre wishlist, est de nouveau disponible à {new_price} FCFA."
+        )
+    return Notification(
+        user_id=user_id, titre="Baisse de prix",
+        content=f"{name}, présent dans votre wishlist, passe de {old_price} à {new_price} FCFA."
+    )
+
+
+def send_wishlist_alerts(chunk_size=FAN_OUT_CHUNK_SIZE, dry_run=False):
+    """
+    Traite les changements enregistrés jusqu'à maintenant. Les lignes ne sont marquées traitées
+    qu'après l'envoi : une exécution interrompue est reprise en entier la fois suivante.
+    Retourne {'price_drops', 'back_in_stock', 'notifications'}.
+    """
+    cutoff = timezone.now()
+    alerts = find_alerts(cutoff)
+    recipients = Wishlist.objects.filter(product_id__in=list(alerts)).values_list('user_id', 'product_id')
+
+    if dry_run:
+        notifications = recipients.count() if alerts else 0
+    else:
+        notifications = notify_many(
+            (build_notification(user_id, alerts[product_id])
+             for user_id, product_id in recipients.iterator(chunk_size=chunk_size)),
+            chunk_size=chunk_size
+        ) if alerts else 0
+        pending_changes(cutoff).update(processed=True)
+
+    kinds = [alert[0] for alert in alerts.values()]
+    return {
+        'price_drops': kinds.count(ALERT_PRICE_DROP),
+        'back_in_stock': kinds.count(ALERT_BACK_IN_STOCK),
+        'notifications': notifications,
+    }
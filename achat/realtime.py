@@ -0,0 +1,69 @@
+"""
+Pub/sub en mémoire pour pousser les événements de notifications aux clients connectés (SSE)
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InMemoryBroker:
+    """
+    Broker local au processus : chaque abonné est une asyncio.Queue liée à sa boucle.
+    publish() est thread-safe et peut être appelé depuis du code synchrone (vues, workers).
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        subscription = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(str(user_id), []).append(subscription)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        key = str(user_id)
+        with self._lock:
+            remaining = [sub for sub in self._subscribers.get(key, []) if sub[1] is not queue]
+            if remaining:
+                self._subscribers[key] = remaining
+            else:
+                self._subscribers.pop(key, None)
+
+    def has_subscribers(self, user_id):
+        return str(user_id) in self._subscribers
+
+    def publish(self, user_id, event_type, data):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(str(user_id), []))
+
+        event = {'type': event_type, 'data': data}
+        for loop, queue in subscriptions:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Boucle fermée : l'abonné s'est déconnecté entre-temps
+                self.unsubscribe(user_id, queue)
+
+    @staticmethod
+    def _deliver(queue, event):
+        # Un client trop lent perd les événements les plus anciens plutôt que de bloquer l'émetteur
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        broker_class = import_string(getattr(settings, 'ACHAT_REALTIME_BROKER', 'achat.realtime.InMemoryBroker'))
+        _broker = broker_class()
+    return _broker
@@ -0,0 +1,207 @@
+"""
+Recommandations item-item.
+
+Hors ligne (commande refresh_recommendations) : les interactions utilisateur-produit
+(achats, panier, wishlist, pondérés) forment des vecteurs creux par produit, stockés en
+dictionnaires ; la similarité cosinus entre produits est calculée à partir des
+co-occurrences et les K meilleurs voisins de chaque produit sont écrits dans ProductSimilarity.
+
+En ligne : les voisins des produits récents de l'utilisateur sont lus en une requête
+puis fusionnés par somme pondérée des scores.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import CartItem, OrderItem, ProductSimilarity, Wishlist
+
+SOURCE_PURCHASES = 'purchases'
+SOURCE_CART = 'cart'
+SOURCE_WISHLIST = 'wishlist'
+
+INTERACTION_WEIGHTS = {SOURCE_PURCHASES: 3.0, SOURCE_CART: 2.0, SOURCE_WISHLIST: 1.0}
+
+TOP_K = 20
+MAX_ITEMS_PER_USER = 200
+RECENT_ITEMS = 20
+
+
+def interaction_querysets(since=None, users=None, products=None):
+    """
+    (source, queryset de (user_id, product_id)) pour chaque type d'interaction, éventuellement
+    restreint aux interactions depuis `since`, aux utilisateurs `users` ou aux produits `products`.
+    """
+    sources = [
+        (SOURCE_PURCHASES, OrderItem.objects.all(), 'order__user_id', 'created_at'),
+        (SOURCE_CART, CartItem.objects.all(), 'cart__user_id', 'updated_at'),
+        (SOURCE_WISHLIST, Wishlist.objects.all(), 'user_id', 'created_at'),
+    ]
+    querysets = []
+    for source, queryset, user_field, date_field in sources:
+        if since is not None:
+            queryset = queryset.filter(**{f'{date_field}__gte': since})
+        if users is not None:
+            queryset = queryset.filter(**{f'{user_field}__in': users})
+        if products is not None:
+            queryset = queryset.filter(product_id__in=products)
+        querysets.append((source, queryset.values_list(user_field, 'product_id')))
+    return querysets
+
+
+def interacting_users(since=None, products=None):
+    """Utilisateurs ayant une interaction depuis `since` ou avec l'un des `products`"""
+    users = set()
+    for _, rows in interaction_querysets(since=since, products=products):
+        users.update(user_id for user_id, _ in rows.distinct().order_by())
+    return users
+
+
+def load_interactions(users=None):
+    """
+    Retourne {user_id: {product_id: poids}}, le poids étant celui de l'interaction la plus forte.
+    Limité aux profils complets des utilisateurs `users` (tous si None).
+    """
+    interactions = defaultdict(dict)
+    for source, rows in interaction_querysets(users=users):
+        weight = INTERACTION_WEIGHTS[source]
+        for user_id, product_id in rows.iterator(chunk_size=5000):
+            items = interactions[user_id]
+            if items.get(product_id, 0) < weight:
+                items[product_id] = weight
+
+    # Les très gros profils dominent les co-occurrences sans apporter de signal : on les borne
+    for user_id, items in interactions.items():
+        if len(items) > MAX_ITEMS_PER_USER:
+            interactions[user_id] = dict(heapq.nlargest(MAX_ITEMS_PER_USER, items.items(), key=lambda item: item[1]))
+    return interactions
+
+
+def compute_neighbors(interactions, products=None, top_k=TOP_K):
+    """
+    Similarité cosinus dot(i, j) / (|i| |j|) sur les vecteurs produit x utilisateur.
+    Ne calcule les voisins que des produits de `products` (tous si None).
+    Retourne {product_id: [(neighbor_id, score), ...]} trié par score décroissant.
+    """
+    norms = defaultdict(float)
+    dots = defaultdict(lambda: defaultdict(float))
+    for items in interactions.values():
+        for product_id, weight in items.items():
+            norms[product_id] += weight * weight
+        for product_id, weight in items.items():
+            if products is not None and product_id not in products:
+                continue
+            row = dots[product_id]
+            for other_id, other_weight in items.items():
+                if other_id != product_id:
+                    row[other_id] += weight * other_weight
+
+    neighbors = {}
+    for product_id, row in dots.items():
+        norm = math.sqrt(norms[product_id])
+        best = heapq.nlargest(
+            top_k,
+            ((dot / (norm * math.sqrt(norms[other_id])), other_id) for other_id, dot in row.items())
+        )
+        neighbors[product_id] = [(other_id, score) for score, other_id in best]
+    return neighbors
+
+
+def incremental_interactions(since):
+    """
+    Pour un recalcul incrémental, retourne (produits à recalculer, interactions nécessaires).
+    Les produits à recalculer sont ceux des utilisateurs ayant eu une interaction depuis `since`.
+    Seuls sont chargés les profils des utilisateurs ayant interagi avec ces produits (produits
+    scalaires et voisins candidats), puis ceux des utilisateurs des voisins candidats (normes) :
+    le coût suit le voisinage des produits modifiés et non le volume total des interactions.
+    """
+    recent = load_interactions(interacting_users(since=since))
+    products = {product_id for items in recent.values() for product_id in items}
+    if not products:
+        return products, {}
+
+    interactions = load_interactions(interacting_users(products=products))
+    candidates = {product_id for items in interactions.values() for product_id in items}
+    missing = interacting_users(products=candidates) - set(interactions)
+    if missing:
+        interactions.update(load_interactions(missing))
+    return products, interactions
+
+
+def refresh_similarities(since=None, top_k=TOP_K):
+    """
+    Recalcule les voisins stockés : tous les produits si `since` est None, sinon seulement
+    ceux touchés depuis `since`. Retourne (produits recalculés, lignes écrites).
+    """
+    if since is None:
+        products, interactions = None, load_interactions()
+    else:
+        products, interactions = incremental_interactions(since)
+        if not products:
+            return 0, 0
+
+    neighbors = compute_neighbors(interactions, products, top_k)
+    rows = [
+        ProductSimilarity(product_id=product_id, neighbor_id=neighbor_id, score=score)
+        for product_id, product_neighbors in neighbors.items()
+        for neighbor_id, score in product_neighbors
+    ]
+
+    with transaction.atomic():
+        stale = ProductSimilarity.objects.all()
+        if products is not None:
+            stale = stale.filter(product_id__in=products)
+        stale.delete()
+        ProductSimilarity.objects.bulk_create(rows, batch_size=1000)
+
+    return len(neighbors if products is None else products), len(rows)
+
+
+def last_refresh():
+    return ProductSimilarity.objects.aggregate(last=Max('updated_at'))['last']
+
+
+def recent_items(user):
+    """Produits récents de l'utilisateur, par source (trois petites requêtes indexées)"""
+    return {
+        SOURCE_PURCHASES: list(OrderItem.objects.filter(order__user=user).order_by('-created_at').values_list(
+            'product_id', flat=True
+        )[:RECENT_ITEMS]),
+        SOURCE_CART: list(CartItem.objects.filter(cart__user=user).order_by('-updated_at').values_list(
+            'product_id', flat=True
+        )[:RECENT_ITEMS]),
+        SOURCE_WISHLIST: list(Wishlist.objects.filter(user=user).order_by('-created_at').values_list(
+            'product_id', flat=True
+        )[:RECENT_ITEMS]),
+    }
+
+
+def recommend(user, limit=10):
+    """
+    Fusionne les listes de voisins des produits récents de l'utilisateur.
+    Retourne {'all': [...], source: [...]} : des IDs de produits classés par score décroissant,
+    sans les produits avec lesquels l'utilisateur a déjà interagi.
+    """
+    seeds = recent_items(user)
+    seed_sources = defaultdict(set)
+    for source, product_ids in seeds.items():
+        for product_id in product_ids:
+            seed_sources[product_id].add(source)
+
+    merged = defaultdict(float)
+    by_source = {source: defaultdict(float) for source in seeds}
+    for product_id, neighbor_id, score in ProductSimilarity.objects.filter(
+        product_id__in=list(seed_sources)
+    ).values_list('product_id', 'neighbor_id', 'score'):
+        if neighbor_id in seed_sources:
+            continue
+        for source in seed_sources[product_id]:
+            merged[neighbor_id] += score * INTERACTION_WEIGHTS[source]
+            by_source[source][neighbor_id] += score
+
+    def top(scores):
+        return [product_id for product_id, _ in heapq.nlargest(limit, scores.items(), key=lambda item: item[1])]
+
+    return {'all': top(merged), **{source: top(scores) for source, scores in by_source.items()}}
@@ -0,0 +1,152 @@
+"""
+Tables de ventes journalières (VendorDailySales, ProductDailySales).
+
+Maintenues de façon incrémentale au passage de commande et aux changements de statut ;
+rebuild_sales_rollups() les recalcule depuis OrderItem (commande backfill_sales, admin).
+La date d'agrégation est la date locale de création de la commande.
+
+Les suppressions faites dans l'admin et celles de produits (lignes supprimées en cascade,
+signaux) recalculent en arrière-plan les seules journées et vendeurs touchés (sales_scope).
+La suppression d'un client efface ses commandes en cascade sans mise à jour des agrégats
+de ses vendeurs : lancer backfill_sales après ce type de suppression.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import OrderItem, ProductDailySales, VendorDailySales
+from .tasks import enqueue
+
+COUNTERS = ('units', 'revenue', 'items', 'orders')
+
+
+def _upsert(model, key, deltas):
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Créée entre-temps par une autre requête
+        model.objects.filter(**key).update(**changes)
+
+
+def _order_deltas(order):
+    """Agrège les lignes d'une commande par vendeur et par produit (une requête)"""
+    vendors = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    products = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for vendor_id, product_id, quantity, total_price in order.items.values_list(
+        'vendor_id', 'product_id', 'quantity', 'total_price'
+    ):
+        for counters in (vendors[vendor_id], products[(product_id, vendor_id)]):
+            counters['units'] += quantity
+            counters['revenue'] += total_price
+            counters['items'] += 1
+            counters['orders'] = 1
+    return vendors, products
+
+
+def _apply(order, status, sign, deltas=None):
+    vendors, products = deltas or _order_deltas(order)
+    date = timezone.localdate(order.created_at)
+    for vendor_id, counters in vendors.items():
+        _upsert(
+            VendorDailySales,
+            {'vendor_id': vendor_id, 'date': date, 'status': status},
+            {field: sign * value for field, value in counters.items()}
+        )
+    for (product_id, vendor_id), counters in products.items():
+        _upsert(
+            ProductDailySales,
+            {'product_id': product_id, 'vendor_id': vendor_id, 'date': date, 'status': status},
+            {field: sign * value for field, value in counters.items()}
+        )
+
+
+def record_order(order):
+    """À appeler après la création des lignes d'une commande, dans la même transaction"""
+    _apply(order, order.status, 1)
+
+
+def record_status_change(order, old_status):
+    """Déplace les ventes d'une commande de l'ancien statut vers le nouveau"""
+    if old_status == order.status:
+        return
+    deltas = _order_deltas(order)
+    _apply(order, old_status, -1, deltas)
+    _apply(order, order.status, 1, deltas)
+
+
+def rebuild_sales_rollups(start_date=None, end_date=None, vendor_ids=None):
+    """
+    Recalcule les agrégats sur [start_date, end_date] (dates locales incluses) en deux requêtes
+    groupées, puis remplace les lignes existantes. Retourne (lignes vendeur, lignes produit).
+    """
+    items = OrderItem.objects.annotate(date=TruncDate('order__created_at'))
+    vendor_rows = VendorDailySales.objects.all()
+    product_rows = ProductDailySales.objects.all()
+    if start_date:
+        items = items.filter(date__gte=start_date)
+        vendor_rows = vendor_rows.filter(date__gte=start_date)
+        product_rows = product_rows.filter(date__gte=start_date)
+    if end_date:
+        items = items.filter(date__lte=end_date)
+        vendor_rows = vendor_rows.filter(date__lte=end_date)
+        product_rows = product_rows.filter(date__lte=end_date)
+    if vendor_ids is not None:
+        items = items.filter(vendor_id__in=vendor_ids)
+        vendor_rows = vendor_rows.filter(vendor_id__in=vendor_ids)
+        product_rows = product_rows.filter(vendor_id__in=vendor_ids)
+
+    aggregates = {
+        'units': Sum('quantity'),
+        'revenue': Sum('total_price'),
+        'items': Count('id'),
+        'orders': Count('order', distinct=True),
+    }
+    vendor_sales = [
+        VendorDailySales(vendor_id=row['vendor_id'], date=row['date'], status=row['status'],
+                         **{field: row[field] or 0 for field in COUNTERS})
+        for row in items.values('vendor_id', 'date', status=F('order__status')).annotate(**aggregates).order_by()
+    ]
+    product_sales = [
+        ProductDailySales(product_id=row['product_id'], vendor_id=row['vendor_id'], date=row['date'],
+                          status=row['status'], **{field: row[field] or 0 for field in COUNTERS})
+        for row in items.values(
+            'product_id', 'vendor_id', 'date', status=F('order__status')
+        ).annotate(**aggregates).order_by()
+    ]
+
+    with transaction.atomic():
+        vendor_rows.delete()
+        product_rows.delete()
+        VendorDailySales.objects.bulk_create(vendor_sales, batch_size=1000)
+        ProductDailySales.objects.bulk_create(product_sales, batch_size=1000)
+
+    return len(vendor_sales), len(product_sales)
+
+
+def sales_scope(items):
+    """{date locale: ids des vendeurs} couverts par un queryset de OrderItem (une requête)"""
+    scope = defaultdict(set)
+    for date, vendor_id in items.annotate(
+        date=TruncDate('order__created_at')
+    ).values_list('date', 'vendor_id').distinct().order_by():
+        scope[date].add(vendor_id)
+    return dict(scope)
+
+
+def rebuild_sales_scope(scope):
+    """Recalcule uniquement les journées et vendeurs de scope (voir sales_scope)"""
+    for date, vendor_ids in scope.items():
+        rebuild_sales_rollups(date, date, vendor_ids=vendor_ids)
+
+
+def schedule_sales_rebuild(scope):
+    """Planifie rebuild_sales_scope après la validation de la transaction en cours"""
+    if scope:
+        transaction.on_commit(lambda: enqueue(rebuild_sales_scope, scope))
@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema_field
 from .models import Location, UserToken, Category, SubCategory, Product, ProductImage, Wishlist, Notification
+from .notifications import SEGMENT_CHOICES, SEGMENT_WISHLISTERS, SEGMENT_BUYERS
+from .wishlist_cache import get_wishlist_ids
 
 User = get_user_model()
 
@@ -30,10 +33,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        return User.objects.create_user(password=password, **validated_data)
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -46,6 +46,7 @@ class RegisterSerializer(serializers.Serializer):
     birthday = serializers.DateField(required=False)
     user_type = serializers.ChoiceField(choices=[('customer', 'Client'), ('vendor', 'Fournisseur')], default='customer')
     password = serializers.CharField(write_only=True)
+    device_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
     
     # Location fields
     location_name = serializers.CharField(max_length=255)
@@ -72,16 +73,15 @@ class RegisterSerializer(serializers.Serializer):
         }
         
         # Créer l'utilisateur
+        device_name = validated_data.pop('device_name', '')
         password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
+        user = User.objects.create_user(password=password, **validated_data)
         
         # Créer la localisation
         Location.objects.create(user=user, **location_data)
         
-        # Créer le token
-        UserToken.objects.create(user=user)
+        # Créer le token du premier appareil
+        UserToken.objects.create(user=user, device_name=device_name)
         
         return user
 
@@ -89,6 +89,7 @@ class RegisterSerializer(serializers.Serializer):
 class LoginSerializer(serializers.Serializer):
     identifier = serializers.CharField()
     password = serializers.CharField(write_only=True)
+    device_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
 
 
 class UserResponseSerializer(serializers.ModelSerializer):
@@ -104,20 +105,28 @@ class UserResponseSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(serializers.CharField)
     def get_token(self, obj):
-        try:
-            return str(obj.auth_token.token)
-        except:
-            return None
+        # Token de l'appareil courant si la vue le fournit, sinon le plus récent encore valide
+        user_token = self.context.get('token') or obj.auth_tokens.filter(
+            is_active=True, expires_at__gt=timezone.now()
+        ).order_by('-created_at').first()
+        return str(user_token.token) if user_token else None
 
 
 class SubCategorySerializer(serializers.ModelSerializer):
+    products_count = serializers.SerializerMethodField()
+
     class Meta:
         model = SubCategory
         fields = [
-            'id', 'name', 'name_trl', 'description', 'is_active', 
+            'id', 'name', 'name_trl', 'description', 'is_active', 'products_count',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'products_count']
+
+    @extend_schema_field(serializers.IntegerField(allow_null=True))
+    def get_products_count(self, obj):
+        # Annoté par les vues du catalogue (catalog_counts.with_product_counts)
+        return getattr(obj, 'products_count', None)
 
     def validate_name(self, value):
         if SubCategory.objects.filter(name__iexact=value).exists():
@@ -135,15 +144,16 @@ class CategorySerializer(serializers.ModelSerializer):
         help_text="Liste des IDs des sous-catégories à associer"
     )
     subcategories_count = serializers.SerializerMethodField()
+    products_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
         fields = [
             'id', 'name', 'name_trl', 'description', 'is_active',
-            'subcategories', 'subcategory_ids', 'subcategories_count',
+            'subcategories', 'subcategory_ids', 'subcategories_count', 'products_count',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'subcategories_count']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'subcategories_count', 'products_count']
 
     def validate_name(self, value):
         if Category.objects.filter(name__iexact=value).exists():
@@ -153,7 +163,13 @@ class CategorySerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.IntegerField)
     def get_subcategories_count(self, obj):
-        return obj.subcategories.count()
+        # Utilise le prefetch_related('subcategories') des vues au lieu d'un COUNT par catégorie
+        return len(obj.subcategories.all())
+
+    @extend_schema_field(serializers.IntegerField(allow_null=True))
+    def get_products_count(self, obj):
+        # Annoté par les vues du catalogue (catalog_counts.with_product_counts)
+        return getattr(obj, 'products_count', None)
 
     def create(self, validated_data):
         subcategory_ids = validated_data.pop('subcategory_ids', [])
@@ -198,6 +214,7 @@ class ProductSerializer(serializers.ModelSerializer):
     location_details = LocationSerializer(source='location', read_only=True)
     category_details = CategorySerializer(source='category', read_only=True)
     subcategory_details = SubCategorySerializer(source='subcategory', read_only=True)
+    is_wishlisted = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -205,9 +222,21 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'name', 'price', 'location', 'user', 'quantity', 'is_stock',
             'images', 'image_files', 'status', 'description', 'conditions_paiement',
             'category', 'subcategory', 'created_at', 'updated_at',
-            'user_details', 'location_details', 'category_details', 'subcategory_details'
+            'user_details', 'location_details', 'category_details', 'subcategory_details',
+            'is_wishlisted'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'user', 'is_wishlisted']
+
+    @extend_schema_field(serializers.BooleanField)
+    def get_is_wishlisted(self, obj):
+        # L'ensemble des produits en wishlist est lu une fois par requête et partagé par toutes les lignes
+        if 'wishlist_ids' not in self.context:
+            request = self.context.get('request')
+            user = getattr(request, 'user', None)
+            self.context['wishlist_ids'] = (
+                get_wishlist_ids(user.pk) if user is not None and user.is_authenticated else frozenset()
+            )
+        return obj.pk in self.context['wishlist_ids']
 
     def create(self, validated_data):
         image_files = validated_data.pop('image_files', [])
@@ -281,4 +310,23 @@ class NotificationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context.get('user') or self.context['request'].user
         validated_data['user'] = user
-        return Notification.objects.create(**validated_data)
\ No newline at end of file
+        return Notification.objects.create(**validated_data)
+
+class NotificationBroadcastSerializer(serializers.Serializer):
+    segment = serializers.ChoiceField(choices=SEGMENT_CHOICES)
+    titre = serializers.CharField(max_length=255)
+    content = serializers.CharField()
+    user_type = serializers.ChoiceField(
+        choices=[('customer', 'Client'), ('vendor', 'Fournisseur')],
+        required=False,
+        help_text="Type d'utilisateur ciblé (segment user_type, tous si absent)"
+    )
+    product_id = serializers.UUIDField(required=False, help_text="Produit ciblé (segment wishlisters)")
+    vendor_id = serializers.UUIDField(required=False, help_text="Vendeur ciblé (segment buyers)")
+
+    def validate(self, data):
+        if data['segment'] == SEGMENT_WISHLISTERS and not data.get('product_id'):
+            raise serializers.ValidationError({'product_id': "Requis pour le segment wishlisters."})
+        if data['segment'] == SEGMENT_BUYERS and not data.get('vendor_id'):
+            raise serializers.ValidationError({'vendor_id': "Requis pour le segment buyers."})
+        return data
@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .catalog_counts import apply_product_change
+from .category_tree import invalidate_category_tree
+from .dashboard_cache import bump_dashboard_versions
+from .models import (
+    Category, CartItem, Order, OrderItem, Product, ProductRating, Review, SubCategory, UserToken, VendorRating, Wishlist
+)
+from .sales import sales_scope, schedule_sales_rebuild
+from .token_cache import get_token_cache
+from .wishlist_cache import invalidate_wishlist_ids
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=UserToken)
+@receiver(post_delete, sender=UserToken)
+def invalidate_cached_token(sender, instance, **kwargs):
+    get_token_cache().invalidate(instance.token)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance, created, update_fields=None, **kwargs):
+    # Seules les modifications qui changent l'authentification ou les droits invalident le cache
+    if created or (update_fields is not None and not set(update_fields) & set(User.AUTH_FIELDS)):
+        return
+    values = instance.auth_values()
+    if getattr(instance, '_loaded_auth', None) != values:
+        get_token_cache().invalidate_user(instance.pk)
+    instance._loaded_auth = values
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_cached_deleted_user(sender, instance, **kwargs):
+    # pre_delete : les tokens doivent encore exister pour retrouver leurs clés de cache
+    get_token_cache().invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def invalidate_order_dashboards(sender, instance, **kwargs):
+    vendor_ids = list(OrderItem.objects.filter(order_id=instance.pk).values_list('vendor_id', flat=True))
+    bump_dashboard_versions([instance.user_id, *vendor_ids])
+
+
+@receiver(pre_delete, sender=Order)
+def collect_deleted_order_vendors(sender, instance, **kwargs):
+    # Au post_delete les lignes ont déjà été supprimées en cascade
+    instance._vendor_ids = list(OrderItem.objects.filter(order_id=instance.pk).values_list('vendor_id', flat=True))
+
+
+@receiver(post_delete, sender=Order)
+def invalidate_deleted_order_dashboards(sender, instance, **kwargs):
+    bump_dashboard_versions([instance.user_id, *getattr(instance, '_vendor_ids', [])])
+
+
+def order_customer_id(item):
+    """Client de la commande d'une ligne, sans requête quand la commande est déjà chargée"""
+    if OrderItem.order.is_cached(item):
+        return item.order.user_id
+    return Order.objects.filter(pk=item.order_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=OrderItem)
+def invalidate_order_item_dashboards(sender, instance, **kwargs):
+    bump_dashboard_versions([instance.vendor_id, order_customer_id(instance)])
+
+
+@receiver(post_delete, sender=OrderItem)
+def invalidate_deleted_order_item_dashboards(sender, instance, **kwargs):
+    # Pas de requête par ligne lors des cascades : le client est pris en charge par les signaux
+    # de Order (suppression de la commande) et de Product (suppression du produit)
+    customer_id = instance.order.user_id if OrderItem.order.is_cached(instance) else None
+    bump_dashboard_versions([instance.vendor_id, customer_id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_dashboards(sender, instance, **kwargs):
+    bump_dashboard_versions([instance.user_id, instance.vendor_id])
+
+
+@receiver(post_save, sender=Review)
+def update_ratings_on_review_save(sender, instance, **kwargs):
+    # Avis créés ou modifiés via l'API comme via l'admin
+    VendorRating.objects.get_or_create(vendor_id=instance.vendor_id)[0].update_rating()
+    ProductRating.objects.get_or_create(product_id=instance.product_id)[0].update_rating()
+
+
+@receiver(post_delete, sender=Review)
+def update_ratings_on_review_delete(sender, instance, **kwargs):
+    # Pas de création : le vendeur ou le produit peut être en cours de suppression en cascade
+    for rating in (
+        VendorRating.objects.filter(vendor_id=instance.vendor_id).first(),
+        ProductRating.objects.filter(product_id=instance.product_id).first(),
+    ):
+        if rating is not None:
+            rating.update_rating()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_dashboards(sender, instance, **kwargs):
+    bump_dashboard_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def invalidate_wishlist_dashboards(sender, instance, **kwargs):
+    bump_dashboard_versions([instance.user_id])
+    invalidate_wishlist_ids([instance.user_id])
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_dashboards(sender, instance, **kwargs):
+    bump_dashboard_versions([instance.cart.user_id])
+
+
+@receiver(pre_delete, sender=Product)
+def collect_product_sales_scope(sender, instance, **kwargs):
+    # Les lignes de commande du produit vont être supprimées en cascade : on note leurs journées
+    # et les clients concernés
+    # Valeurs suivies relues et verrouillées : l'instance a pu être chargée avant une autre écriture
+    instance._deleted_values = Product.objects.select_for_update().filter(
+        pk=instance.pk
+    ).values(*Product.TRACKED_FIELDS).first()
+    items = OrderItem.objects.filter(product_id=instance.pk)
+    instance._sales_scope = sales_scope(items)
+    instance._customer_ids = set(items.values_list('order__user_id', flat=True)) if instance._sales_scope else set()
+
+
+@receiver(post_delete, sender=Product)
+def rebuild_deleted_product_sales(sender, instance, **kwargs):
+    schedule_sales_rebuild(getattr(instance, '_sales_scope', None))
+    bump_dashboard_versions(getattr(instance, '_customer_ids', ()))
+
+
+@receiver(post_delete, sender=Product)
+def decrement_product_counts(sender, instance, **kwargs):
+    apply_product_change(getattr(instance, '_deleted_values', None) or instance.tracked_values(), None)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(m2m_changed, sender=Category.subcategories.through)
+def invalidate_cached_category_tree(sender, **kwargs):
+    invalidate_category_tree()
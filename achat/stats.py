@@ -0,0 +1,37 @@
+"""
+Séries statistiques par mois calendaire pour les tableaux de bord
+"""
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+MAX_MONTHS = 36
+
+
+def add_months(month_start, delta):
+    index = month_start.year * 12 + month_start.month - 1 + delta
+    return month_start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_starts(months, now=None):
+    """Débuts des `months` derniers mois calendaires (mois courant inclus), dans l'ordre chronologique"""
+    current = timezone.localtime(now or timezone.now()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return [add_months(current, -i) for i in range(months - 1, -1, -1)]
+
+
+def monthly_totals(queryset, months, date_field='created_at', **aggregates):
+    """
+    Agrège `queryset` par mois calendaire en une seule requête GROUP BY (TruncMonth).
+    Retourne [(début du mois, {agrégats})] sur `months` mois, les mois sans données
+    étant complétés par des agrégats à None.
+    """
+    starts = month_starts(months)
+    rows = queryset.filter(**{
+        f'{date_field}__gte': starts[0],
+        f'{date_field}__lt': add_months(starts[-1], 1),
+    }).annotate(
+        month=TruncMonth(date_field)
+    ).values('month').annotate(**aggregates).order_by('month')
+
+    by_month = {(row['month'].year, row['month'].month): row for row in rows}
+    empty = dict.fromkeys(aggregates)
+    return [(start, by_month.get((start.year, start.month), empty)) for start in starts]
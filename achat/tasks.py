@@ -0,0 +1,43 @@
+"""
+Exécution de tâches en arrière-plan dans le processus (sans broker externe)
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ACHAT_TASK_WORKERS', 2),
+            thread_name_prefix='achat-task'
+        )
+    return _executor
+
+
+def _run(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Échec de la tâche %s", getattr(func, '__name__', func))
+        raise
+    finally:
+        close_old_connections()
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Planifie func(*args, **kwargs) sur le pool de workers.
+    Avec ACHAT_TASKS_EAGER = True (tests, scripts), la tâche s'exécute immédiatement.
+    """
+    if getattr(settings, 'ACHAT_TASKS_EAGER', False):
+        return func(*args, **kwargs)
+    return get_executor().submit(_run, func, *args, **kwargs)
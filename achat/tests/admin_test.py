@@ -0,0 +1,315 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from .. import platform_stats
+from ..admin_jobs import run_admin_job
+from ..admin_dashboard import AchatDashboardView
+from ..admin_search import classify
+from ..models import (
+    AdminJob, Cart, CartItem, Category, CategoryProductCount, DeliveryOption, Location, Notification, Order,
+    OrderItem, PlatformStats, Product, ProductPriceHistory, Shipment, UserToken, VendorDailySales
+)
+from ..notifications import get_counts
+
+User = get_user_model()
+
+
+@override_settings(ACHAT_TASKS_EAGER=True)
+class PlatformStatsTestCase(APITestCase):
+    """Tests pour l'instantané des statistiques de l'administration"""
+
+    def setUp(self):
+        cache.clear()
+        platform_stats._local = None
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        User.objects.create_user(identifier='idle@test.com', nom='Bernard', prenom='Luc', user_type='vendor')
+        User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean')
+        location = Location.objects.create(name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor)
+        Product.objects.create(name='Produit', price=10, quantity=5, location=location, user=self.vendor)
+
+    def test_snapshot_counts(self):
+        """Test que l'instantané contient les compteurs de l'accueil de l'administration"""
+        stats = platform_stats.get_platform_stats().data
+
+        self.assertEqual(stats['total_users'], 3)
+        self.assertEqual(stats['total_vendors'], 2)
+        self.assertEqual(stats['total_customers'], 1)
+        self.assertEqual(stats['active_vendors'], 1)
+        self.assertEqual(stats['total_products'], 1)
+        self.assertEqual(stats['top_cities'], [{'name': 'Lyon', 'count': 1}])
+
+    def test_repeat_reads_do_not_query(self):
+        """Test que les lectures suivantes sont servies depuis la mémoire du processus"""
+        platform_stats.get_platform_stats()
+        with self.assertNumQueries(0):
+            platform_stats.get_platform_stats()
+
+        platform_stats._local = None
+        with self.assertNumQueries(1):
+            platform_stats.get_platform_stats()
+
+    def test_stale_snapshot_is_refreshed_in_background(self):
+        """Test qu'un instantané périmé est servi puis remplacé"""
+        stale = platform_stats.get_platform_stats()
+        PlatformStats.objects.filter(pk=stale.pk).update(computed_at=stale.computed_at - timedelta(hours=1))
+        platform_stats._local = None
+
+        self.assertEqual(platform_stats.get_platform_stats().pk, stale.pk)
+        self.assertEqual(PlatformStats.objects.count(), 2)
+        self.assertNotEqual(platform_stats.get_platform_stats().pk, stale.pk)
+
+    def test_dashboard_reads_snapshot(self):
+        """Test que le tableau de bord Achat lit ses compteurs dans l'instantané"""
+        snapshot = platform_stats.get_platform_stats()
+        view = AchatDashboardView()
+        view.setup(RequestFactory().get('/'))
+
+        context = view.get_context_data()
+
+        self.assertEqual(context['total_users'], 3)
+        self.assertEqual(context['last_updated'], snapshot.computed_at)
+
+
+class AnnotatedChangelistTestCase(APITestCase):
+    """Tests pour les compteurs des listes de l'administration"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(identifier='admin@test.com', nom='Admin', prenom='Root')
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            vendor = User.objects.create_user(
+                identifier=f'vendor{self.rows}@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+            )
+            location = Location.objects.create(name='Lyon', longitude=4.8357, latitude=45.7640, user=vendor)
+            product = Product.objects.create(name='Produit', price=10, quantity=5, location=location, user=vendor)
+            cart = Cart.objects.create(user=vendor)
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+    def changelist_queries(self, name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:achat_{name}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_depend_on_page_size(self):
+        """Test que le nombre de requêtes des listes est constant quel que soit le nombre de lignes"""
+        names = ['customuser', 'vendorproxy', 'location', 'product', 'cart', 'cartitem']
+        self.add_rows(1)
+        few = {name: self.changelist_queries(name) for name in names}
+        self.add_rows(4)
+        many = {name: self.changelist_queries(name) for name in names}
+
+        self.assertEqual(few, many)
+
+    def test_annotated_columns_are_sortable(self):
+        """Test que les colonnes calculées affichent les bonnes valeurs et se trient"""
+        self.add_rows(2)
+        CartItem.objects.create(
+            cart=Cart.objects.get(user__identifier='vendor1@test.com'),
+            product=Product.objects.get(user__identifier='vendor2@test.com'), quantity=1
+        )
+
+        response = self.client.get(reverse('admin:achat_cart_changelist'), {'o': '-2'})
+
+        carts = list(response.context['cl'].result_list)
+        self.assertEqual([cart.items_quantity for cart in carts], [3, 2])
+        self.assertEqual(carts[0].items_amount, 30)
+
+
+@override_settings(ACHAT_TASKS_EAGER=True, ACHAT_ADMIN_JOB_CHUNK_SIZE=2)
+class AdminJobsTestCase(APITestCase):
+    """Tests pour les actions d'administration exécutées en arrière-plan"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(identifier='admin@test.com', nom='Admin', prenom='Root')
+        self.client.force_login(self.admin)
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        self.location = Location.objects.create(name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor)
+        self.category = Category.objects.create(name='Informatique')
+
+    def run_action(self, name, action, objects):
+        response = self.client.post(reverse(f'admin:achat_{name}_changelist'), {
+            'action': action, '_selected_action': [str(obj.pk) for obj in objects]
+        })
+        self.assertEqual(response.status_code, 302)
+        return AdminJob.objects.get()
+
+    def test_product_status_job_updates_counters_in_chunks(self):
+        """Test que le changement de statut maintient compteurs et historique de prix"""
+        products = [
+            Product.objects.create(
+                name=f'Produit {i}', price=10, quantity=5, location=self.location, user=self.vendor, category=self.category
+            )
+            for i in range(3)
+        ]
+
+        job = self.run_action('product', 'background_product_status_inactive', products)
+
+        self.assertEqual((job.status, job.total, job.processed, job.affected), ('done', 3, 3, 3))
+        self.assertFalse(Product.objects.filter(status='active').exists())
+        counts = dict(CategoryProductCount.objects.filter(category=self.category).values_list('status', 'count'))
+        self.assertEqual(counts, {'active': 0, 'inactive': 3})
+        self.assertEqual(ProductPriceHistory.objects.filter(is_available=False).count(), 3)
+
+    def test_order_status_job_rebuilds_sales(self):
+        """Test que le changement de statut des commandes déplace les ventes"""
+        product = Product.objects.create(name='Produit', price=10, quantity=5, location=self.location, user=self.vendor)
+        order = Order.objects.create(user=self.admin, total_amount=20, delivery_location=self.location)
+        OrderItem.objects.create(
+            order=order, product=product, vendor=self.vendor, quantity=2, unit_price=10, total_price=20
+        )
+
+        job = self.run_action('order', 'background_order_status_cancelled', [order])
+
+        self.assertEqual(job.affected, 1)
+        self.assertEqual(
+            list(VendorDailySales.objects.filter(vendor=self.vendor).values_list('status', 'units')),
+            [('cancelled', 2)]
+        )
+
+    def test_token_and_notification_jobs(self):
+        """Test la désactivation des tokens et la suppression des notifications avec leurs compteurs"""
+        tokens = [UserToken.objects.create(user=self.vendor) for _ in range(3)]
+        notifications = [Notification.objects.create(user=self.vendor, titre='Info', content='...') for _ in range(3)]
+
+        self.run_action('usertoken', 'background_deactivate_tokens', tokens)
+        self.assertFalse(UserToken.objects.filter(is_active=True).exists())
+
+        AdminJob.objects.all().delete()
+        job = self.run_action('notification', 'background_delete_notifications', notifications[:2])
+        self.assertEqual(job.affected, 2)
+        self.assertEqual(get_counts(self.vendor.id)['total_count'], 1)
+
+    def test_interrupted_jobs_are_failed_and_not_resumed(self):
+        """Test que les jobs sans activité sont marqués en échec et ne sont plus exécutés"""
+        stale = AdminJob.objects.create(operation='deactivate_tokens', description='Ancien', total=1)
+        running = AdminJob.objects.create(operation='deactivate_tokens', description='Récent', status='running')
+        AdminJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        out = StringIO()
+        call_command('fail_stale_admin_jobs', stale_after=3600, stdout=out)
+
+        self.assertIn('1 tâche(s)', out.getvalue())
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'failed')
+        self.assertEqual(AdminJob.objects.get(pk=running.pk).status, 'running')
+
+        token = UserToken.objects.create(user=self.vendor)
+        run_admin_job(stale.pk, [token.pk])
+        self.assertTrue(UserToken.objects.get(pk=token.pk).is_active)
+
+
+class AdminSearchTestCase(APITestCase):
+    """Tests pour la recherche indexée de l'administration"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(identifier='admin@test.com', nom='Admin', prenom='Root')
+        self.client.force_login(self.admin)
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        self.location = Location.objects.create(name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor)
+
+    def search(self, name, term):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:achat_{name}_changelist'), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list), queries
+
+    def test_classify(self):
+        """Test la reconnaissance des saisies qui ressemblent à une clé"""
+        self.assertEqual(classify(str(self.vendor.id))[0], 'uuid')
+        self.assertEqual(classify('est202610191230001234'), ('order_number', 'EST202610191230001234'))
+        self.assertEqual(classify('SHIP20261019123000123')[0], 'tracking_number')
+        self.assertEqual(classify('vendor@test.com')[0], 'identifier')
+        self.assertEqual(classify('+237690000000')[0], 'identifier')
+        self.assertEqual(classify('ordinateur portable')[0], None)
+
+    def test_exact_lookups_do_not_scan(self):
+        """Test que numéros de commande et identifiants sont cherchés par égalité"""
+        order = Order.objects.create(user=self.admin, total_amount=20, delivery_location=self.location)
+        Order.objects.create(user=self.admin, total_amount=30, delivery_location=self.location)
+
+        results, queries = self.search('order', order.order_number.lower())
+        self.assertEqual(results, [order])
+        self.assertFalse(any('LIKE' in query['sql'] for query in queries))
+
+        results, _ = self.search('vendorproxy', 'vendor@test.com')
+        self.assertEqual(results, [self.vendor])
+
+    def test_free_text_matches_prefixes(self):
+        """Test que le texte libre correspond par préfixe (de mot sous PostgreSQL, de colonne ailleurs)"""
+        laptop = Product.objects.create(
+            name='Ordinateur portable', price=10, quantity=5, location=self.location, user=self.vendor,
+            description='Écran mat'
+        )
+        Product.objects.create(name='Ordinateur fixe', price=10, quantity=5, location=self.location, user=self.vendor)
+
+        results, _ = self.search('product', 'ordinateur p')
+        self.assertEqual(results, [laptop])
+
+        results, _ = self.search('location', 'ly')
+        self.assertEqual(results, [self.location])
+
+        if connection.vendor == 'postgresql':
+            results, _ = self.search('product', 'ordi port')
+            self.assertEqual(results, [laptop])
+        else:
+            # Pas de recherche au milieu du texte (non indexable) hors PostgreSQL
+            results, _ = self.search('product', 'mat')
+            self.assertEqual(results, [])
+
+    def test_partial_keys_match_by_prefix(self):
+        """Test que numéros de commande, de suivi et identifiants partiels sont trouvés"""
+        order = Order.objects.create(user=self.admin, total_amount=20, delivery_location=self.location)
+        shipment = Shipment.objects.create(order=order, delivery_option=DeliveryOption.objects.create(
+            name='Standard', delivery_type='standard', price=5
+        ))
+
+        results, _ = self.search('order', order.order_number[:7].lower())
+        self.assertEqual(results, [order])
+        results, _ = self.search('shipment', shipment.tracking_number[:8])
+        self.assertEqual(results, [shipment])
+        results, _ = self.search('vendorproxy', 'vendor@')
+        self.assertEqual(results, [self.vendor])
+        results, _ = self.search('customuser', 'vend')
+        self.assertEqual(results, [self.vendor])
+
+    def test_products_match_vendor_name_and_tokens_device_name(self):
+        """Test que les produits sont trouvés par nom de vendeur et les tokens par appareil"""
+        product = Product.objects.create(name='Chaise', price=10, quantity=5, location=self.location, user=self.vendor)
+        token = UserToken.objects.create(user=self.vendor, device_name='Pixel 8')
+        UserToken.objects.create(user=self.admin, device_name='iPhone')
+
+        results, _ = self.search('product', 'martin')
+        self.assertEqual(results, [product])
+        results, _ = self.search('usertoken', 'pixel')
+        self.assertEqual(results, [token])
+
+    @override_settings(ACHAT_ADMIN_SEARCH_LIMIT=2)
+    def test_free_text_results_are_capped(self):
+        """Test que le texte libre retourne au plus ACHAT_ADMIN_SEARCH_LIMIT lignes"""
+        for i in range(3):
+            Product.objects.create(name=f'Chaise {i}', price=10, quantity=5, location=self.location, user=self.vendor)
+
+        results, _ = self.search('product', 'chaise')
+        self.assertEqual(len(results), 2)
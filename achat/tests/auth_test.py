@@ -1,10 +1,21 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from ..models import Location, UserToken
+from ..authentication import UUIDTokenAuthentication
+from ..hashing import PasswordHashingBusy
+from ..throttling import get_bucket_store
+from ..token_cache import TOKEN_CACHE_PREFIX, LastSeenRecorder, get_token_cache
 import json
+from datetime import timedelta
+from django.utils import timezone
+from unittest import mock
+from django.contrib.auth import hashers
 
 User = get_user_model()
 
@@ -14,6 +25,7 @@ class AuthenticationTestCase(APITestCase):
     
     def setUp(self):
         """Configuration initiale pour les tests"""
+        get_bucket_store().clear()
         self.register_url = reverse('register')
         self.login_url = reverse('login')
         
@@ -65,8 +77,7 @@ class AuthenticationTestCase(APITestCase):
         self.assertTrue(location.is_default)
         
         # Vérifier que le token est créé
-        self.assertTrue(hasattr(user, 'auth_token'))
-        self.assertTrue(user.auth_token.is_active)
+        self.assertTrue(user.auth_tokens.filter(is_active=True).exists())
 
     def test_register_vendor_success(self):
         """Test d'inscription réussie d'un fournisseur"""
@@ -206,12 +217,12 @@ class AuthenticationTestCase(APITestCase):
         user = User.objects.get(identifier=self.customer_data['identifier'])
         
         # Vérifier qu'un token est créé
-        self.assertTrue(hasattr(user, 'auth_token'))
-        self.assertTrue(user.auth_token.is_active)
+        user_token = user.auth_tokens.get()
+        self.assertTrue(user_token.is_active)
         
         # Vérifier que le token est retourné dans la réponse
         self.assertIn('token', response.data)
-        self.assertEqual(response.data['token'], str(user.auth_token.token))
+        self.assertEqual(response.data['token'], str(user_token.token))
 
 
 class VendorProductManagementTestCase(APITestCase):
@@ -219,6 +230,7 @@ class VendorProductManagementTestCase(APITestCase):
     
     def setUp(self):
         """Configuration initiale pour les tests de produits vendors"""
+        get_bucket_store().clear()
         # URLs
         self.register_url = reverse('register')
         self.login_url = reverse('login')
@@ -531,3 +543,250 @@ class VendorProductManagementTestCase(APITestCase):
         
         # Doit être refusé
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenCacheTestCase(APITestCase):
+    """Tests pour le cache des tokens d'authentification"""
+
+    def setUp(self):
+        cache.clear()
+        get_token_cache().clear()
+        self.user = User.objects.create_user(
+            identifier='customer@test.com', nom='Dupont', prenom='Jean', password='testpassword123'
+        )
+        self.token = UserToken.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.token}')
+        self.count_url = reverse('notification-notifications-count')
+
+    def test_cached_token_needs_no_auth_query(self):
+        """Test qu'un token déjà vu est résolu sans requête sur les tokens"""
+        self.client.get(self.count_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.count_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('achat_usertoken' in query['sql'] for query in queries))
+
+    def test_logout_invalidates_cached_token(self):
+        """Test qu'un token déconnecté est refusé malgré le cache"""
+        self.client.get(self.count_url)
+
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.count_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_change_refreshes_cached_user(self):
+        """Test qu'une modification de l'utilisateur n'est pas masquée par le cache"""
+        self.client.get(self.count_url)
+
+        self.user.user_type = 'vendor'
+        self.user.save()
+
+        cached_user, _ = UUIDTokenAuthentication().authenticate_credentials(str(self.token.token))
+        self.assertEqual(cached_user.user_type, 'vendor')
+
+    def test_profile_change_keeps_cached_tokens(self):
+        """Test qu'une modification sans effet sur l'authentification n'invalide rien"""
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.nom = 'Durand'
+            user.save()
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+
+        self.assertFalse(any('achat_usertoken' in query['sql'] for query in queries))
+
+    def test_shared_ttl_is_capped_for_process_local_cache(self):
+        """Test qu'un cache par processus ne garde pas un token plus longtemps que le LRU local"""
+        shared = get_token_cache().shared
+        with mock.patch.object(shared, 'set', wraps=shared.set) as shared_set:
+            self.client.get(self.count_url)
+
+        timeouts = [call.args[2] for call in shared_set.call_args_list if call.args[0].startswith(TOKEN_CACHE_PREFIX)]
+        self.assertTrue(timeouts)
+        self.assertLessEqual(max(timeouts), get_token_cache().local.ttl)
+
+
+class PasswordHashingTestCase(APITestCase):
+    """Tests pour le hachage des mots de passe dans le pool borné"""
+
+    def setUp(self):
+        get_bucket_store().clear()
+        self.register_url = reverse('register')
+        self.login_url = reverse('login')
+        self.register_data = {
+            'identifier': 'customer@test.com', 'nom': 'Dupont', 'prenom': 'Jean', 'gender': 'M',
+            'username': 'customer_test', 'password': 'testpassword123',
+            'location_name': 'Paris', 'longitude': 2.3522, 'latitude': 48.8566
+        }
+
+    def test_register_hashes_password_once(self):
+        """Test que l'inscription ne hache le mot de passe qu'une seule fois"""
+        with mock.patch('achat.hashing.hashers.make_password', wraps=hashers.make_password) as make_password:
+            response = self.client.post(self.register_url, self.register_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(make_password.call_count, 1)
+        self.assertTrue(User.objects.get(identifier='customer@test.com').check_password('testpassword123'))
+
+    def test_login_returns_503_when_pool_is_saturated(self):
+        """Test qu'un pool saturé renvoie 503 au lieu de bloquer"""
+        User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean', password='testpassword123')
+
+        with mock.patch('achat.authentication.check_user_password', side_effect=PasswordHashingBusy("Occupé")):
+            response = self.client.post(
+                self.login_url, {'identifier': 'customer@test.com', 'password': 'testpassword123'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class DeviceTokenTestCase(APITestCase):
+    """Tests pour les tokens par appareil (expiration, rotation, déconnexion)"""
+
+    def setUp(self):
+        cache.clear()
+        get_token_cache().clear()
+        get_bucket_store().clear()
+        self.login_url = reverse('login')
+        self.count_url = reverse('notification-notifications-count')
+        self.user = User.objects.create_user(
+            identifier='customer@test.com', nom='Dupont', prenom='Jean', password='testpassword123'
+        )
+
+    def login(self, device_name):
+        response = self.client.post(self.login_url, {
+            'identifier': 'customer@test.com', 'password': 'testpassword123', 'device_name': device_name
+        }, format='json')
+        return response.data['token']
+
+    def test_logout_only_revokes_current_device(self):
+        """Test que chaque appareil a son token et que la déconnexion ne touche que l'appareil courant"""
+        phone_token = self.login('phone')
+        laptop_token = self.login('laptop')
+        self.assertNotEqual(phone_token, laptop_token)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {phone_token}')
+        self.assertEqual(self.client.post(reverse('logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {laptop_token}')
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_200_OK)
+
+    def test_relogin_with_same_device_name_replaces_token(self):
+        """Test qu'une reconnexion avec le même device_name révoque l'ancien token de cet appareil"""
+        old_token = self.login('phone')
+        self.login('phone')
+
+        self.assertFalse(UserToken.objects.get(token=old_token).is_active)
+
+    def test_shared_user_agent_does_not_revoke_other_devices(self):
+        """Test que deux appareils sans device_name et de même User-Agent gardent chacun leur token"""
+        credentials = {'identifier': 'customer@test.com', 'password': 'testpassword123'}
+        first = self.client.post(self.login_url, credentials, format='json', HTTP_USER_AGENT='EstuaireApp/1.0')
+        second = self.client.post(self.login_url, credentials, format='json', HTTP_USER_AGENT='EstuaireApp/1.0')
+
+        self.assertEqual(UserToken.objects.filter(user=self.user, is_active=True).count(), 2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {first.data['token']}")
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_200_OK)
+        self.assertEqual(UserToken.objects.get(token=second.data['token']).device_name, 'EstuaireApp/1.0')
+
+    def test_expired_token_is_rejected(self):
+        """Test qu'un token expiré est refusé"""
+        token = self.login('phone')
+        UserToken.objects.filter(token=token).update(expires_at=timezone.now() - timedelta(minutes=1))
+        get_token_cache().invalidate(token)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_token(self):
+        """Test que la rotation fournit un nouveau token et invalide l'ancien"""
+        old_token = self.login('phone')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {old_token}')
+
+        response = self.client.post(reverse('token-refresh'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["token"]}')
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_200_OK)
+
+    def test_refresh_of_revoked_token_is_rejected(self):
+        """Test qu'un token révoqué en base mais encore en cache ne peut pas être échangé"""
+        token = self.login('phone')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_200_OK)
+        # Révocation par un autre processus : le cache local de celui-ci n'est pas invalidé
+        UserToken.objects.filter(token=token).update(is_active=False)
+
+        response = self.client.post(reverse('token-refresh'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(UserToken.objects.filter(user=self.user, is_active=True).count(), 0)
+
+    def test_last_seen_writes_are_batched(self):
+        """Test que les dernières activités sont écrites en un seul lot"""
+        tokens = [UserToken.objects.create(user=self.user, device_name=f'device{i}') for i in range(3)]
+        recorder = LastSeenRecorder(flush_interval=3600)
+        for token in tokens:
+            recorder.record(token.id)
+            recorder.record(token.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(recorder.flush(), 3)
+
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(UserToken.objects.filter(last_seen_at__isnull=True, device_name__startswith='device').exists())
+
+
+class AuthThrottleTestCase(APITestCase):
+    """Tests pour la limitation de débit de la connexion et de l'inscription"""
+
+    def setUp(self):
+        get_bucket_store().clear()
+        self.login_url = reverse('login')
+
+    @override_settings(ACHAT_THROTTLE_RATES={'login_identifier': '2/min'})
+    def test_identifier_bucket_rejects_before_hashing(self):
+        """Test qu'au-delà du seau, la connexion est refusée sans requête ni hachage"""
+        credentials = {'identifier': 'victim@test.com', 'password': 'wrong'}
+        for _ in range(2):
+            self.client.post(self.login_url, credentials, format='json')
+
+        with mock.patch('achat.authentication.check_user_password') as check_password, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.login_url, credentials, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(len(queries), 0)
+        check_password.assert_not_called()
+
+        # Un autre identifier n'est pas concerné
+        response = self.client.post(self.login_url, {'identifier': 'other@test.com', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(ACHAT_THROTTLE_RATES={'login_ip': '3/min', 'login_global': '10/min'})
+    def test_limited_ip_does_not_exhaust_global_bucket(self):
+        """Test que les requêtes refusées d'une IP ne consomment pas le seau global des autres"""
+        credentials = {'identifier': 'customer@test.com', 'password': 'wrong'}
+        responses = [
+            self.client.post(self.login_url, credentials, format='json', REMOTE_ADDR='1.1.1.1') for _ in range(12)
+        ]
+        self.assertEqual(sum(r.status_code == status.HTTP_429_TOO_MANY_REQUESTS for r in responses), 9)
+
+        response = self.client.post(self.login_url, credentials, format='json', REMOTE_ADDR='2.2.2.2')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(ACHAT_THROTTLE_RATES={'register_ip': '1/hour'})
+    def test_register_ip_bucket(self):
+        """Test que l'inscription est limitée par adresse IP"""
+        self.client.post(reverse('register'), {}, format='json')
+        response = self.client.post(reverse('register'), {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,233 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from .. import category_tree
+from ..category_tree import current_version, invalidate_category_tree
+from ..models import Category, SubCategory, Location, Product, CategoryProductCount, SubCategoryProductCount
+
+User = get_user_model()
+
+
+class CategoryTreeTestCase(APITestCase):
+    """Tests pour l'arbre des catégories en mémoire"""
+
+    def setUp(self):
+        invalidate_category_tree()
+        self.url = reverse('category-list')
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        self.location = Location.objects.create(
+            name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor, is_default=True
+        )
+        self.electronics = Category.objects.create(name='Informatique', name_trl='Electronics')
+        self.fashion = Category.objects.create(name='Mode', name_trl='Fashion', is_active=False)
+        self.phones = SubCategory.objects.create(name='Smartphones', name_trl='Smartphones')
+        self.laptops = SubCategory.objects.create(name='Ordinateurs', name_trl='Laptops')
+        self.electronics.subcategories.add(self.phones, self.laptops)
+        for status_ in ('active', 'active', 'inactive'):
+            Product.objects.create(
+                name='iPhone', price=100, location=self.location, user=self.vendor,
+                category=self.electronics, subcategory=self.phones, status=status_
+            )
+
+    def test_tree_counts_and_memory_hits(self):
+        """Test que l'arbre contient les compteurs et qu'une seconde lecture ne touche pas la base"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        electronics = response.data[0]
+        self.assertEqual(electronics['name'], 'Informatique')
+        self.assertEqual(electronics['subcategories_count'], 2)
+        self.assertEqual(electronics['products_count'], 2)
+        counts = {sub['name']: sub['products_count'] for sub in electronics['subcategories']}
+        self.assertEqual(counts, {'Ordinateurs': 0, 'Smartphones': 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            active = self.client.get(reverse('category-active-categories'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual([category['name'] for category in active.data], ['Informatique'])
+
+    def test_writes_invalidate_tree(self):
+        """Test que les écritures sur produits et catégories reconstruisent l'arbre"""
+        self.client.get(self.url)
+
+        Product.objects.create(
+            name='MacBook', price=1000, location=self.location, user=self.vendor,
+            category=self.electronics, subcategory=self.laptops
+        )
+        self.fashion.subcategories.add(self.phones)
+
+        response = self.client.get(self.url)
+        electronics, fashion = response.data
+        self.assertEqual(electronics['products_count'], 3)
+        self.assertEqual(fashion['subcategories_count'], 1)
+
+    def test_shared_version_changes_on_commit(self):
+        """Test que la version partagée n'est incrémentée qu'à la validation et périme l'arbre des autres processus"""
+        stale = self.client.get(self.url).data
+        version = current_version()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(
+                name='MacBook', price=1000, location=self.location, user=self.vendor,
+                category=self.electronics, subcategory=self.laptops
+            )
+            self.assertEqual(current_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(current_version(), version + 1)
+
+        # Copie locale d'un autre processus, construite avant l'écriture et dont le délai de vérification est écoulé
+        with mock.patch.object(category_tree, '_tree', (version, 0, stale)):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data[0]['products_count'], 3)
+
+    def test_filtered_list_uses_queryset(self):
+        """Test que les filtres passent par le queryset, sans requête par catégorie"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'is_active': 'true'})
+
+        self.assertEqual([category['name'] for category in response.data], ['Informatique'])
+        self.assertEqual(len(queries), 2)
+
+
+class ProductCountersTestCase(APITestCase):
+    """Tests pour les compteurs de produits par catégorie et sous-catégorie"""
+
+    def setUp(self):
+        invalidate_category_tree()
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        self.location = Location.objects.create(
+            name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor, is_default=True
+        )
+        self.computers = Category.objects.create(name='Informatique', name_trl='Computers')
+        self.fashion = Category.objects.create(name='Mode', name_trl='Fashion')
+        self.laptops = SubCategory.objects.create(name='Ordinateurs', name_trl='Laptops')
+
+    def category_count(self, category, status_='active'):
+        counter = CategoryProductCount.objects.filter(category=category, status=status_).first()
+        return counter.count if counter else 0
+
+    def test_counters_follow_product_writes(self):
+        """Test que création, changement de statut, de catégorie et suppression mettent à jour les compteurs"""
+        product = Product.objects.create(
+            name='MacBook', price=1000, location=self.location, user=self.vendor,
+            category=self.computers, subcategory=self.laptops
+        )
+        self.assertEqual(self.category_count(self.computers), 1)
+
+        product.status = 'sold'
+        product.save()
+        self.assertEqual(self.category_count(self.computers), 0)
+        self.assertEqual(self.category_count(self.computers, 'sold'), 1)
+
+        # Instance rechargée : l'état initial vient de la base
+        product = Product.objects.get(pk=product.pk)
+        product.category = self.fashion
+        product.save()
+        self.assertEqual(self.category_count(self.computers, 'sold'), 0)
+        self.assertEqual(self.category_count(self.fashion, 'sold'), 1)
+
+        product.delete()
+        self.assertEqual(self.category_count(self.fashion, 'sold'), 0)
+        self.assertEqual(SubCategoryProductCount.objects.get(subcategory=self.laptops, status='sold').count, 0)
+
+    def test_stale_instance_applies_delta_from_database(self):
+        """Test qu'une instance chargée avant une autre écriture part de l'état en base"""
+        product = Product.objects.create(
+            name='MacBook', price=1000, location=self.location, user=self.vendor,
+            category=self.computers, subcategory=self.laptops
+        )
+        stale = Product.objects.get(pk=product.pk)
+        product.status = 'sold'
+        product.save()
+
+        # stale croit encore le produit actif et le réécrit actif
+        stale.price = 900
+        stale.save()
+        self.assertEqual(self.category_count(self.computers), 1)
+        self.assertEqual(self.category_count(self.computers, 'sold'), 0)
+
+        # Avec update_fields, le statut en base (actif) n'est pas remplacé par celui de l'instance
+        product.price = 800
+        product.save(update_fields=['price', 'updated_at'])
+        self.assertEqual(self.category_count(self.computers), 1)
+        self.assertEqual(self.category_count(self.computers, 'sold'), 0)
+
+    def test_delete_of_stale_instance_uses_database_state(self):
+        """Test que la suppression d'une instance périmée décrémente le statut réellement en base"""
+        product = Product.objects.create(
+            name='MacBook', price=1000, location=self.location, user=self.vendor,
+            category=self.computers, subcategory=self.laptops
+        )
+        stale = Product.objects.get(pk=product.pk)
+        product.status = 'sold'
+        product.save()
+
+        stale.delete()
+
+        self.assertEqual(self.category_count(self.computers), 0)
+        self.assertEqual(self.category_count(self.computers, 'sold'), 0)
+
+    def test_untracked_changes_skip_counters_and_history(self):
+        """Test qu'une écriture sans changement de champ suivi ne touche ni compteurs ni historique"""
+        product = Product.objects.create(
+            name='MacBook', price=1000, location=self.location, user=self.vendor,
+            category=self.computers, subcategory=self.laptops
+        )
+        product.name = 'MacBook Air'
+
+        with mock.patch('achat.catalog_counts.apply_product_change') as apply_change, \
+                mock.patch('achat.price_alerts.record_product_history') as record_history:
+            product.save()
+            with self.assertNumQueries(1):
+                product.save(update_fields=['name'])
+
+        apply_change.assert_not_called()
+        record_history.assert_not_called()
+
+    def test_rebuild_matches_and_endpoints_expose_counts(self):
+        """Test que le recalcul reproduit les compteurs exposés par le catalogue"""
+        for category in (self.computers, self.computers, self.fashion):
+            Product.objects.create(
+                name='Produit', price=10, location=self.location, user=self.vendor,
+                category=category, subcategory=self.laptops
+            )
+        incremental = list(CategoryProductCount.objects.order_by('category__name').values_list('category__name', 'status', 'count'))
+
+        call_command('rebuild_product_counts', stdout=StringIO())
+
+        self.assertEqual(
+            list(CategoryProductCount.objects.order_by('category__name').values_list('category__name', 'status', 'count')),
+            incremental
+        )
+        response = self.client.get(reverse('category-list'), {'ordering': 'name'})
+        self.assertEqual([category['products_count'] for category in response.data], [2, 1])
+        response = self.client.get(reverse('subcategory-active-subcategories'))
+        self.assertEqual(response.data[0]['products_count'], 3)
+
+        self.client.force_authenticate(user=self.vendor)
+        response = self.client.get(reverse('product-stats'))
+        self.assertEqual(
+            list(response.data['top_categories']),
+            [{'category__name': 'Informatique', 'count': 2}, {'category__name': 'Mode', 'count': 1}]
+        )
+
+    def test_category_delete_cascades_counters(self):
+        """Test que la suppression d'une catégorie supprime ses produits et ses compteurs"""
+        Product.objects.create(
+            name='MacBook', price=1000, location=self.location, user=self.vendor, category=self.computers
+        )
+
+        self.computers.delete()
+
+        self.assertFalse(CategoryProductCount.objects.exists())
@@ -0,0 +1,442 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from .. import recommendations
+from ..admin import estuaire_admin_site
+from ..dashboard_cache import get_dashboard_version
+from ..models import (
+    Location, Product, Order, OrderItem, Review, Wishlist, VendorDailySales, ProductDailySales, ProductSimilarity
+)
+
+User = get_user_model()
+
+NOW = datetime(2025, 3, 15, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class DashboardFixturesMixin:
+    """Vendeur, client et commandes datées partagés par les tests de tableaux de bord"""
+
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        self.customer = User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean')
+        self.location = Location.objects.create(
+            name='Lyon', longitude=4.8357, latitude=45.7640, user=self.customer, is_default=True
+        )
+        self.product = Product.objects.create(
+            name='iPhone 14 Pro', price=100, quantity=50, location=self.location, user=self.vendor
+        )
+
+    def create_order(self, created_at, quantity=1, unit_price=Decimal('100.00')):
+        order = Order.objects.create(
+            user=self.customer, total_amount=unit_price * quantity, delivery_location=self.location
+        )
+        item = OrderItem.objects.create(
+            order=order, product=self.product, vendor=self.vendor, quantity=quantity, unit_price=unit_price
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        OrderItem.objects.filter(pk=item.pk).update(created_at=created_at)
+        return order
+
+
+@mock.patch('django.utils.timezone.now', return_value=NOW)
+class MonthlyStatsTestCase(DashboardFixturesMixin, APITestCase):
+    """Tests pour les statistiques mensuelles des tableaux de bord"""
+
+    def setUp(self):
+        super().setUp()
+        # Premier et dernier instant de mois voisins : les approximations de 30 jours les confondaient
+        self.create_order(datetime(2025, 3, 1, 0, 0, 1, tzinfo=dt_timezone.utc), quantity=2)
+        self.create_order(datetime(2025, 2, 28, 23, 59, tzinfo=dt_timezone.utc))
+        self.create_order(datetime(2024, 12, 31, 23, 0, tzinfo=dt_timezone.utc))
+        call_command('backfill_sales', stdout=StringIO())
+
+    def test_vendor_monthly_stats_calendar_months(self, _now):
+        """Test que les mois sont calendaires, complets et calculés en une seule requête"""
+        self.client.force_authenticate(user=self.vendor)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('vendor-dashboard-monthly-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum('achat_vendordailysales' in query['sql'] for query in queries), 1)
+        self.assertFalse(any('achat_orderitem' in query['sql'] for query in queries))
+
+        months = {month['month']: month for month in response.data['monthly_stats']}
+        self.assertEqual(list(months)[0], '2024-04')
+        self.assertEqual(list(months)[-1], '2025-03')
+        self.assertEqual(months['2025-03']['items_sold'], 2)
+        self.assertEqual(months['2025-02']['orders'], 1)
+        self.assertEqual(months['2025-01']['orders'], 0)
+        self.assertEqual(Decimal(months['2024-12']['revenue']), Decimal('100'))
+
+    def test_spending_analytics_window_is_capped(self, _now):
+        """Test que la fenêtre demandée est plafonnée et validée"""
+        self.client.force_authenticate(user=self.customer)
+        url = reverse('customer-dashboard-spending-analytics')
+
+        response = self.client.get(url, {'months': 1000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['monthly_spending']), 36)
+        self.assertEqual(response.data['monthly_spending'][-1]['orders_count'], 1)
+
+        response = self.client.get(url, {'months': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SalesRollupTestCase(DashboardFixturesMixin, APITestCase):
+    """Tests pour les agrégats de ventes journaliers"""
+
+    def checkout(self, quantity):
+        self.client.force_authenticate(user=self.customer)
+        self.client.post(reverse('cart-add-item'), {'product_id': str(self.product.id), 'quantity': quantity}, format='json')
+        response = self.client.post(
+            reverse('orders-create-from-cart'), {'delivery_location_id': str(self.location.id)}, format='json'
+        )
+        return response.data['order']['id']
+
+    def test_rollups_follow_checkout_and_status_changes(self):
+        """Test que les agrégats suivent la commande et ses changements de statut"""
+        order_id = self.checkout(3)
+        self.checkout(1)
+
+        vendor_sales = VendorDailySales.objects.get(vendor=self.vendor, status='pending')
+        self.assertEqual((vendor_sales.units, vendor_sales.items, vendor_sales.orders), (4, 2, 2))
+        self.assertEqual(vendor_sales.revenue, Decimal('400'))
+
+        self.client.force_authenticate(user=self.vendor)
+        self.client.patch(reverse('orders-update-status', args=[order_id]), {'status': 'shipped'}, format='json')
+
+        shipped = ProductDailySales.objects.get(product=self.product, status='shipped')
+        self.assertEqual((shipped.units, shipped.orders), (3, 1))
+        self.assertEqual(VendorDailySales.objects.get(vendor=self.vendor, status='pending').units, 1)
+
+        response = self.client.get(reverse('vendor-dashboard-overview'))
+        self.assertEqual(response.data['general_stats']['total_sales'], 2)
+        self.assertEqual(response.data['general_stats']['pending_orders'], 1)
+
+    def test_backfill_matches_incremental_rollups(self):
+        """Test que le backfill reproduit les agrégats maintenus incrémentalement"""
+        self.checkout(2)
+        self.checkout(1)
+        incremental = list(VendorDailySales.objects.values('date', 'status', 'units', 'revenue', 'items', 'orders'))
+
+        VendorDailySales.objects.all().delete()
+        call_command('backfill_sales', stdout=StringIO())
+
+        self.assertEqual(
+            list(VendorDailySales.objects.values('date', 'status', 'units', 'revenue', 'items', 'orders')),
+            incremental
+        )
+
+
+    @override_settings(ACHAT_TASKS_EAGER=True)
+    def test_admin_delete_rebuilds_only_touched_days_and_vendors(self):
+        """Test que la suppression dans l'admin recalcule seulement les journées et vendeurs concernés"""
+        admin = User.objects.create_superuser(identifier='admin@test.com', nom='Admin', prenom='Root')
+        self.client.force_login(admin)
+        old = self.create_order(datetime(2024, 3, 15, 12, 0, tzinfo=dt_timezone.utc))
+        recent = self.create_order(NOW)
+        items = list(OrderItem.objects.filter(order__in=[old, recent]))
+        with self.assertNumQueries(1):
+            estuaire_admin_site._registry[OrderItem].get_sales_scope(OrderItem.objects.all())
+
+        with mock.patch('achat.sales.rebuild_sales_rollups') as rebuild, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:achat_orderitem_changelist'), {
+                'action': 'delete_selected', '_selected_action': [str(item.pk) for item in items], 'post': 'yes'
+            })
+
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(
+            sorted(call.args for call in rebuild.call_args_list),
+            [(datetime(2024, 3, 15).date(),) * 2, (NOW.date(),) * 2]
+        )
+        self.assertTrue(all(call.kwargs['vendor_ids'] == {self.vendor.pk} for call in rebuild.call_args_list))
+
+    @override_settings(ACHAT_TASKS_EAGER=True)
+    def test_product_delete_removes_its_sales(self):
+        """Test que la suppression d'un produit retire ses ventes des agrégats"""
+        self.checkout(2)
+        self.assertEqual(VendorDailySales.objects.get(vendor=self.vendor).units, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+
+        self.assertFalse(VendorDailySales.objects.filter(vendor=self.vendor, units__gt=0).exists())
+
+
+class ProductPerformanceTestCase(DashboardFixturesMixin, APITestCase):
+    """Tests pour le rapport de performance des produits"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.vendor)
+        self.url = reverse('vendor-dashboard-product-performance')
+
+    def test_query_count_does_not_depend_on_products(self):
+        """Test que le nombre de requêtes est constant quel que soit le nombre de produits"""
+        with CaptureQueriesContext(connection) as few_products:
+            self.client.get(self.url)
+
+        Product.objects.bulk_create([
+            Product(name=f'Produit {i}', price=10, location=self.location, user=self.vendor) for i in range(20)
+        ])
+        # bulk_create n'envoie pas de signaux : le cache du tableau de bord n'est pas invalidé
+        cache.clear()
+        with CaptureQueriesContext(connection) as many_products:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['products_performance']), 21)
+        self.assertEqual(len(few_products), len(many_products))
+
+    def test_scores_sorting_and_needs_attention(self):
+        """Test que les scores combinent ventes et avis, triés par ordre décroissant"""
+        other = Product.objects.create(name='iPad Air', price=50, location=self.location, user=self.vendor)
+        self.create_order(NOW, quantity=20)
+        call_command('backfill_sales', stdout=StringIO())
+        Review.objects.create(user=self.customer, product=other, rating=5)
+
+        response = self.client.get(self.url)
+
+        performance = response.data['products_performance']
+        self.assertEqual(performance[0]['product']['id'], str(self.product.id))
+        self.assertEqual(performance[0]['performance_score'], 40.0)
+        self.assertEqual(performance[1]['performance_score'], 32.0)
+        self.assertEqual(performance[0]['sales']['total_sold'], 20)
+        self.assertEqual(response.data['summary']['needs_attention'], [])
+
+
+class DashboardCacheTestCase(DashboardFixturesMixin, APITestCase):
+    """Tests pour le cache des tableaux de bord"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.customer)
+        self.url = reverse('customer-dashboard-overview')
+
+    def test_repeat_open_does_not_touch_db(self):
+        """Test qu'une seconde ouverture est servie depuis le cache"""
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+    def test_user_change_invalidates_cached_dashboard(self):
+        """Test qu'un ajout à la wishlist rend le tableau de bord à jour"""
+        self.assertEqual(self.client.get(self.url).data['general_stats']['wishlist_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Wishlist.objects.create(user=self.customer, product=self.product)
+
+        self.assertEqual(self.client.get(self.url).data['general_stats']['wishlist_count'], 1)
+
+    def test_version_changes_only_after_commit(self):
+        """Test que la version n'est changée qu'à la validation de la transaction"""
+        version = get_dashboard_version(self.customer.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Wishlist.objects.create(user=self.customer, product=self.product)
+            self.assertEqual(get_dashboard_version(self.customer.pk), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_dashboard_version(self.customer.pk), version)
+
+    def test_order_delete_bumps_vendors_without_query_per_item(self):
+        """Test que la suppression d'une commande invalide client et vendeurs sans requête par ligne"""
+        order = self.create_order(NOW)
+        for _ in range(4):
+            OrderItem.objects.create(order=order, product=self.product, vendor=self.vendor, quantity=1, unit_price=10)
+        versions = (get_dashboard_version(self.customer.pk), get_dashboard_version(self.vendor.pk))
+        order = Order.objects.get(pk=order.pk)
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            order.delete()
+
+        order_reads = [query for query in queries if query['sql'].startswith('SELECT') and 'FROM "achat_order"' in query['sql']]
+        self.assertEqual(order_reads, [])
+        self.assertNotEqual(get_dashboard_version(self.customer.pk), versions[0])
+        self.assertNotEqual(get_dashboard_version(self.vendor.pk), versions[1])
+
+    @override_settings(ACHAT_DASHBOARD_CACHE_TTL=0, ACHAT_TASKS_EAGER=True)
+    def test_revalidation_keeps_query_params(self):
+        """Test que le recalcul en arrière-plan reprend les paramètres de la requête d'origine"""
+        self.create_order(NOW)
+        url = reverse('customer-dashboard-order-history')
+        self.client.get(url, {'limit': 1})
+
+        with mock.patch('achat.dashboard_cache._store') as store:
+            self.client.get(url, {'limit': 1})
+
+        store.assert_called_once()
+        self.assertEqual(store.call_args.args[1]['filters']['limit'], 1)
+
+    @override_settings(ACHAT_DASHBOARD_CACHE_TTL=0, ACHAT_TASKS_EAGER=True)
+    def test_stale_response_is_served_while_revalidating(self):
+        """Test qu'une réponse expirée est servie puis recalculée en arrière-plan"""
+        self.create_order(NOW)
+        self.client.get(self.url)
+        # update() n'envoie pas de signaux : seule l'expiration déclenche le recalcul
+        Order.objects.filter(user=self.customer).update(status='delivered')
+
+        stale = self.client.get(self.url)
+        fresh = self.client.get(self.url)
+
+        self.assertEqual(stale.data['general_stats']['completed_orders'], 0)
+        self.assertEqual(fresh.data['general_stats']['completed_orders'], 1)
+
+
+class RecommendationsTestCase(DashboardFixturesMixin, APITestCase):
+    """Tests pour les recommandations item-item"""
+
+    def setUp(self):
+        super().setUp()
+        self.case = Product.objects.create(
+            name='Coque iPhone', price=20, quantity=10, location=self.location, user=self.vendor
+        )
+        self.tablet = Product.objects.create(
+            name='iPad Air', price=500, quantity=10, location=self.location, user=self.vendor
+        )
+        self.buyer = User.objects.create_user(identifier='buyer@test.com', nom='Durand', prenom='Paul')
+        for product in (self.product, self.case):
+            order = Order.objects.create(user=self.buyer, total_amount=product.price, delivery_location=self.location)
+            OrderItem.objects.create(
+                order=order, product=product, vendor=self.vendor, quantity=1, unit_price=product.price
+            )
+        self.create_order(NOW)
+        self.client.force_authenticate(user=self.customer)
+        self.url = reverse('customer-dashboard-recommendations')
+
+    def test_neighbors_of_purchases_are_recommended(self):
+        """Test que les produits achetés avec ceux du client lui sont recommandés"""
+        call_command('refresh_recommendations', '--full', stdout=StringIO())
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['based_on_purchases']], [str(self.case.id)])
+        self.assertEqual([p['id'] for p in response.data['recommended']], [str(self.case.id)])
+        self.assertEqual(response.data['based_on_wishlist'], [])
+        # Les produits déjà achetés ne sont pas recommandés
+        self.assertNotIn(str(self.product.id), [p['id'] for p in response.data['recommended']])
+
+    def test_incremental_refresh_only_touches_recent_users(self):
+        """Test que le recalcul incrémental ne reprend que les produits des utilisateurs récents"""
+        call_command('refresh_recommendations', '--full', stdout=StringIO())
+        Wishlist.objects.create(user=self.customer, product=self.tablet)
+
+        out = StringIO()
+        call_command('refresh_recommendations', stdout=out)
+
+        # Le client a acheté self.product et ajouté self.tablet : deux produits recalculés
+        self.assertIn('2 produit(s)', out.getvalue())
+        cache.clear()
+        response = self.client.get(self.url)
+        self.assertIn(str(self.case.id), [p['id'] for p in response.data['recommended']])
+        self.assertNotIn(str(self.tablet.id), [p['id'] for p in response.data['recommended']])
+
+    def test_incremental_refresh_loads_only_the_neighborhood(self):
+        """Test que le recalcul incrémental ne charge pas les profils sans lien et égale un recalcul complet"""
+        outsider = User.objects.create_user(identifier='outsider@test.com', nom='Petit', prenom='Luc')
+        for i in range(2):
+            product = Product.objects.create(
+                name=f'Livre {i}', price=10, quantity=5, location=self.location, user=self.vendor
+            )
+            Wishlist.objects.create(user=outsider, product=product)
+        call_command('refresh_recommendations', '--full', stdout=StringIO())
+        Wishlist.objects.create(user=self.customer, product=self.tablet)
+
+        with mock.patch('achat.recommendations.load_interactions', wraps=recommendations.load_interactions) as load:
+            call_command('refresh_recommendations', stdout=StringIO())
+
+        loaded = set().union(*(call.args[0] for call in load.call_args_list))
+        self.assertIn(self.customer.pk, loaded)
+        self.assertNotIn(outsider.pk, loaded)
+
+        incremental = set(ProductSimilarity.objects.values_list('product_id', 'neighbor_id', 'score'))
+        call_command('refresh_recommendations', '--full', stdout=StringIO())
+        self.assertEqual(incremental, set(ProductSimilarity.objects.values_list('product_id', 'neighbor_id', 'score')))
+
+    def test_query_count_does_not_depend_on_recommendations(self):
+        """Test que le nombre de requêtes est constant quel que soit le nombre de produits recommandés"""
+        call_command('refresh_recommendations', '--full', stdout=StringIO())
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+
+        for i in range(5):
+            product = Product.objects.create(
+                name=f'Accessoire {i}', price=10, quantity=5, location=self.location, user=self.vendor
+            )
+            Wishlist.objects.create(user=self.buyer, product=product)
+        Wishlist.objects.create(user=self.buyer, product=self.product)
+        call_command('refresh_recommendations', '--full', stdout=StringIO())
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['recommended']), 6)
+        self.assertEqual(len(few), len(many))
+
+
+class CustomerDashboardQueriesTestCase(DashboardFixturesMixin, APITestCase):
+    """Tests du nombre de requêtes des listes du tableau de bord client"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.customer)
+
+    def add_vendor_order(self, index):
+        vendor = User.objects.create_user(
+            identifier=f'vendor{index}@test.com', nom='Vendeur', prenom=str(index), user_type='vendor'
+        )
+        product = Product.objects.create(
+            name=f'Produit {index}', price=10, quantity=5, location=self.location, user=vendor
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(
+                user=self.customer, total_amount=10, delivery_location=self.location, status='delivered'
+            )
+            OrderItem.objects.create(order=order, product=product, vendor=vendor, quantity=1, unit_price=10)
+            # VendorRating est créé par le signal de Review
+            Review.objects.create(user=self.customer, product=product, rating=4)
+
+    def assertConstantQueries(self, url, key):
+        self.add_vendor_order(0)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+
+        for index in range(1, 4):
+            self.add_vendor_order(index)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data[key]), 4)
+        self.assertEqual(len(few), len(many))
+        return response
+
+    def test_favorite_vendors_ratings_are_batched(self):
+        """Test que les notes des vendeurs favoris sont lues en une requête"""
+        response = self.assertConstantQueries(reverse('customer-dashboard-favorite-vendors'), 'favorite_vendors')
+        self.assertEqual(response.data['favorite_vendors'][0]['vendor_rating']['average_rating'], 4.0)
+
+    def test_review_history_pending_reviews_are_batched(self):
+        """Test que les avis en attente ne chargent pas leur commande ligne par ligne"""
+        self.create_order(NOW)
+        Order.objects.filter(user=self.customer).update(status='delivered')
+        self.assertConstantQueries(reverse('customer-dashboard-review-history'), 'reviews_given')
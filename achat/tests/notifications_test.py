@@ -0,0 +1,249 @@
+import asyncio
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from ..models import Location, Product, Wishlist, Notification, NotificationCounter, UserToken
+from ..notifications import adjust_counts, fan_out, get_counts, prune_notifications
+from ..realtime import InMemoryBroker
+
+User = get_user_model()
+
+
+@override_settings(ACHAT_TASKS_EAGER=True)
+class NotificationBroadcastTestCase(APITestCase):
+    """Tests pour la diffusion de notifications en masse"""
+
+    def setUp(self):
+        self.broadcast_url = reverse('notification-broadcast')
+
+        self.staff = User.objects.create_user(
+            identifier='staff@test.com', nom='Admin', prenom='Alice', is_staff=True
+        )
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        location = Location.objects.create(
+            name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor, is_default=True
+        )
+        self.product = Product.objects.create(
+            name='iPhone 14 Pro', price=1299.99, location=location, user=self.vendor
+        )
+        self.customers = [
+            User.objects.create_user(identifier=f'customer{i}@test.com', nom='Dupont', prenom=f'Jean{i}')
+            for i in range(3)
+        ]
+        Wishlist.objects.create(user=self.customers[0], product=self.product)
+
+    def test_broadcast_to_user_type(self):
+        """Test qu'une diffusion aux clients crée une notification par client"""
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(self.broadcast_url, {
+            'segment': 'user_type', 'user_type': 'customer', 'titre': 'Promo', 'content': 'Soldes'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # Le staff est aussi de type customer par défaut
+        self.assertEqual(Notification.objects.filter(titre='Promo').count(), 4)
+        self.assertFalse(Notification.objects.filter(user=self.vendor).exists())
+
+    def test_broadcast_to_wishlisters(self):
+        """Test qu'une diffusion aux wishlisters ne cible que ceux du produit"""
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(self.broadcast_url, {
+            'segment': 'wishlisters', 'product_id': str(self.product.id),
+            'titre': 'Baisse de prix', 'content': 'Le prix a baissé'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(
+            list(Notification.objects.values_list('user_id', flat=True)), [self.customers[0].id]
+        )
+
+    def test_wishlisters_segment_requires_product(self):
+        """Test que le segment wishlisters exige un product_id"""
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(self.broadcast_url, {
+            'segment': 'wishlisters', 'titre': 'Promo', 'content': 'Soldes'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_broadcast_requires_staff(self):
+        """Test qu'un utilisateur non staff ne peut pas diffuser"""
+        self.client.force_authenticate(user=self.customers[0])
+        response = self.client.post(self.broadcast_url, {
+            'segment': 'user_type', 'titre': 'Promo', 'content': 'Soldes'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_fan_out_inserts_in_chunks(self):
+        """Test que fan_out découpe l'insertion en lots"""
+        user_ids = [customer.id for customer in self.customers]
+
+        with CaptureQueriesContext(connection) as queries:
+            created = fan_out(iter(user_ids), 'Lot', 'Contenu', chunk_size=2)
+
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "achat_notification" ')]
+        self.assertEqual(created, 3)
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(NotificationCounter.objects.get(pk=user_ids[0]).unread_count, 1)
+
+
+class NotificationCounterTestCase(APITestCase):
+    """Tests pour les compteurs dénormalisés de notifications"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean')
+        self.client.force_authenticate(user=self.user)
+        self.notifications_url = reverse('notification-list')
+        self.count_url = reverse('notification-notifications-count')
+
+    def create_notification(self, titre='Info'):
+        response = self.client.post(self.notifications_url, {'titre': titre, 'content': 'Contenu'}, format='json')
+        return response.data['id']
+
+    def test_counters_follow_writes(self):
+        """Test que les compteurs suivent création, lecture et suppression"""
+        first_id = self.create_notification()
+        self.create_notification()
+        self.client.patch(reverse('notification-mark-as-read', args=[first_id]))
+
+        response = self.client.get(self.count_url)
+        self.assertEqual(response.data['total_count'], 2)
+        self.assertEqual(response.data['unread_count'], 1)
+
+        self.client.patch(reverse('notification-mark-all-as-read'))
+        self.client.delete(reverse('notification-delete-all-read'))
+
+        response = self.client.get(self.count_url)
+        self.assertEqual(response.data['total_count'], 0)
+        self.assertEqual(response.data['unread_count'], 0)
+
+    def test_count_is_cached(self):
+        """Test que le badge est servi par le cache après la première lecture"""
+        self.create_notification()
+        self.client.get(self.count_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.count_url)
+
+        self.assertEqual(response.data['unread_count'], 1)
+        self.assertFalse([q for q in queries if 'notification' in q['sql'].lower()])
+
+    def test_reconcile_fixes_drift(self):
+        """Test que la commande de réconciliation corrige un compteur faux"""
+        self.create_notification()
+        NotificationCounter.objects.filter(pk=self.user.pk).update(total_count=42, unread_count=7)
+
+        call_command('reconcile_notification_counters', stdout=StringIO())
+
+        counter = NotificationCounter.objects.get(pk=self.user.pk)
+        self.assertEqual((counter.total_count, counter.unread_count), (1, 1))
+
+    def test_adjust_counts_applies_repeated_ids(self):
+        """Test qu'un utilisateur présent plusieurs fois reçoit le delta autant de fois"""
+        other = User.objects.create_user(identifier='other@test.com', nom='Durand', prenom='Paul')
+        get_counts(self.user.pk)
+        get_counts(other.pk)
+
+        adjust_counts([self.user.pk, other.pk, self.user.pk, self.user.pk], total=1, unread=1)
+
+        counters = dict(NotificationCounter.objects.values_list('user_id', 'total_count'))
+        self.assertEqual((counters[self.user.pk], counters[other.pk]), (3, 1))
+
+
+class NotificationRetentionTestCase(APITestCase):
+    """Tests pour la purge des notifications expirées"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean')
+        now = timezone.now()
+        ages = [(True, 40), (True, 40), (True, 5), (False, 40), (False, 200)]
+        for is_read, days in ages:
+            notification = Notification.objects.create(user=self.user, titre='Info', content='Contenu', is_read=is_read)
+            Notification.objects.filter(pk=notification.pk).update(created_at=now - timedelta(days=days))
+        get_counts(self.user.id)
+
+    def test_prune_respects_retention_and_refreshes_counters(self):
+        """Test que seules les notifications expirées sont supprimées, par petits lots"""
+        out = StringIO()
+        call_command('prune_notifications', '--batch-size', '1', stdout=out)
+
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Notification.objects.filter(is_read=False, created_at__lt=timezone.now() - timedelta(days=180)).exists())
+        self.assertEqual(get_counts(self.user.id), {'total_count': 2, 'unread_count': 1})
+
+    def test_batch_budget_applies_to_each_state(self):
+        """Test qu'un arriéré de notifications lues n'épuise pas le budget des non lues"""
+        notification = Notification.objects.create(user=self.user, titre='Info', content='Contenu')
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(days=200))
+
+        deleted = prune_notifications(batch_size=1, max_batches=1)
+
+        self.assertEqual(deleted, {'read': 1, 'unread': 1})
+
+    def test_dry_run_deletes_nothing(self):
+        """Test que --dry-run se contente de compter"""
+        out = StringIO()
+        call_command('prune_notifications', '--dry-run', stdout=out)
+
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertIn('read: 2', out.getvalue())
+
+
+class NotificationStreamTestCase(TestCase):
+    """Tests pour le flux temps réel des notifications"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean')
+        self.token = UserToken.objects.create(user=self.user)
+        self.stream_url = reverse('notification-stream')
+
+    def test_stream_requires_token(self):
+        """Test que le flux refuse une connexion sans token"""
+        response = self.client.get(self.stream_url)
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_pushes_counts_and_notifications(self):
+        """Test que le flux envoie les compteurs puis les nouvelles notifications"""
+        response = await self.async_client.get(self.stream_url, {'token': str(self.token.token)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = aiter(response.streaming_content)
+        first = await anext(events)
+        self.assertIn(b'event: counts', first)
+
+        pending = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        await sync_to_async(fan_out)([self.user.id], 'Promo', 'Soldes')
+
+        received = [await asyncio.wait_for(pending, timeout=5), await anext(events)]
+        self.assertTrue(any(b'event: notification' in chunk and b'Promo' in chunk for chunk in received))
+        await events.aclose()
+
+    async def test_broker_delivers_from_other_thread(self):
+        """Test que publish() depuis un autre thread atteint l'abonné"""
+        broker = InMemoryBroker()
+        queue = broker.subscribe(self.user.id)
+
+        await sync_to_async(broker.publish, thread_sensitive=False)(self.user.id, 'counts', {'unread_count': 3})
+
+        event = await asyncio.wait_for(queue.get(), timeout=5)
+        self.assertEqual(event, {'type': 'counts', 'data': {'unread_count': 3}})
+        broker.unsubscribe(self.user.id, queue)
+        self.assertFalse(broker.has_subscribers(self.user.id))
@@ -0,0 +1,139 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from ..models import Location, Product, Review, VendorRating, ProductRating
+
+User = get_user_model()
+
+
+class ReviewFixturesMixin:
+    """Vendeur, produit et cinq avis (notes 1 à 5) partagés par les tests d'avis"""
+
+    def setUp(self):
+        self.reviews_url = reverse('reviews-list')
+
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie',
+            password='testpassword123', user_type='vendor'
+        )
+        self.location = Location.objects.create(
+            name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor, is_default=True
+        )
+        self.product = Product.objects.create(
+            name='iPhone 14 Pro', price=1299.99, location=self.location, user=self.vendor
+        )
+
+        self.customers = []
+        for i in range(5):
+            customer = User.objects.create_user(
+                identifier=f'customer{i}@test.com', nom='Dupont', prenom=f'Jean{i}',
+                password='testpassword123'
+            )
+            Review.objects.create(user=customer, product=self.product, rating=(i % 5) + 1)
+            self.customers.append(customer)
+
+        self.client.force_authenticate(user=self.customers[0])
+
+
+class ReviewListTestCase(ReviewFixturesMixin, APITestCase):
+    """Tests pour la liste paginée des avis"""
+
+    def test_list_is_paginated(self):
+        """Test que la liste est paginée par curseur"""
+        response = self.client.get(self.reviews_url, {'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['reviews']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['reviews']), 2)
+
+    def test_list_query_count_is_constant(self):
+        """Test que le nombre de requêtes ne dépend pas du nombre d'avis"""
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(self.reviews_url, {'page_size': 1})
+        with CaptureQueriesContext(connection) as large_page:
+            self.client.get(self.reviews_url, {'page_size': 5})
+
+        self.assertEqual(len(small_page), len(large_page))
+
+    def test_vendor_summary_uses_vendor_rating(self):
+        """Test que le résumé vendeur provient de VendorRating"""
+        response = self.client.get(self.reviews_url, {'vendor_id': str(self.vendor.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_reviews'], 5)
+        self.assertEqual(response.data['summary']['average_rating'], 3.0)
+
+    def test_invalid_filter_returns_400(self):
+        """Test qu'un identifiant invalide renvoie une erreur 400"""
+        response = self.client.get(self.reviews_url, {'product_id': 'not-a-uuid'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductRatingTestCase(ReviewFixturesMixin, APITestCase):
+    """Tests pour les résumés de notes par produit"""
+
+    def test_summary_for_many_products(self):
+        """Test que le résumé de plusieurs produits tient en une requête"""
+        other_product = Product.objects.create(
+            name='iPad Air', price=799.99, location=self.location, user=self.vendor
+        )
+        summary_url = reverse('reviews-summary')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(summary_url, {'product_ids': f'{self.product.id},{other_product.id}'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        summaries = response.data['summaries']
+        self.assertEqual(summaries[str(self.product.id)]['total_reviews'], 5)
+        self.assertEqual(summaries[str(self.product.id)]['rating_breakdown']['3'], 1)
+        self.assertEqual(summaries[str(other_product.id)]['total_reviews'], 0)
+
+    def test_rating_maintained_on_review_writes(self):
+        """Test que ProductRating suit la création et la suppression d'avis"""
+        customer = User.objects.create_user(
+            identifier='new@test.com', nom='Durand', prenom='Paul', password='testpassword123'
+        )
+        self.client.force_authenticate(user=customer)
+
+        response = self.client.post(self.reviews_url, {'product_id': str(self.product.id), 'rating': 5})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        product_rating = ProductRating.objects.get(product=self.product)
+        self.assertEqual(product_rating.total_reviews, 6)
+        self.assertEqual(product_rating.rating_5_count, 2)
+
+        self.client.delete(f"{self.reviews_url}{response.data['review']['id']}/")
+        product_rating.refresh_from_db()
+        self.assertEqual(product_rating.total_reviews, 5)
+
+    def test_ratings_follow_writes_outside_the_api(self):
+        """Test que les notes suivent les avis modifiés ou supprimés hors de l'API (admin)"""
+        review = Review.objects.get(user=self.customers[0])
+        review.rating = 5
+        review.save()
+
+        product_rating = ProductRating.objects.get(product=self.product)
+        self.assertEqual((product_rating.rating_1_count, product_rating.rating_5_count), (0, 2))
+
+        review.delete()
+        self.assertEqual(ProductRating.objects.get(product=self.product).total_reviews, 4)
+        self.assertEqual(VendorRating.objects.get(vendor=self.vendor).total_reviews, 4)
+
+    def test_summary_normalizes_product_ids(self):
+        """Test que les UUID non canoniques sont normalisés et les IDs invalides refusés"""
+        summary_url = reverse('reviews-summary')
+        upper_id = str(self.product.id).upper()
+
+        response = self.client.get(summary_url, {'product_ids': upper_id})
+        self.assertEqual(response.data['summaries'][str(self.product.id)]['total_reviews'], 5)
+
+        response = self.client.get(summary_url, {'product_ids': 'not-a-uuid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,258 @@
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from ..models import Cart, Location, Product, Wishlist, Notification, NotificationCounter, ProductPriceHistory
+from ..notifications import get_counts
+from ..wishlist_cache import get_wishlist_ids, wishlist_cache_ttl, wishlist_key
+
+User = get_user_model()
+
+
+class WishlistFixturesMixin:
+    """Vendeur, client et produits partagés par les tests de wishlist"""
+
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(
+            identifier='vendor@test.com', nom='Martin', prenom='Sophie', user_type='vendor'
+        )
+        self.customer = User.objects.create_user(identifier='customer@test.com', nom='Dupont', prenom='Jean')
+        self.location = Location.objects.create(
+            name='Lyon', longitude=4.8357, latitude=45.7640, user=self.vendor, is_default=True
+        )
+        self.products = [
+            Product.objects.create(name=f'Produit {i}', price=10, quantity=5, location=self.location, user=self.vendor)
+            for i in range(3)
+        ]
+
+
+class WishlistMembershipTestCase(WishlistFixturesMixin, APITestCase):
+    """Tests pour le champ is_wishlisted des listes de produits"""
+
+    def flags(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {product['id']: product['is_wishlisted'] for product in response.data}
+
+    def test_anonymous_listing_is_not_wishlisted(self):
+        """Test qu'un visiteur anonyme voit is_wishlisted à False"""
+        self.assertEqual(set(self.flags().values()), {False})
+
+    def test_listing_flags_wishlisted_products_from_cache(self):
+        """Test que les produits en wishlist sont marqués sans requête par ligne"""
+        Wishlist.objects.create(user=self.customer, product=self.products[0])
+        self.client.force_authenticate(user=self.customer)
+
+        flags = self.flags()
+        self.assertTrue(flags[str(self.products[0].id)])
+        self.assertFalse(flags[str(self.products[1].id)])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.flags()
+        self.assertFalse(any('achat_wishlist' in query['sql'] for query in queries))
+
+    def test_wishlist_writes_invalidate_membership(self):
+        """Test qu'un ajout puis une suppression via l'API sont visibles immédiatement"""
+        self.client.force_authenticate(user=self.customer)
+        product_id = str(self.products[1].id)
+        self.assertFalse(self.flags()[product_id])
+
+        self.client.post(reverse('wishlist-list'), {'product': product_id}, format='json')
+        self.assertTrue(self.flags()[product_id])
+        check = self.client.get(reverse('wishlist-check-product-in-wishlist', args=[product_id]))
+        self.assertTrue(check.data['in_wishlist'])
+
+        self.client.delete(reverse('wishlist-remove-by-product', args=[product_id]))
+        self.assertFalse(self.flags()[product_id])
+
+    def test_process_local_cache_uses_short_ttl(self):
+        """Test qu'avec un cache propre au processus l'ensemble n'est gardé que brièvement"""
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_wishlist_ids(self.customer.pk)
+
+        cache_set.assert_called_once()
+        self.assertEqual(cache_set.call_args.args[2], 30)
+
+        with mock.patch('achat.wishlist_cache.is_process_local', return_value=False):
+            self.assertEqual(wishlist_cache_ttl(), 3600)
+
+    def test_invalidation_is_repeated_on_commit(self):
+        """Test que l'ensemble remis en cache avant la validation est de nouveau invalidé"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Wishlist.objects.create(user=self.customer, product=self.products[0])
+            # Lecture concurrente entre l'écriture et la validation
+            cache.set(wishlist_key(self.customer.pk), frozenset(), 60)
+
+        self.assertEqual(get_wishlist_ids(self.customer.pk), {self.products[0].id})
+
+    def test_wishlist_list_is_scoped_to_user(self):
+        """Test que la liste des wishlists ne contient que celles de l'utilisateur"""
+        other = User.objects.create_user(identifier='other@test.com', nom='Durand', prenom='Paul')
+        Wishlist.objects.create(user=other, product=self.products[0])
+        Wishlist.objects.create(user=self.customer, product=self.products[1])
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(reverse('wishlist-list'))
+
+        self.assertEqual([item['product'] for item in response.data], [self.products[1].id])
+
+
+class WishlistPriceAlertsTestCase(WishlistFixturesMixin, APITestCase):
+    """Tests pour les alertes de baisse de prix et de retour en stock"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(identifier='other@test.com', nom='Durand', prenom='Paul')
+        for user, product in ((self.customer, self.products[0]), (self.other, self.products[0]),
+                              (self.customer, self.products[1])):
+            Wishlist.objects.create(user=user, product=product)
+
+    def run_alerts(self):
+        out = StringIO()
+        call_command('send_wishlist_alerts', stdout=out)
+        return out.getvalue()
+
+    def test_price_drop_and_back_in_stock_notify_wishlisters_once(self):
+        """Test que seuls les produits modifiés notifient leurs wishlisters, une seule fois"""
+        self.products[0].price = 8
+        self.products[0].save()
+        self.products[1].quantity = 0
+        self.products[1].save()
+        # Une hausse de prix n'est pas une alerte
+        self.products[2].price = 15
+        self.products[2].save()
+
+        self.assertIn('1 baisse(s) de prix, 0 retour(s) en stock : 2 notification(s)', self.run_alerts())
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', 'titre')),
+            {(self.customer.id, 'Baisse de prix'), (self.other.id, 'Baisse de prix')}
+        )
+        self.assertIn('0 notification(s)', self.run_alerts())
+
+        self.products[1].quantity = 3
+        self.products[1].save()
+        self.assertIn('0 baisse(s) de prix, 1 retour(s) en stock : 1 notification(s)', self.run_alerts())
+
+    def test_several_alerts_for_one_user_update_counters(self):
+        """Test que deux alertes pour le même client comptent deux notifications non lues"""
+        get_counts(self.customer.id)
+        self.products[0].price = 8
+        self.products[0].save()
+        self.products[1].price = 7
+        self.products[1].save()
+
+        self.run_alerts()
+
+        counter = NotificationCounter.objects.get(pk=self.customer.id)
+        self.assertEqual((counter.total_count, counter.unread_count), (2, 2))
+
+    def test_only_net_changes_since_last_run_are_reported(self):
+        """Test qu'une baisse annulée avant le passage suivant n'est pas signalée"""
+        product = self.products[0]
+        product.price = 8
+        product.save()
+        product.price = 10
+        product.save()
+
+        self.assertIn('0 notification(s)', self.run_alerts())
+        self.assertFalse(ProductPriceHistory.objects.filter(processed=False).exists())
+
+    def test_wishlist_stats_counts_price_alerts(self):
+        """Test que le tableau de bord compte les produits moins chers qu'à leur ajout"""
+        self.products[1].price = 7
+        self.products[1].save()
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(reverse('customer-dashboard-wishlist-stats'))
+
+        self.assertEqual(response.data['recommendations']['price_alerts'], 1)
+
+
+class WishlistMoveToCartTestCase(WishlistFixturesMixin, APITestCase):
+    """Tests pour le déplacement en masse de la wishlist vers le panier"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('wishlist-move-to-cart')
+        self.client.force_authenticate(user=self.customer)
+
+    def wishlist(self, products):
+        return [Wishlist.objects.create(user=self.customer, product=product) for product in products]
+
+    def test_move_all_merges_existing_cart_items(self):
+        """Test que tout est déplacé, les quantités existantes cumulées et la wishlist vidée"""
+        self.wishlist(self.products)
+        self.client.post(reverse('cart-add-item'), {'product_id': str(self.products[0].id), 'quantity': 2}, format='json')
+
+        response = self.client.post(self.url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['moved']), 3)
+        quantities = {item['product']['id']: item['quantity'] for item in response.data['cart']['items']}
+        self.assertEqual(quantities[str(self.products[0].id)], 3)
+        self.assertEqual(response.data['cart']['total_items'], 5)
+        self.assertFalse(Wishlist.objects.filter(user=self.customer).exists())
+
+    def test_selected_items_skip_unavailable_and_keep_wishlist(self):
+        """Test que seuls les éléments choisis et disponibles sont déplacés"""
+        items = self.wishlist(self.products)
+        self.products[1].status = 'inactive'
+        self.products[1].save()
+
+        response = self.client.post(self.url, {
+            'wishlist_ids': [str(items[0].id), str(items[1].id)], 'remove_from_wishlist': False
+        }, format='json')
+
+        self.assertEqual(response.data['moved'], [str(self.products[0].id)])
+        self.assertEqual([item['product_id'] for item in response.data['skipped']], [str(self.products[1].id)])
+        self.assertEqual(Wishlist.objects.filter(user=self.customer).count(), 3)
+
+    def test_form_encoded_ids_are_not_split_into_characters(self):
+        """Test que des wishlist_ids envoyés en formulaire sont lus comme une liste d'UUID"""
+        items = self.wishlist(self.products)
+
+        response = self.client.post(self.url, {
+            'wishlist_ids': [str(items[0].id)], 'remove_from_wishlist': 'false'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['moved'], [str(self.products[0].id)])
+
+        response = self.client.post(self.url, {'wishlist_ids': str(items[1].id)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_products_are_locked_before_stock_check(self):
+        """Test que les produits sont relus avec verrou dans la transaction"""
+        self.wishlist(self.products[:1])
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as lock:
+            response = self.client.post(self.url, {}, format='json')
+
+        self.assertEqual(len(response.data['moved']), 1)
+        self.assertIn(Product, [call.args[0].model for call in lock.call_args_list])
+
+    def test_query_count_does_not_depend_on_items(self):
+        """Test que le nombre de requêtes est constant quel que soit le nombre d'éléments"""
+        Cart.objects.create(user=self.customer)
+        self.wishlist(self.products[:1])
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(self.url, {}, format='json')
+
+        more = [
+            Product.objects.create(name=f'Autre {i}', price=10, quantity=5, location=self.location, user=self.vendor)
+            for i in range(3)
+        ]
+        self.wishlist(self.products[1:] + more)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.post(self.url, {}, format='json')
+
+        self.assertEqual(len(response.data['moved']), 5)
+        self.assertEqual(len(few), len(many))
@@ -0,0 +1,151 @@
+"""
+Limitation de débit par seaux à jetons (token bucket) pour les vues d'authentification.
+
+Les taux sont définis dans ACHAT_THROTTLE_RATES sous la forme '<scope>_<kind>': 'N/période'
+(ex. 'login_ip': '20/min') : un seau de N jetons qui se remplit entièrement en une période.
+Les throttles DRF s'exécutent dans APIView.initial(), donc avant tout hachage ou requête SQL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'20/min' -> (capacité, jetons par seconde)"""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill(state, capacity, refill_rate, now):
+    tokens, updated_at = state if state is not None else (capacity, now)
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+def take(states, buckets, now):
+    """
+    Prend un jeton dans chaque seau seulement si tous en ont un. states : clé -> état,
+    buckets : [(clé, capacité, jetons par seconde)]. Retourne (autorisé, attente, nouveaux états).
+    """
+    levels = {key: refill(states.get(key), capacity, refill_rate, now) for key, capacity, refill_rate in buckets}
+    waits = [(1 - levels[key]) / refill_rate for key, _, refill_rate in buckets if levels[key] < 1]
+    if waits:
+        # Requête refusée : aucun seau n'est débité, une autre IP ou un autre compte n'en paie pas le prix
+        return False, max(waits), {}
+    return True, 0, {key: (levels[key] - 1, now) for key in levels}
+
+
+class InMemoryBucketStore:
+    """Seaux locaux au processus, bornés en nombre (les moins récemment utilisés sont oubliés)"""
+
+    def __init__(self, max_buckets=100000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, buckets):
+        now = time.monotonic()
+        with self._lock:
+            allowed, wait, states = take(self._buckets, buckets, now)
+            for key, state in states.items():
+                self._buckets[key] = state
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Seaux partagés entre processus via un cache Django (ACHAT_THROTTLE_CACHE_ALIAS).
+    La lecture-écriture n'est pas atomique : sous forte concurrence quelques requêtes
+    de plus peuvent passer, ce qui reste acceptable pour une limitation de débit.
+    """
+
+    prefix = 'achat:throttle'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'ACHAT_THROTTLE_CACHE_ALIAS', 'default')]
+
+    def consume(self, buckets):
+        buckets = [(f"{self.prefix}:{key}", capacity, refill_rate) for key, capacity, refill_rate in buckets]
+        now = time.time()
+        allowed, wait, states = take(self.cache.get_many([key for key, _, _ in buckets]), buckets, now)
+        for key, capacity, refill_rate in buckets:
+            if key in states:
+                # Le seau expire quand il serait de toute façon plein
+                self.cache.set(key, states[key], int(capacity / refill_rate) + 1)
+        return allowed, wait
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store_class = import_string(
+                    getattr(settings, 'ACHAT_THROTTLE_STORE', 'achat.throttling.InMemoryBucketStore')
+                )
+                _store = store_class()
+    return _store
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    Throttle des vues d'authentification. Chaque requête relève de trois seaux, dont le taux est
+    lu dans ACHAT_THROTTLE_RATES['<throttle_scope>_<kind>'] (throttle_scope défini sur la vue) :
+      - identifier : par compte visé, freine le credential stuffing sur un même identifier ;
+      - ip : par adresse IP ;
+      - global : plafond global, pour protéger le CPU lors d'attaques distribuées.
+    Les seaux sont vérifiés ensemble et débités seulement si tous autorisent la requête : une IP
+    déjà limitée ne consomme plus le seau global des autres. Sans taux configuré, pas de limite.
+    """
+    kinds = ('identifier', 'ip', 'global')
+
+    def get_key(self, kind, request, view):
+        if kind == 'identifier':
+            identifier = request.data.get('identifier') if hasattr(request.data, 'get') else None
+            if not identifier:
+                return None
+            return str(identifier).strip().lower()
+        if kind == 'ip':
+            return self.get_ident(request)
+        return 'all'
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        rates = getattr(settings, 'ACHAT_THROTTLE_RATES', {})
+        buckets = []
+        for kind in self.kinds:
+            scope = f"{getattr(view, 'throttle_scope', None)}_{kind}"
+            rate = rates.get(scope)
+            key = self.get_key(kind, request, view) if rate is not None else None
+            if key is not None:
+                buckets.append((f"{scope}:{key}", *parse_rate(rate)))
+        if not buckets:
+            return True
+
+        allowed, self.wait_seconds = get_bucket_store().consume(buckets)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+AUTH_THROTTLES = [AuthRateThrottle]
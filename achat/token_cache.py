@@ -0,0 +1,211 @@
+"""
+Cache token -> utilisateur pour UUIDTokenAuthentication, et enregistrement groupé
+de la dernière activité des tokens.
+
+Deux niveaux : un LRU en mémoire du processus (TTL court) devant un cache partagé
+(alias Django configurable). Un token valide est donc résolu sans requête SQL.
+
+Une révocation efface le LRU du processus qui l'écrit et le cache partagé ; les autres
+processus peuvent accepter le token révoqué pendant au plus ACHAT_TOKEN_CACHE_LOCAL_TTL
+secondes. Si l'alias n'est pas réellement partagé (LocMemCache, cache par processus), le TTL
+du second niveau est ramené à cette même durée pour garder la même fenêtre de révocation.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from .tasks import enqueue
+
+TOKEN_CACHE_PREFIX = 'achat:auth_token'
+
+
+class LocalLRUCache:
+    """LRU borné avec expiration, protégé par un verrou (serveurs multi-threads)"""
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def is_process_local(cache):
+    """Vrai pour les backends de cache propres à chaque processus (invalidations non partagées)"""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+class TokenCache:
+    """
+    Les entrées sont des (user, token, token_id, expires_at). Le LRU local n'est invalidé
+    que dans le processus qui reçoit l'écriture : son TTL borne la durée pendant laquelle
+    les autres processus peuvent encore accepter un token révoqué.
+    """
+
+    def __init__(self):
+        self.local = LocalLRUCache(
+            max_size=getattr(settings, 'ACHAT_TOKEN_CACHE_SIZE', 1024),
+            ttl=getattr(settings, 'ACHAT_TOKEN_CACHE_LOCAL_TTL', 30),
+        )
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'ACHAT_TOKEN_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def key(token):
+        return f"{TOKEN_CACHE_PREFIX}:{token}"
+
+    def get(self, token):
+        key = self.key(token)
+        entry = self.local.get(key)
+        if entry is None:
+            entry = self.shared.get(key)
+            if entry is None:
+                return None
+            self.local.set(key, entry)
+        user, user_token, token_id, expires_at = entry
+        if expires_at <= timezone.now():
+            self.invalidate(token)
+            return None
+        # Copie : chaque requête reçoit sa propre instance de l'utilisateur
+        return copy.copy(user), user_token, token_id
+
+    def set(self, token, user, user_token, token_id, expires_at):
+        key = self.key(token)
+        entry = (user, user_token, token_id, expires_at)
+        shared_ttl = getattr(settings, 'ACHAT_TOKEN_CACHE_TTL', 300)
+        if is_process_local(self.shared):
+            shared_ttl = min(shared_ttl, self.local.ttl)
+        # Une entrée ne survit jamais à l'expiration du token
+        timeout = min(shared_ttl, int((expires_at - timezone.now()).total_seconds()))
+        if timeout <= 0:
+            return
+        self.local.set(key, entry, timeout)
+        self.shared.set(key, entry, timeout)
+
+    def invalidate(self, *tokens):
+        keys = [self.key(token) for token in tokens]
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many(keys)
+
+    def invalidate_user(self, user_id):
+        """Invalide tous les tokens d'un utilisateur (déconnexion, modification du compte)"""
+        from .models import UserToken
+
+        self.local.delete_where(lambda entry: entry[0].pk == user_id)
+        tokens = UserToken.objects.filter(user_id=user_id, is_active=True).values_list('token', flat=True)
+        self.shared.delete_many([self.key(token) for token in tokens])
+
+    def clear(self):
+        self.local.clear()
+
+
+class LastSeenRecorder:
+    """
+    Regroupe en mémoire les dates de dernière activité des tokens et les écrit par lots
+    (un bulk_update toutes les ACHAT_TOKEN_LAST_SEEN_FLUSH secondes au plus) au lieu d'un
+    UPDATE par requête. L'écriture prolonge aussi l'expiration glissante du token.
+    Les activités non encore écrites sont perdues si le processus s'arrête : la donnée est indicative.
+    """
+
+    def __init__(self, flush_interval=None, max_pending=None):
+        self.flush_interval = flush_interval or getattr(settings, 'ACHAT_TOKEN_LAST_SEEN_FLUSH', 60)
+        self.max_pending = max_pending or getattr(settings, 'ACHAT_TOKEN_LAST_SEEN_MAX_PENDING', 1000)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, token_id, seen_at=None):
+        with self._lock:
+            self._pending[token_id] = seen_at or timezone.now()
+            due = (
+                len(self._pending) >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if due:
+                self._last_flush = time.monotonic()
+        if due:
+            enqueue(self.flush)
+
+    def flush(self):
+        from .models import UserToken
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        ttl = timedelta(days=getattr(settings, 'ACHAT_TOKEN_TTL_DAYS', 30))
+        tokens = [
+            UserToken(id=token_id, last_seen_at=seen_at, expires_at=seen_at + ttl)
+            for token_id, seen_at in pending.items()
+        ]
+        UserToken.objects.bulk_update(tokens, ['last_seen_at', 'expires_at'], batch_size=500)
+        return len(tokens)
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache()
+    return _token_cache
+
+
+_last_seen_recorder = None
+
+
+def get_last_seen_recorder():
+    global _last_seen_recorder
+    if _last_seen_recorder is None:
+        with _token_cache_lock:
+            if _last_seen_recorder is None:
+                _last_seen_recorder = LastSeenRecorder()
+    return _last_seen_recorder
@@ -2,11 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .viewsets.register import RegisterView
 from .viewsets.login import LoginView
-from .viewsets.logout import LogoutView
+from .viewsets.logout import LogoutView, TokenRefreshView
 from .viewsets.categories import CategoryViewSet, SubCategoryViewSet
 from .viewsets.product import ProductViewSet
 from .viewsets.wishlist import WishlistViewSet
 from .viewsets.notification import NotificationViewSet
+from .viewsets.notification_stream import notification_stream
 from .viewsets.cart import CartViewSet
 from .viewsets.orders import OrderViewSet
 from .viewsets.reviews import ReviewViewSet
@@ -30,6 +31,10 @@ urlpatterns = [
     path("auth/register/", RegisterView.as_view(), name="register"),
     path("auth/login/", LoginView.as_view(), name="login"),
     path("auth/logout/", LogoutView.as_view(), name="logout"),
+    path("auth/token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
+
+    # Flux temps réel des notifications (SSE, servi en ASGI)
+    path("notifications/stream/", notification_stream, name="notification-stream"),
     
     # API Router endpoints (Categories, SubCategories, Products)
     path("", include(router.urls)),
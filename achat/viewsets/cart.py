@@ -6,6 +6,37 @@ from ..models import Cart, CartItem, Product, CustomUser
 from rest_framework.permissions import IsAuthenticated
 
 
+def serialize_cart(cart):
+    """Contenu du panier avec produits, vendeurs et images chargés en deux requêtes"""
+    items = list(cart.items.select_related('product__user').prefetch_related('product__images'))
+
+    items_data = []
+    for item in items:
+        items_data.append({
+            'id': str(item.id),
+            'product': {
+                'id': str(item.product.id),
+                'name': item.product.name,
+                'price': str(item.product.price),
+                'images': [{'image': img.image.url} for img in item.product.images.all()],
+                'vendor': {
+                    'name': f"{item.product.user.prenom} {item.product.user.nom}",
+                    'id': str(item.product.user.id)
+                }
+            },
+            'quantity': item.quantity,
+            'total_price': str(item.total_price),
+            'created_at': item.created_at
+        })
+
+    return {
+        'cart_id': str(cart.id),
+        'total_items': sum(item.quantity for item in items),
+        'total_amount': str(sum(item.total_price for item in items)),
+        'items': items_data
+    }
+
+
 class CartViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
@@ -16,32 +47,7 @@ class CartViewSet(viewsets.ViewSet):
     def list(self, request):
         user = request.user
         cart = self.get_or_create_cart(user)
-        
-        items_data = []
-        for item in cart.items.all():
-            items_data.append({
-                'id': str(item.id),
-                'product': {
-                    'id': str(item.product.id),
-                    'name': item.product.name,
-                    'price': str(item.product.price),
-                    'images': [{'image': img.image.url} for img in item.product.images.all()],
-                    'vendor': {
-                        'name': f"{item.product.user.prenom} {item.product.user.nom}",
-                        'id': str(item.product.user.id)
-                    }
-                },
-                'quantity': item.quantity,
-                'total_price': str(item.total_price),
-                'created_at': item.created_at
-            })
-
-        return Response({
-            'cart_id': str(cart.id),
-            'total_items': cart.total_items,
-            'total_amount': str(cart.total_amount),
-            'items': items_data
-        })
+        return Response(serialize_cart(cart))
 
     @action(detail=False, methods=['post'])
     def add_item(self, request):
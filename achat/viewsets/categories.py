@@ -6,7 +6,9 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-from ..models import Category, SubCategory
+from ..models import SubCategory
+from ..catalog_counts import categories_with_counts, with_product_counts
+from ..category_tree import get_category_tree
 from ..serializers import CategorySerializer, SubCategorySerializer
 
 
@@ -43,7 +45,7 @@ from ..serializers import CategorySerializer, SubCategorySerializer
     ),
 )
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+    queryset = categories_with_counts()
     serializer_class = CategorySerializer
     parser_classes = [JSONParser, FormParser, MultiPartParser]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -52,6 +54,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at', 'updated_at']
     ordering = ['name']
 
+    def list(self, request, *args, **kwargs):
+        # Sans filtre, recherche ni tri, l'arbre en mémoire suffit
+        if not request.query_params:
+            return Response(get_category_tree())
+        return super().list(request, *args, **kwargs)
+
     @extend_schema(
         tags=['Categories'],
         summary="Catégories par sous-catégorie",
@@ -68,7 +76,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='by-subcategory/(?P<subcategory_id>[^/.]+)')
     def by_subcategory(self, request, subcategory_id=None):
         try:
-            categories = Category.objects.filter(subcategories__id=subcategory_id)
+            categories = categories_with_counts().filter(subcategories__id=subcategory_id)
             serializer = self.get_serializer(categories, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -84,9 +92,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'], url_path='active')
     def active_categories(self, request):
-        categories = Category.objects.filter(is_active=True)
-        serializer = self.get_serializer(categories, many=True)
-        return Response(serializer.data)
+        return Response([category for category in get_category_tree() if category['is_active']])
 
 
 @extend_schema_view(
@@ -122,7 +128,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ),
 )
 class SubCategoryViewSet(viewsets.ModelViewSet):
-    queryset = SubCategory.objects.all()
+    queryset = with_product_counts(SubCategory.objects.all())
     serializer_class = SubCategorySerializer
     parser_classes = [JSONParser, FormParser, MultiPartParser]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -138,7 +144,7 @@ class SubCategoryViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'], url_path='active')
     def active_subcategories(self, request):
-        subcategories = SubCategory.objects.filter(is_active=True)
+        subcategories = with_product_counts(SubCategory.objects.filter(is_active=True))
         serializer = self.get_serializer(subcategories, many=True)
         return Response(serializer.data)
 
@@ -158,7 +164,7 @@ class SubCategoryViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='by-category/(?P<category_id>[^/.]+)')
     def by_category(self, request, category_id=None):
         try:
-            subcategories = SubCategory.objects.filter(categories__id=category_id)
+            subcategories = with_product_counts(SubCategory.objects.filter(categories__id=category_id))
             serializer = self.get_serializer(subcategories, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -2,10 +2,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Avg, Q, Min, Max
+from django.db.models import Sum, Count, Avg, Q, Min, Max, F, OuterRef, Subquery
 from django.utils import timezone
 from datetime import timedelta
-from ..models import Product, Order, OrderItem, Review, Wishlist, Cart, CustomUser
+from ..models import Product, Order, OrderItem, Review, Wishlist, Cart, CustomUser, ProductDailySales, VendorRating, ProductPriceHistory
+from ..dashboard_cache import cached_dashboard
+from ..recommendations import SOURCE_PURCHASES, SOURCE_WISHLIST, recommend
+from ..stats import MAX_MONTHS, monthly_totals
 
 
 class CustomerDashboardViewSet(viewsets.ViewSet):
@@ -31,6 +34,7 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def overview(self, request):
         user = request.user
         
@@ -111,6 +115,7 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def order_history(self, request):
         user = request.user
         
@@ -191,6 +196,7 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def wishlist_stats(self, request):
         user = request.user
         
@@ -215,6 +221,14 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
         available_count = wishlists.filter(product__status='active', product__is_stock=True, product__quantity__gt=0).count()
         unavailable_count = total_wishlist_items - available_count
 
+        # Produits moins chers qu'au moment de leur ajout (prix d'alors lu dans l'historique)
+        price_when_added = ProductPriceHistory.objects.filter(
+            product=OuterRef('product_id'), recorded_at__lte=OuterRef('created_at')
+        ).order_by('-recorded_at').values('price')[:1]
+        price_alerts = wishlists.annotate(
+            price_when_added=Subquery(price_when_added)
+        ).filter(product__price__lt=F('price_when_added')).count()
+
         # Items de wishlist récents
         recent_wishlist = wishlists.order_by('-created_at')[:10]
         recent_data = []
@@ -247,35 +261,31 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
             'recent_wishlist': recent_data,
             'recommendations': {
                 'move_to_cart': available_count,
-                'price_alerts': unavailable_count  # Pourrait être implémenté plus tard
+                'price_alerts': price_alerts
             }
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def spending_analytics(self, request):
         user = request.user
         
         if user.user_type != 'customer':
             return Response({'error': 'Only customers can access this dashboard'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Période d'analyse (12 derniers mois par défaut)
-        months = int(request.query_params.get('months', 12))
+        # Période d'analyse (12 derniers mois par défaut, MAX_MONTHS au plus)
+        try:
+            months = min(max(int(request.query_params.get('months', 12)), 1), MAX_MONTHS)
+        except ValueError:
+            return Response({'error': 'Le paramètre months doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Dépenses mensuelles
+        # Dépenses mensuelles, en une seule requête
         monthly_spending = []
-        for i in range(months):
-            month_start = timezone.now().replace(day=1) - timedelta(days=30*i)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            month_orders = Order.objects.filter(
-                user=user,
-                created_at__gte=month_start,
-                created_at__lte=month_end
-            ).aggregate(
-                total_spent=Sum('total_amount'),
-                orders_count=Count('id')
-            )
-
+        for month_start, month_orders in monthly_totals(
+            Order.objects.filter(user=user), months,
+            total_spent=Sum('total_amount'),
+            orders_count=Count('id')
+        ):
             monthly_spending.append({
                 'month': month_start.strftime('%Y-%m'),
                 'month_name': month_start.strftime('%B %Y'),
@@ -283,8 +293,6 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
                 'orders_count': month_orders['orders_count'] or 0
             })
 
-        monthly_spending.reverse()  # Ordre chronologique
-
         # Dépenses par catégorie
         category_spending = OrderItem.objects.filter(
             order__user=user
@@ -339,6 +347,7 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def favorite_vendors(self, request):
         user = request.user
         
@@ -357,19 +366,18 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
             last_order=Max('order__created_at')
         ).order_by('-total_spent')
 
+        # Notes de tous les vendeurs en une requête
+        vendor_ratings = {
+            rating.vendor_id: rating
+            for rating in VendorRating.objects.filter(vendor_id__in=[v['vendor__id'] for v in vendors_by_spending])
+        }
+
         vendors_data = []
         for vendor_stat in vendors_by_spending:
             vendor_id = vendor_stat['vendor__id']
-            
-            # Récupérer les informations de rating du vendeur
-            try:
-                from ..models import VendorRating
-                vendor_rating = VendorRating.objects.get(vendor_id=vendor_id)
-                avg_rating = float(vendor_rating.average_rating)
-                total_reviews = vendor_rating.total_reviews
-            except:
-                avg_rating = 0
-                total_reviews = 0
+            vendor_rating = vendor_ratings.get(vendor_id)
+            avg_rating = float(vendor_rating.average_rating) if vendor_rating else 0
+            total_reviews = vendor_rating.total_reviews if vendor_rating else 0
 
             vendors_data.append({
                 'vendor': {
@@ -398,50 +406,39 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def recommendations(self, request):
         user = request.user
         
         if user.user_type != 'customer':
             return Response({'error': 'Only customers can access this dashboard'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Produits basés sur l'historique d'achat
-        purchased_categories = OrderItem.objects.filter(
-            order__user=user
-        ).values_list('product__category_id', flat=True).distinct()
+        # Voisins précalculés (commande refresh_recommendations) des produits récents du client
+        recommended = recommend(user, limit=10)
 
-        category_recommendations = Product.objects.filter(
-            category_id__in=purchased_categories,
-            status='active',
-            is_stock=True,
-            quantity__gt=0
-        ).exclude(
-            id__in=OrderItem.objects.filter(
-                order__user=user
-            ).values_list('product_id', flat=True)
-        ).select_related('user', 'location', 'category').prefetch_related('images', 'reviews')[:10]
-
-        # Produits similaires à la wishlist
-        wishlist_categories = Wishlist.objects.filter(
-            user=user
-        ).values_list('product__category_id', flat=True).distinct()
-
-        wishlist_recommendations = Product.objects.filter(
-            category_id__in=wishlist_categories,
+        # Tendances : produits les plus commandés sur 30 jours, lus dans les agrégats journaliers
+        trending = list(ProductDailySales.objects.filter(
+            date__gte=timezone.localdate() - timedelta(days=30)
+        ).exclude(status='cancelled').values('product_id').annotate(
+            units=Sum('units')
+        ).order_by('-units').values_list('product_id', flat=True)[:20])
+
+        product_ids = {product_id for ids in recommended.values() for product_id in ids} | set(trending)
+        products = Product.objects.filter(
+            id__in=product_ids,
             status='active',
             is_stock=True,
             quantity__gt=0
-        ).exclude(
-            id__in=Wishlist.objects.filter(
-                user=user
-            ).values_list('product_id', flat=True)
-        ).select_related('user', 'location', 'category').prefetch_related('images', 'reviews')[:10]
+        ).select_related('user', 'location', 'category', 'product_rating').prefetch_related('images').in_bulk()
 
-        def format_product_data(products):
+        def format_product_data(ids, limit=10):
             data = []
-            for product in products:
-                avg_rating = product.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
-                reviews_count = product.reviews.count()
-                
+            for product_id in ids:
+                product = products.get(product_id)
+                if product is None:
+                    continue
+                rating = getattr(product, 'product_rating', None)
+
                 data.append({
                     'id': str(product.id),
                     'name': product.name,
@@ -457,27 +454,23 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
                         'name': product.category.name if product.category else None
                     },
                     'reviews': {
-                        'average_rating': round(avg_rating, 2),
-                        'total_reviews': reviews_count
+                        'average_rating': round(float(rating.average_rating), 2) if rating else 0,
+                        'total_reviews': rating.total_reviews if rating else 0
                     }
                 })
+                if len(data) == limit:
+                    break
             return data
 
         return Response({
-            'based_on_purchases': format_product_data(category_recommendations),
-            'based_on_wishlist': format_product_data(wishlist_recommendations),
-            'trending_products': format_product_data(
-                Product.objects.filter(
-                    status='active',
-                    is_stock=True,
-                    quantity__gt=0
-                ).annotate(
-                    order_count=Count('order_items')
-                ).order_by('-order_count')[:5]
-            )
+            'recommended': format_product_data(recommended['all']),
+            'based_on_purchases': format_product_data(recommended[SOURCE_PURCHASES]),
+            'based_on_wishlist': format_product_data(recommended[SOURCE_WISHLIST]),
+            'trending_products': format_product_data(trending, limit=5)
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def review_history(self, request):
         user = request.user
         
@@ -511,7 +504,7 @@ class CustomerDashboardViewSet(viewsets.ViewSet):
             order__user=user,
             order__status='delivered',
             review__isnull=True
-        ).select_related('product', 'vendor')
+        ).select_related('product', 'vendor', 'order')
 
         pending_data = []
         for item in pending_reviews:
@@ -3,6 +3,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema
+from ..hashing import PasswordHashingBusy
+from ..throttling import AUTH_THROTTLES
 from ..serializers import LoginSerializer, UserResponseSerializer
 from ..models import UserToken
 
@@ -10,6 +12,10 @@ User = get_user_model()
 
 
 class LoginView(APIView):
+    # Vérifiés avant le hachage du mot de passe et toute requête SQL
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = 'login'
+
     @extend_schema(
         tags=['Authentication'],
         summary="Connexion utilisateur",
@@ -17,7 +23,9 @@ class LoginView(APIView):
         request=LoginSerializer,
         responses={
             200: UserResponseSerializer,
-            401: {"type": "object", "properties": {"error": {"type": "string"}}}
+            401: {"type": "object", "properties": {"error": {"type": "string"}}},
+            429: {"type": "object", "properties": {"detail": {"type": "string"}}},
+            503: {"type": "object", "properties": {"error": {"type": "string"}}}
         }
     )
     def post(self, request):
@@ -26,11 +34,24 @@ class LoginView(APIView):
             identifier = serializer.validated_data['identifier']
             password = serializer.validated_data['password']
             
-            user = authenticate(request, identifier=identifier, password=password)
+            try:
+                user = authenticate(request, identifier=identifier, password=password)
+            except PasswordHashingBusy as e:
+                return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
             if user:
-                # Creer ou recuperer le token
-                user_token, created = UserToken.objects.get_or_create(user=user)
-                user_data = UserResponseSerializer(user).data
+                # Un token par appareil : une reconnexion depuis le même appareil remplace l'ancien.
+                # Seul un device_name envoyé par le client identifie l'appareil : le User-Agent,
+                # partagé par tous les appareils d'une même version de l'application, ne sert que
+                # de libellé et ne révoque rien.
+                device_name = serializer.validated_data.get('device_name')
+                if device_name:
+                    for previous in UserToken.objects.filter(user=user, device_name=device_name, is_active=True):
+                        previous.is_active = False
+                        previous.save(update_fields=['is_active', 'updated_at'])
+                else:
+                    device_name = request.META.get('HTTP_USER_AGENT', '')[:255]
+                user_token = UserToken.objects.create(user=user, device_name=device_name)
+                user_data = UserResponseSerializer(user, context={'token': user_token}).data
                 return Response(user_data, status=status.HTTP_200_OK)
             else:
                 return Response(
@@ -2,9 +2,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from django.db import transaction
 from ..models import UserToken
 from ..authentication import UUIDTokenAuthentication
+from ..token_cache import get_token_cache
 
 
 class LogoutView(APIView):
@@ -14,7 +16,10 @@ class LogoutView(APIView):
     @extend_schema(
         tags=['Authentication'],
         summary="Deconnexion utilisateur",
-        description="Deconnecte l'utilisateur et invalide son token",
+        description="Deconnecte l'appareil courant et invalide son token (tous les appareils avec all=true)",
+        parameters=[
+            OpenApiParameter(name='all', description='Deconnecter tous les appareils', required=False, type=bool),
+        ],
         responses={
             200: {"type": "object", "properties": {"message": {"type": "string"}}},
             401: {"type": "object", "properties": {"error": {"type": "string"}}}
@@ -22,8 +27,14 @@ class LogoutView(APIView):
     )
     def post(self, request):
         try:
-            # Désactiver le token de l'utilisateur au lieu de le supprimer
-            UserToken.objects.filter(user=request.user).update(is_active=False)
+            # Désactiver le token au lieu de le supprimer
+            tokens = UserToken.objects.filter(user=request.user, is_active=True)
+            if request.query_params.get('all', '').lower() != 'true':
+                tokens = tokens.filter(token=request.auth)
+            revoked = list(tokens.values_list('token', flat=True))
+            tokens.update(is_active=False)
+            # update() ne déclenche pas les signaux : invalidation explicite du cache
+            get_token_cache().invalidate(*revoked)
             return Response(
                 {"message": "Deconnexion reussie"}, 
                 status=status.HTTP_200_OK
@@ -32,4 +43,37 @@ class LogoutView(APIView):
             return Response(
                 {"error": "Erreur lors de la deconnexion"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class TokenRefreshView(APIView):
+    authentication_classes = [UUIDTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Authentication'],
+        summary="Rotation du token",
+        description="Remplace le token de l'appareil courant par un nouveau token et invalide l'ancien",
+        responses={
+            200: {"type": "object", "properties": {
+                "token": {"type": "string"},
+                "expires_at": {"type": "string", "format": "date-time"}
+            }},
+            401: {"type": "object", "properties": {"error": {"type": "string"}}}
+        }
+    )
+    def post(self, request):
+        # Le token a pu être révoqué depuis sa mise en cache : on relit la ligne, verrouillée pour
+        # que deux rotations concurrentes ne laissent pas deux tokens actifs pour le même appareil
+        with transaction.atomic():
+            try:
+                user_token = UserToken.objects.select_for_update().get(
+                    token=request.auth, user=request.user, is_active=True
+                )
+            except UserToken.DoesNotExist:
+                return Response({"error": "Token invalide ou inactif"}, status=status.HTTP_401_UNAUTHORIZED)
+            new_token = user_token.rotate()
+        return Response(
+            {"token": str(new_token.token), "expires_at": new_token.expires_at},
+            status=status.HTTP_200_OK
+        )
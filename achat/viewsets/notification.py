@@ -2,13 +2,14 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from ..models import Notification
-from ..serializers import NotificationSerializer
+from ..serializers import NotificationSerializer, NotificationBroadcastSerializer
+from ..notifications import enqueue_fan_out, adjust_counts, get_counts, publish_notifications
 
 
 @extend_schema_view(
@@ -59,7 +60,48 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return Notification.objects.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        notification = serializer.save(user=self.request.user)
+        adjust_counts([notification.user_id], total=1, unread=0 if notification.is_read else 1)
+        publish_notifications([notification])
+
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if was_read != notification.is_read:
+            adjust_counts([notification.user_id], unread=-1 if notification.is_read else 1)
+
+    def perform_destroy(self, instance):
+        user_id, was_read = instance.user_id, instance.is_read
+        instance.delete()
+        adjust_counts([user_id], total=-1, unread=0 if was_read else -1)
+
+    @extend_schema(
+        tags=['Notifications'],
+        summary="Diffuser une notification à un segment",
+        description="Crée en arrière-plan une notification pour chaque utilisateur du segment ciblé "
+                    "(type d'utilisateur, wishlisters d'un produit, acheteurs d'un vendeur). Réservé au staff.",
+        request=NotificationBroadcastSerializer,
+        responses={202: {"type": "object", "properties": {"message": {"type": "string"}}}}
+    )
+    @action(detail=False, methods=['post'], url_path='broadcast', permission_classes=[IsAdminUser])
+    def broadcast(self, request):
+        serializer = NotificationBroadcastSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        enqueue_fan_out(
+            data['segment'],
+            data['titre'],
+            data['content'],
+            user_type=data.get('user_type'),
+            product_id=data.get('product_id'),
+            vendor_id=data.get('vendor_id'),
+        )
+
+        return Response(
+            {'message': 'Diffusion planifiée', 'segment': data['segment']},
+            status=status.HTTP_202_ACCEPTED
+        )
 
     @extend_schema(
         tags=['Notifications'],
@@ -203,8 +245,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 id=notification_id,
                 user=request.user
             )
-            notification.is_read = True
-            notification.save()
+            if not notification.is_read:
+                notification.is_read = True
+                notification.save()
+                adjust_counts([notification.user_id], unread=-1)
             
             serializer = self.get_serializer(notification)
             return Response({
@@ -242,8 +286,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 id=notification_id,
                 user=request.user
             )
-            notification.is_read = False
-            notification.save()
+            if notification.is_read:
+                notification.is_read = False
+                notification.save()
+                adjust_counts([notification.user_id], unread=1)
             
             serializer = self.get_serializer(notification)
             return Response({
@@ -270,6 +316,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def mark_all_as_read(self, request):
         try:
             count = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+            adjust_counts([request.user.id], unread=-count)
             return Response({
                 'message': f'{count} notification(s) marquée(s) comme lue(s)',
                 'count': count
@@ -288,8 +335,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['delete'], url_path='delete-all-read')
     def delete_all_read(self, request):
         try:
-            count = Notification.objects.filter(user=request.user, is_read=True).count()
-            Notification.objects.filter(user=request.user, is_read=True).delete()
+            count = Notification.objects.filter(user=request.user, is_read=True).delete()[0]
+            adjust_counts([request.user.id], total=-count)
             return Response({
                 'message': f'{count} notification(s) lue(s) supprimée(s)',
                 'count': count
@@ -308,8 +355,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='count')
     def notifications_count(self, request):
         try:
-            total_count = Notification.objects.filter(user=request.user).count()
-            unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+            # Compteurs dénormalisés : un accès cache ou une lecture par clé primaire
+            counts = get_counts(request.user.id)
+            total_count = counts['total_count']
+            unread_count = counts['unread_count']
             read_count = total_count - unread_count
             
             return Response({
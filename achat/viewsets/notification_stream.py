@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+
+from ..authentication import UUIDTokenAuthentication
+from ..notifications import get_counts
+from ..realtime import get_broker
+
+
+def format_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def get_stream_token(request):
+    # EventSource ne permet pas d'envoyer d'en-tête : le token peut aussi passer en paramètre
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header[len('Bearer '):]
+    return request.GET.get('token')
+
+
+async def stream_events(user_id):
+    broker = get_broker()
+    queue = broker.subscribe(user_id)
+    keepalive = getattr(settings, 'ACHAT_STREAM_KEEPALIVE', 25)
+    try:
+        counts = await sync_to_async(get_counts)(user_id)
+        yield format_event('counts', counts)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event['type'], event['data'])
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    Flux Server-Sent Events des notifications de l'utilisateur connecté.
+    Envoie les compteurs à la connexion, puis chaque nouvelle notification et
+    chaque changement de compteurs. À servir par un serveur ASGI (uvicorn, daphne).
+    """
+    token = get_stream_token(request)
+    if not token:
+        return JsonResponse({'error': 'Token requis'}, status=401)
+
+    try:
+        user, _ = await sync_to_async(UUIDTokenAuthentication().authenticate_credentials)(token)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=401)
+
+    response = StreamingHttpResponse(stream_events(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -5,6 +5,7 @@ from django.shortcuts import get_object_or_404
 from django.db import transaction
 from django.db.models import Q
 from ..models import Order, OrderItem, Cart, Product, Location, CustomUser
+from ..sales import record_order, record_status_change
 from rest_framework.permissions import IsAuthenticated
 
 
@@ -179,6 +180,7 @@ class OrderViewSet(viewsets.ViewSet):
                     cart_item.product.save()
 
             cart.items.all().delete()
+            record_order(order)
 
         return Response({
             'message': 'Order created successfully',
@@ -219,8 +221,11 @@ class OrderViewSet(viewsets.ViewSet):
         if user.user_type == 'customer' and new_status not in ['cancelled']:
             return Response({'error': 'Customers can only cancel orders'}, status=status.HTTP_403_FORBIDDEN)
 
-        order.status = new_status
-        order.save()
+        with transaction.atomic():
+            old_status = order.status
+            order.status = new_status
+            order.save()
+            record_status_change(order, old_status)
 
         return Response({
             'message': 'Order status updated successfully',
@@ -9,7 +9,7 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiPara
 from drf_spectacular.types import OpenApiTypes
 from django.db.models import Q, Count, Avg, Min, Max
 from math import radians, cos, sin, asin, sqrt
-from ..models import Product, ProductImage, Location
+from ..models import Product, ProductImage, Location, CategoryProductCount
 from ..serializers import ProductSerializer, ProductImageSerializer
 
 
@@ -554,11 +554,10 @@ class ProductViewSet(viewsets.ModelViewSet):
             avg_price=Avg('price')
         )
 
-        category_stats = Product.objects.filter(status='active').values(
-            'category__name'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
+        # Compteurs maintenus par catégorie : pas de GROUP BY sur les produits
+        category_stats = CategoryProductCount.objects.filter(
+            status='active', count__gt=0
+        ).values('category__name', 'count').order_by('-count')[:10]
 
         return Response({
             'general_stats': {
@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
 from drf_spectacular.utils import extend_schema
+from ..hashing import PasswordHashingBusy
+from ..throttling import AUTH_THROTTLES
 from ..serializers import RegisterSerializer, UserResponseSerializer
 
 User = get_user_model()
@@ -11,6 +13,8 @@ User = get_user_model()
 
 class RegisterView(APIView):
     parser_classes = [JSONParser, FormParser, MultiPartParser]
+    throttle_classes = AUTH_THROTTLES
+    throttle_scope = 'register'
     
     @extend_schema(
         tags=['Authentication'],
@@ -19,13 +23,18 @@ class RegisterView(APIView):
         request=RegisterSerializer,
         responses={
             201: UserResponseSerializer,
-            400: {"type": "object", "properties": {"error": {"type": "string"}}}
+            400: {"type": "object", "properties": {"error": {"type": "string"}}},
+            429: {"type": "object", "properties": {"detail": {"type": "string"}}},
+            503: {"type": "object", "properties": {"error": {"type": "string"}}}
         }
     )
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                user = serializer.save()
+            except PasswordHashingBusy as e:
+                return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
             user_data = UserResponseSerializer(user).data
             return Response(user_data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
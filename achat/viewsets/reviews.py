@@ -1,31 +1,43 @@
+import uuid
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Avg, Count, Q
-from ..models import Review, VendorRating, Product, OrderItem, CustomUser
+from ..models import Review, VendorRating, ProductRating, Product, OrderItem, CustomUser
 from rest_framework.permissions import IsAuthenticated
+from django.core.exceptions import ValidationError
+from ..pagination import ReviewCursorPagination
 
 
 class ReviewViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    MAX_SUMMARY_PRODUCTS = 100
 
     def list(self, request):
         product_id = request.query_params.get('product_id')
         vendor_id = request.query_params.get('vendor_id')
         user_id = request.query_params.get('user_id')
         
-        reviews = Review.objects.all()
+        reviews = Review.objects.select_related('user', 'product', 'vendor').prefetch_related('product__images')
         
-        if product_id:
-            reviews = reviews.filter(product_id=product_id)
-        elif vendor_id:
-            reviews = reviews.filter(vendor_id=vendor_id)
-        elif user_id:
-            reviews = reviews.filter(user_id=user_id)
+        paginator = ReviewCursorPagination()
+        try:
+            # Chaque filtre s'appuie sur un index composite (champ, -created_at)
+            if product_id:
+                reviews = reviews.filter(product_id=product_id)
+            if vendor_id:
+                reviews = reviews.filter(vendor_id=vendor_id)
+            if user_id:
+                reviews = reviews.filter(user_id=user_id)
+
+            page = paginator.paginate_queryset(reviews, request, view=self)
+        except ValidationError:
+            return Response({'error': 'Invalid product_id, vendor_id or user_id'}, status=status.HTTP_400_BAD_REQUEST)
 
         reviews_data = []
-        for review in reviews.order_by('-created_at'):
+        for review in page:
             reviews_data.append({
                 'id': str(review.id),
                 'user': {
@@ -49,7 +61,51 @@ class ReviewViewSet(viewsets.ViewSet):
                 'updated_at': review.updated_at
             })
 
-        return Response({'reviews': reviews_data})
+        return Response({
+            'reviews': reviews_data,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'summary': self.get_summary(product_id=product_id, vendor_id=vendor_id),
+        })
+
+    def get_summary(self, product_id=None, vendor_id=None):
+        """Résumé des notes (nombre, moyenne, répartition) pour l'en-tête de la liste"""
+        if product_id:
+            product_rating = ProductRating.objects.filter(product_id=product_id).first()
+            if product_rating is None:
+                return {
+                    'total_reviews': 0,
+                    'average_rating': 0,
+                    'rating_breakdown': {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0}
+                }
+            summary = product_rating.to_summary()
+            return {
+                'total_reviews': summary['total_reviews'],
+                'average_rating': summary['average_rating'],
+                'rating_breakdown': summary['rating_breakdown']
+            }
+
+        if vendor_id:
+            vendor_rating = VendorRating.objects.filter(vendor_id=vendor_id).first()
+            if vendor_rating is None:
+                return {
+                    'total_reviews': 0,
+                    'average_rating': 0,
+                    'rating_breakdown': {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0}
+                }
+            return {
+                'total_reviews': vendor_rating.total_reviews,
+                'average_rating': float(vendor_rating.average_rating),
+                'rating_breakdown': {
+                    '1': vendor_rating.rating_1_count,
+                    '2': vendor_rating.rating_2_count,
+                    '3': vendor_rating.rating_3_count,
+                    '4': vendor_rating.rating_4_count,
+                    '5': vendor_rating.rating_5_count,
+                }
+            }
+
+        return None
 
     def retrieve(self, request, pk=None):
         try:
@@ -126,9 +182,6 @@ class ReviewViewSet(viewsets.ViewSet):
             comment=comment
         )
 
-        vendor_rating, created = VendorRating.objects.get_or_create(vendor=product.user)
-        vendor_rating.update_rating()
-
         return Response({
             'message': 'Review created successfully',
             'review': {
@@ -164,9 +217,6 @@ class ReviewViewSet(viewsets.ViewSet):
 
         review.save()
 
-        vendor_rating, created = VendorRating.objects.get_or_create(vendor=review.vendor)
-        vendor_rating.update_rating()
-
         return Response({
             'message': 'Review updated successfully',
             'review': {
@@ -182,12 +232,9 @@ class ReviewViewSet(viewsets.ViewSet):
         
         try:
             review = Review.objects.get(id=pk, user=user)
-            vendor = review.vendor
+            # VendorRating et ProductRating sont mis à jour par les signaux de Review
             review.delete()
             
-            vendor_rating, created = VendorRating.objects.get_or_create(vendor=vendor)
-            vendor_rating.update_rating()
-            
             return Response({'message': 'Review deleted successfully'})
         except Review.DoesNotExist:
             return Response({'error': 'Review not found or not owned by you'}, status=status.HTTP_404_NOT_FOUND)
@@ -204,25 +251,60 @@ class ReviewViewSet(viewsets.ViewSet):
         except Product.DoesNotExist:
             return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        reviews = Review.objects.filter(product=product)
-        
-        stats = {
-            'total_reviews': reviews.count(),
-            'average_rating': 0,
-            'rating_breakdown': {
-                '1': 0, '2': 0, '3': 0, '4': 0, '5': 0
+        try:
+            product_rating = ProductRating.objects.get(product=product)
+            stats = {
+                'total_reviews': product_rating.total_reviews,
+                'average_rating': float(product_rating.average_rating),
+                'rating_breakdown': product_rating.to_summary()['rating_breakdown']
+            }
+        except ProductRating.DoesNotExist:
+            stats = {
+                'total_reviews': 0,
+                'average_rating': 0,
+                'rating_breakdown': {
+                    '1': 0, '2': 0, '3': 0, '4': 0, '5': 0
+                }
             }
+
+        return Response(stats)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        try:
+            # Forme canonique : les clés de la réponse correspondent à str(product_id)
+            product_ids = [
+                str(uuid.UUID(pid.strip())) for pid in request.query_params.get('product_ids', '').split(',') if pid.strip()
+            ]
+        except ValueError:
+            return Response({'error': 'Invalid product_ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not product_ids:
+            return Response({'error': 'product_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(product_ids) > self.MAX_SUMMARY_PRODUCTS:
+            return Response(
+                {'error': f'At most {self.MAX_SUMMARY_PRODUCTS} product_ids per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Une seule requête sur l'index unique product_id
+        ratings = {
+            str(rating.product_id): rating.to_summary()
+            for rating in ProductRating.objects.filter(product_id__in=product_ids)
         }
 
-        if stats['total_reviews'] > 0:
-            avg_rating = reviews.aggregate(avg=Avg('rating'))['avg']
-            stats['average_rating'] = round(avg_rating, 2) if avg_rating else 0
-            
-            rating_counts = reviews.values('rating').annotate(count=Count('rating'))
-            for item in rating_counts:
-                stats['rating_breakdown'][str(item['rating'])] = item['count']
+        summaries = {}
+        for product_id in product_ids:
+            summaries[product_id] = ratings.get(product_id, {
+                'product_id': product_id,
+                'total_reviews': 0,
+                'average_rating': 0,
+                'rating_breakdown': {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0},
+                'updated_at': None
+            })
 
-        return Response(stats)
+        return Response({'summaries': summaries})
 
     @action(detail=False, methods=['get'])
     def vendor_stats(self, request):
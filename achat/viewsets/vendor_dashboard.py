@@ -2,10 +2,15 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Avg, Q, Min, Max
+from django.db.models import Sum, Count, Avg, Q, Min, Max, F
 from django.utils import timezone
 from datetime import timedelta
-from ..models import Product, Order, OrderItem, Review, VendorRating, CustomUser
+from ..models import Product, Order, OrderItem, Review, VendorRating, CustomUser, VendorDailySales, ProductDailySales
+from ..dashboard_cache import cached_dashboard
+from ..stats import monthly_totals
+
+
+PENDING_STATUSES = ['pending', 'confirmed', 'processing']
 
 
 class VendorDashboardViewSet(viewsets.ViewSet):
@@ -30,6 +35,7 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def overview(self, request):
         user = request.user
         
@@ -39,18 +45,16 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         # Statistiques générales
         total_products = Product.objects.filter(user=user).count()
         active_products = Product.objects.filter(user=user, status='active').count()
-        total_sales = OrderItem.objects.filter(vendor=user).count()
-        
-        # Revenue total
-        total_revenue = OrderItem.objects.filter(vendor=user).aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
 
-        # Commandes en cours
-        pending_orders = OrderItem.objects.filter(
-            vendor=user,
-            order__status__in=['pending', 'confirmed', 'processing']
-        ).count()
+        # Ventes, revenu et commandes en cours depuis les agrégats journaliers
+        sales_totals = VendorDailySales.objects.filter(vendor=user).aggregate(
+            total_sales=Sum('items'),
+            total_revenue=Sum('revenue'),
+            pending_orders=Sum('items', filter=Q(status__in=PENDING_STATUSES))
+        )
+        total_sales = sales_totals['total_sales'] or 0
+        total_revenue = sales_totals['total_revenue'] or 0
+        pending_orders = sales_totals['pending_orders'] or 0
 
         # Statistiques des avis
         try:
@@ -62,11 +66,11 @@ class VendorDashboardViewSet(viewsets.ViewSet):
             total_reviews = 0
 
         # Produits les plus vendus (top 5)
-        top_products = OrderItem.objects.filter(vendor=user).values(
+        top_products = ProductDailySales.objects.filter(vendor=user).values(
             'product__name', 'product__id'
         ).annotate(
-            total_sold=Sum('quantity'),
-            total_revenue=Sum('total_price')
+            total_sold=Sum('units'),
+            total_revenue=Sum('revenue')
         ).order_by('-total_sold')[:5]
 
         # Commandes récentes
@@ -108,6 +112,7 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def sales_analytics(self, request):
         user = request.user
         
@@ -119,34 +124,33 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days)
 
-        # Ventes par jour
-        daily_sales = OrderItem.objects.filter(
+        # Ventes par jour (agrégats journaliers : coût proportionnel au nombre de jours)
+        daily_sales = VendorDailySales.objects.filter(
             vendor=user,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        ).extra({
-            'day': 'date(created_at)'
-        }).values('day').annotate(
-            total_sales=Sum('total_price'),
-            orders_count=Count('order', distinct=True),
-            items_sold=Sum('quantity')
+            date__gte=timezone.localdate(start_date),
+            date__lte=timezone.localdate(end_date)
+        ).values(day=F('date')).annotate(
+            total_sales=Sum('revenue'),
+            orders_count=Sum('orders'),
+            items_sold=Sum('units')
         ).order_by('day')
 
         # Répartition par statut de commande
-        order_status_stats = OrderItem.objects.filter(vendor=user).values(
-            'order__status'
-        ).annotate(
-            count=Count('id'),
-            total_revenue=Sum('total_price')
-        )
+        order_status_stats = [
+            {'order__status': row['status'], 'count': row['count'], 'total_revenue': row['total_revenue']}
+            for row in VendorDailySales.objects.filter(vendor=user).values('status').annotate(
+                count=Sum('items'),
+                total_revenue=Sum('revenue')
+            ).order_by()
+        ]
 
         # Produits les plus rentables
-        profitable_products = OrderItem.objects.filter(vendor=user).values(
+        profitable_products = ProductDailySales.objects.filter(vendor=user).values(
             'product__name', 'product__id'
         ).annotate(
-            total_revenue=Sum('total_price'),
-            units_sold=Sum('quantity'),
-            orders_count=Count('order', distinct=True)
+            total_revenue=Sum('revenue'),
+            units_sold=Sum('units'),
+            orders_count=Sum('orders')
         ).order_by('-total_revenue')[:10]
 
         # Analyse des prix
@@ -163,7 +167,7 @@ class VendorDashboardViewSet(viewsets.ViewSet):
                 'days': days
             },
             'daily_sales': list(daily_sales),
-            'order_status_breakdown': list(order_status_stats),
+            'order_status_breakdown': order_status_stats,
             'top_profitable_products': list(profitable_products),
             'price_analysis': {
                 'min_price': price_analysis['min_price'],
@@ -173,78 +177,92 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def product_performance(self, request):
         user = request.user
         
         if user.user_type != 'vendor':
             return Response({'error': 'Only vendors can access this dashboard'}, status=status.HTTP_403_FORBIDDEN)
 
-        products = Product.objects.filter(user=user).prefetch_related('reviews', 'order_items')
-        
-        performance_data = []
-        for product in products:
-            # Statistiques de vente
-            sales_stats = OrderItem.objects.filter(product=product).aggregate(
-                total_sold=Sum('quantity'),
-                total_revenue=Sum('total_price'),
-                orders_count=Count('order', distinct=True)
-            )
-
-            # Statistiques des avis
-            reviews_stats = product.reviews.aggregate(
+        # Deux requêtes groupées, quel que soit le nombre de produits
+        products = list(Product.objects.filter(user=user).values(
+            'id', 'name', 'price', 'status', 'quantity', 'is_stock'
+        ))
+        sales = {
+            row['product_id']: row
+            for row in ProductDailySales.objects.filter(vendor=user).values('product_id').annotate(
+                total_sold=Sum('units'),
+                total_revenue=Sum('revenue'),
+                orders_count=Sum('orders')
+            ).order_by()
+        }
+        reviews = {
+            row['product_id']: row
+            for row in Review.objects.filter(vendor=user).values('product_id').annotate(
                 avg_rating=Avg('rating'),
                 total_reviews=Count('id')
-            )
+            ).order_by()
+        }
+
+        # Colonnes alignées sur `products`, le score est calculé colonne par colonne
+        no_sales, no_reviews = {}, {}
+        total_sold = [sales.get(p['id'], no_sales).get('total_sold') or 0 for p in products]
+        total_revenue = [sales.get(p['id'], no_sales).get('total_revenue') or 0 for p in products]
+        orders_count = [sales.get(p['id'], no_sales).get('orders_count') or 0 for p in products]
+        avg_rating = [reviews.get(p['id'], no_reviews).get('avg_rating') or 0 for p in products]
+        total_reviews = [reviews.get(p['id'], no_reviews).get('total_reviews') or 0 for p in products]
+        scores = self.calculate_performance_scores(total_sold, avg_rating, total_reviews)
 
-            # Performance relative
-            view_count = 0  # Pourrait être ajouté plus tard avec un modèle de tracking
-            
-            performance_data.append({
+        # Trier par score de performance
+        ranking = sorted(range(len(products)), key=scores.__getitem__, reverse=True)
+
+        performance_data = [
+            {
                 'product': {
-                    'id': str(product.id),
-                    'name': product.name,
-                    'price': str(product.price),
-                    'status': product.status,
-                    'quantity': product.quantity,
-                    'is_stock': product.is_stock
+                    'id': str(products[i]['id']),
+                    'name': products[i]['name'],
+                    'price': str(products[i]['price']),
+                    'status': products[i]['status'],
+                    'quantity': products[i]['quantity'],
+                    'is_stock': products[i]['is_stock']
                 },
                 'sales': {
-                    'total_sold': sales_stats['total_sold'] or 0,
-                    'total_revenue': str(sales_stats['total_revenue'] or 0),
-                    'orders_count': sales_stats['orders_count'] or 0
+                    'total_sold': total_sold[i],
+                    'total_revenue': str(total_revenue[i]),
+                    'orders_count': orders_count[i]
                 },
                 'reviews': {
-                    'average_rating': round(reviews_stats['avg_rating'] or 0, 2),
-                    'total_reviews': reviews_stats['total_reviews'] or 0
+                    'average_rating': round(avg_rating[i], 2),
+                    'total_reviews': total_reviews[i]
                 },
-                'performance_score': self.calculate_performance_score(
-                    sales_stats['total_sold'] or 0,
-                    reviews_stats['avg_rating'] or 0,
-                    reviews_stats['total_reviews'] or 0
-                )
-            })
-
-        # Trier par score de performance
-        performance_data.sort(key=lambda x: x['performance_score'], reverse=True)
+                'performance_score': scores[i]
+            }
+            for i in ranking
+        ]
 
         return Response({
             'products_performance': performance_data,
             'summary': {
                 'total_products': len(performance_data),
                 'top_performer': performance_data[0] if performance_data else None,
-                'needs_attention': [p for p in performance_data if p['performance_score'] < 30]
+                'needs_attention': [performance_data[rank] for rank, i in enumerate(ranking) if scores[i] < 30]
             }
         })
 
-    def calculate_performance_score(self, total_sold, avg_rating, total_reviews):
-        """Calcule un score de performance basé sur les ventes et avis"""
-        sales_score = min(total_sold * 2, 50)  # Max 50 points pour les ventes
-        rating_score = (avg_rating / 5) * 30 if total_reviews > 0 else 0  # Max 30 points pour la note
-        review_score = min(total_reviews * 2, 20)  # Max 20 points pour le nombre d'avis
-        
-        return round(sales_score + rating_score + review_score, 1)
+    def calculate_performance_scores(self, total_sold, avg_rating, total_reviews):
+        """Calcule les scores de performance (ventes et avis) pour des colonnes alignées"""
+        return [
+            round(
+                min(sold * 2, 50)  # Max 50 points pour les ventes
+                + ((rating / 5) * 30 if reviews > 0 else 0)  # Max 30 points pour la note
+                + min(reviews * 2, 20),  # Max 20 points pour le nombre d'avis
+                1
+            )
+            for sold, rating, reviews in zip(total_sold, avg_rating, total_reviews)
+        ]
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def recent_orders(self, request):
         user = request.user
         
@@ -303,6 +321,7 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def reviews_summary(self, request):
         user = request.user
         
@@ -371,28 +390,21 @@ class VendorDashboardViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cached_dashboard
     def monthly_stats(self, request):
         user = request.user
         
         if user.user_type != 'vendor':
             return Response({'error': 'Only vendors can access this dashboard'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Statistiques des 12 derniers mois
+        # Statistiques des 12 derniers mois calendaires, en une seule requête sur les agrégats journaliers
         monthly_data = []
-        for i in range(12):
-            month_start = timezone.now().replace(day=1) - timedelta(days=30*i)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            month_stats = OrderItem.objects.filter(
-                vendor=user,
-                created_at__gte=month_start,
-                created_at__lte=month_end
-            ).aggregate(
-                revenue=Sum('total_price'),
-                orders=Count('order', distinct=True),
-                items_sold=Sum('quantity')
-            )
-
+        for month_start, month_stats in monthly_totals(
+            VendorDailySales.objects.filter(vendor=user), 12, date_field='date',
+            revenue=Sum('revenue'),
+            orders=Sum('orders'),
+            items_sold=Sum('units')
+        ):
             monthly_data.append({
                 'month': month_start.strftime('%Y-%m'),
                 'month_name': month_start.strftime('%B %Y'),
@@ -401,8 +413,6 @@ class VendorDashboardViewSet(viewsets.ViewSet):
                 'items_sold': month_stats['items_sold'] or 0
             })
 
-        monthly_data.reverse()  # Ordre chronologique
-
         return Response({
             'monthly_stats': monthly_data,
             'summary': {
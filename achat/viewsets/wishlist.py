@@ -7,8 +7,14 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-from ..models import Wishlist
+import uuid
+from django.db import transaction
+from django.utils import timezone
+from ..dashboard_cache import bump_dashboard_versions
+from ..models import Cart, CartItem, Product, Wishlist
+from ..wishlist_cache import get_wishlist_ids
 from ..serializers import WishlistSerializer
+from .cart import serialize_cart
 
 
 @extend_schema_view(
@@ -55,7 +61,8 @@ class WishlistViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return Wishlist.objects.select_related(
+        # Chaque utilisateur ne voit que sa propre wishlist
+        return Wishlist.objects.filter(user=self.request.user).select_related(
             'user', 'product__user', 'product__location', 'product__category', 'product__subcategory'
         ).prefetch_related('product__images')
 
@@ -173,7 +180,7 @@ class WishlistViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='check-product/(?P<product_id>[^/.]+)')
     def check_product_in_wishlist(self, request, product_id=None):
         try:
-            exists = Wishlist.objects.filter(user=request.user, product_id=product_id).exists()
+            exists = uuid.UUID(product_id) in get_wishlist_ids(request.user.pk)
             return Response({
                 'in_wishlist': exists,
                 'product_id': product_id,
@@ -247,7 +254,7 @@ class WishlistViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='count')
     def wishlist_count(self, request):
         try:
-            count = Wishlist.objects.filter(user=request.user).count()
+            count = len(get_wishlist_ids(request.user.pk))
             return Response({
                 'count': count,
                 'user_id': str(request.user.id)
@@ -256,4 +263,93 @@ class WishlistViewSet(viewsets.ModelViewSet):
             return Response(
                 {'error': f'Erreur lors du comptage: {str(e)}'},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+    @extend_schema(
+        tags=['Wishlists'],
+        summary="Déplacer vers le panier",
+        description=(
+            "Ajoute au panier tous les éléments de la wishlist de l'utilisateur, ou ceux de `wishlist_ids`, "
+            "en une transaction. Les produits indisponibles sont ignorés et restent dans la wishlist. "
+            "`remove_from_wishlist` (vrai par défaut) retire de la wishlist les produits déplacés."
+        )
+    )
+    @action(detail=False, methods=['post'], url_path='move_to_cart')
+    def move_to_cart(self, request):
+        if hasattr(request.data, 'getlist'):
+            # Formulaire : une valeur par wishlist_ids répété
+            wishlist_ids = request.data.getlist('wishlist_ids')
+        else:
+            wishlist_ids = request.data.get('wishlist_ids') or []
+        if not isinstance(wishlist_ids, list):
+            return Response({'error': 'wishlist_ids doit être une liste'}, status=status.HTTP_400_BAD_REQUEST)
+        remove_from_wishlist = str(request.data.get('remove_from_wishlist', True)).lower() not in ('false', '0')
+        try:
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'La quantité doit être un nombre'}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity <= 0:
+            return Response({'error': 'La quantité doit être positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        wishlist_items = Wishlist.objects.filter(user=request.user)
+        if wishlist_ids:
+            try:
+                wishlist_items = wishlist_items.filter(id__in=[uuid.UUID(str(value)) for value in wishlist_ids])
+            except ValueError:
+                return Response({'error': 'wishlist_ids doit contenir des UUID'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            wishlist_items = list(wishlist_items)
+            # Produits verrouillés avant la vérification du stock : deux déplacements concurrents
+            # ne peuvent pas réserver tous deux le dernier article
+            products = Product.objects.select_for_update().filter(
+                pk__in=[item.product_id for item in wishlist_items]
+            ).order_by('pk').in_bulk()
+            cart, _ = Cart.objects.get_or_create(user=request.user)
+            existing = {item.product_id: item for item in CartItem.objects.filter(
+                cart=cart, product_id__in=[item.product_id for item in wishlist_items]
+            )}
+
+            moved, skipped, to_create, to_update = [], [], [], []
+            for wishlist_item in wishlist_items:
+                product = products.get(wishlist_item.product_id)
+                if product is None:
+                    # Supprimé depuis la lecture de la wishlist
+                    continue
+                cart_item = existing.get(product.id)
+                new_quantity = quantity + (cart_item.quantity if cart_item else 0)
+
+                if product.status != 'active':
+                    reason = 'Produit inactif'
+                elif product.user_id == request.user.id:
+                    reason = 'Impossible d\'ajouter votre propre produit'
+                elif product.is_stock and new_quantity > product.quantity:
+                    reason = f'Seulement {product.quantity} article(s) disponible(s)'
+                else:
+                    reason = None
+
+                if reason:
+                    skipped.append({'wishlist_id': str(wishlist_item.id), 'product_id': str(product.id), 'reason': reason})
+                    continue
+
+                if cart_item:
+                    cart_item.quantity = new_quantity
+                    cart_item.updated_at = timezone.now()
+                    to_update.append(cart_item)
+                else:
+                    to_create.append(CartItem(cart=cart, product=product, quantity=quantity))
+                moved.append(wishlist_item)
+
+            CartItem.objects.bulk_create(to_create)
+            CartItem.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+            if remove_from_wishlist and moved:
+                Wishlist.objects.filter(id__in=[item.id for item in moved]).delete()
+
+        # bulk_create / bulk_update n'envoient pas les signaux de CartItem
+        bump_dashboard_versions([request.user.pk])
+
+        return Response({
+            'message': f'{len(moved)} produit(s) déplacé(s) vers le panier',
+            'moved': [str(item.product_id) for item in moved],
+            'skipped': skipped,
+            'cart': serialize_cart(cart)
+        })
@@ -0,0 +1,46 @@
+"""
+Ensemble des produits en wishlist de chaque utilisateur, gardé dans le cache Django.
+
+Sert le champ is_wishlisted des listes de produits : une lecture de cache par requête au lieu
+d'un appel séparé à wishlists/ ou d'un EXISTS par ligne. Invalidé par les signaux de Wishlist,
+immédiatement puis à la validation de la transaction (une lecture concurrente a pu remettre
+l'ancien ensemble en cache entre-temps).
+
+Avec un cache propre à chaque processus (LocMem, sans CACHES configuré), l'invalidation n'atteint
+que le processus qui écrit : les ensembles y sont alors gardés ACHAT_WISHLIST_CACHE_LOCAL_TTL
+secondes seulement, ce qui borne le retard des autres processus.
+"""
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.db import transaction
+
+from .models import Wishlist
+from .token_cache import is_process_local
+
+WISHLIST_PREFIX = 'achat:wishlist_ids'
+
+
+def wishlist_key(user_id):
+    return f"{WISHLIST_PREFIX}:{user_id}"
+
+
+def get_wishlist_ids(user_id):
+    """frozenset des IDs de produits en wishlist de l'utilisateur"""
+    key = wishlist_key(user_id)
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = frozenset(Wishlist.objects.filter(user_id=user_id).values_list('product_id', flat=True))
+        cache.set(key, product_ids, wishlist_cache_ttl())
+    return product_ids
+
+
+def wishlist_cache_ttl():
+    if is_process_local(caches[DEFAULT_CACHE_ALIAS]):
+        return getattr(settings, 'ACHAT_WISHLIST_CACHE_LOCAL_TTL', 30)
+    return getattr(settings, 'ACHAT_WISHLIST_CACHE_TTL', 3600)
+
+
+def invalidate_wishlist_ids(user_ids):
+    keys = [wishlist_key(user_id) for user_id in set(user_ids)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -2,6 +2,9 @@
 ASGI config for estuaire project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn estuaire.asgi:application``) so the
+async notification stream (``notifications/stream/``) keeps one idle connection
+per client instead of a worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
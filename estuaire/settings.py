@@ -182,6 +182,77 @@ AUTHENTICATION_BACKENDS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background tasks (achat.tasks)
+ACHAT_TASK_WORKERS = 2
+ACHAT_TASKS_EAGER = False
+
+# Notifications
+ACHAT_NOTIFICATION_COUNTS_TTL = 300  # seconds
+
+# Dashboard response cache: fresh for TTL, then served stale while it is recomputed
+ACHAT_DASHBOARD_CACHE_TTL = 300  # seconds
+ACHAT_DASHBOARD_CACHE_STALE_TTL = 3600  # seconds
+
+# In-process category tree: seconds between checks of the shared version (CacheVersion table)
+ACHAT_CATEGORY_TREE_CHECK_INTERVAL = 5
+
+# Cached set of wishlisted product ids per user (is_wishlisted on product listings)
+ACHAT_WISHLIST_CACHE_TTL = 3600  # seconds, with a shared cache backend (Redis, Memcached)
+# With a per-process cache (LocMem) invalidations stay local: keep entries briefly
+ACHAT_WISHLIST_CACHE_LOCAL_TTL = 30  # seconds
+
+# Admin index / dashboard statistics snapshot (refresh_platform_stats)
+ACHAT_PLATFORM_STATS_TTL = 300  # seconds before a background refresh is queued
+ACHAT_PLATFORM_STATS_LOCAL_TTL = 60  # seconds a process keeps its in-memory copy
+# PostgreSQL only: tables above this many rows use planner estimates instead of COUNT(*); None disables
+ACHAT_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Background admin actions (admin_jobs): rows updated per transaction
+ACHAT_ADMIN_JOB_CHUNK_SIZE = 500
+# Jobs pending/running without progress for this many seconds are failed by fail_stale_admin_jobs
+ACHAT_ADMIN_JOB_STALE_AFTER = 1800
+
+# Admin search (admin_search): maximum number of rows returned for free-text searches
+ACHAT_ADMIN_SEARCH_LIMIT = 200
+
+# Authentication token cache: per-process LRU in front of a shared cache alias.
+# Revoked tokens may be accepted by other processes for up to ACHAT_TOKEN_CACHE_LOCAL_TTL;
+# ACHAT_TOKEN_CACHE_TTL only applies when the alias is really shared (Redis, Memcached...),
+# otherwise it is capped to the local TTL.
+ACHAT_TOKEN_CACHE_ALIAS = 'default'
+ACHAT_TOKEN_CACHE_SIZE = 1024
+ACHAT_TOKEN_CACHE_LOCAL_TTL = 30  # seconds
+ACHAT_TOKEN_CACHE_TTL = 300  # seconds
+
+# Per-device tokens: sliding expiry, last-seen writes batched in memory
+ACHAT_TOKEN_TTL_DAYS = 30
+ACHAT_TOKEN_LAST_SEEN_FLUSH = 60  # seconds
+ACHAT_TOKEN_LAST_SEEN_MAX_PENDING = 1000
+
+# Bounded password hashing pool (login/registration), see benchmark_login
+ACHAT_PASSWORD_HASHING_WORKERS = None  # defaults to os.cpu_count()
+ACHAT_PASSWORD_HASHING_QUEUE = 64
+ACHAT_PASSWORD_HASHING_WAIT = 2  # seconds before answering 503
+
+# Token-bucket throttling of login/registration ('<scope>_<identifier|ip|global>': 'N/period')
+ACHAT_THROTTLE_STORE = 'achat.throttling.InMemoryBucketStore'  # or 'achat.throttling.CacheBucketStore'
+ACHAT_THROTTLE_CACHE_ALIAS = 'default'
+ACHAT_THROTTLE_RATES = {
+    'login_identifier': '5/min',
+    'login_ip': '30/min',
+    'login_global': '1200/min',
+    'register_identifier': '3/hour',
+    'register_ip': '10/hour',
+    'register_global': '300/min',
+}
+
+# Notification retention in days per state (None keeps them forever), see prune_notifications
+ACHAT_NOTIFICATION_RETENTION = {'read': 30, 'unread': 180}
+
+# Real-time notification stream (SSE, requires an ASGI server)
+ACHAT_REALTIME_BROKER = 'achat.realtime.InMemoryBroker'
+ACHAT_STREAM_KEEPALIVE = 25  # seconds
+
 # Jazzmin Configuration - Modern E-commerce Dashboard
 JAZZMIN_SETTINGS = {
     # ============================================